@@ -7,7 +7,7 @@ setup(
     install_requires=["click"],
     entry_points={
         "console_scripts": [
-            "teresa = teresa.cli:coregister",
+            "teresa = teresa.cli:cli",
         ]
     },
 )
\ No newline at end of file
@@ -30,4 +30,101 @@ def coregister(parms_path):
 
     click.echo("Coregistration completed successfully.")
 
+@cli.command()
+@click.option(
+    "--parms_path",
+    required = True,
+    type=click.Path(exists=True, file_okay=True, dir_okay=False, resolve_path=True),
+    help="The parameter file of the processed stack.",
+)
+def append(parms_path):
+    """
+    Coregistrating only the dates added to an already processed stack
+    """
+
+    click.echo(f"Append started with parameters from {parms_path}")
+
+    slc_stack = createSlcStack(parms_path)
+    coregister = createCoregistion(parms_path, slc_stack)
+    coregister.append()
+
+    click.echo("Append completed successfully.")
+
+@cli.command()
+@click.option(
+    "--parms_path",
+    required = True,
+    type=click.Path(exists=True, file_okay=True, dir_okay=False, resolve_path=True),
+    help="The parameter file of the processed stack.",
+)
+@click.option("--interval", type=float, default=None, help="Seconds between two polls of data_dirs.")
+@click.option("--settle", type=float, default=None,
+              help="Seconds the file sizes of a scene must stay unchanged before it is processed.")
+def watch(parms_path, interval, settle):
+    """
+    Coregistrating new acquisitions as they land in the data directories
+    """
+    from teresa.coregistion.stackWatcher import stackWatcher
+
+    slc_stack = createSlcStack(parms_path)
+    coregister = createCoregistion(parms_path, slc_stack)
+    stackWatcher(coregister, interval=interval, settle=settle).run()
+
+
+
+
+@cli.command()
+def warmup():
+    """
+    Compiling the Numba geocoding kernels into the on-disk cache (run at deploy time)
+    """
+    from teresa.utils.geocode._geocode import warmup as warmup_kernels
+
+    elapsed = warmup_kernels()
+    click.echo(f"Numba kernels ready in {elapsed:.2f} s")
+
+
+@cli.group()
+def catalog():
+    """
+    Archive-wide acquisition catalog (SQLite)
+    """
+    pass
+
+@catalog.command("index")
+@click.option("--db", "db_path", required=True, type=click.Path(dir_okay=False, resolve_path=True),
+              help="The catalog database, created if it does not exist.")
+@click.argument("data_dirs", nargs=-1, required=True,
+                type=click.Path(exists=True, file_okay=False, resolve_path=True))
+def catalog_index(db_path, data_dirs):
+    """
+    Index the LT1/BC/CSK/S1 acquisitions under DATA_DIRS into the catalog
+    """
+    from teresa.slcStack.acquisitionCatalog import acquisitionCatalog
+
+    with acquisitionCatalog(db_path) as acq_catalog:
+        added, failed = acq_catalog.index(list(data_dirs), log=click.echo)
+    click.echo(f"Indexed {added} acquisitions ({failed} failed) into {db_path}")
+
+@catalog.command("query")
+@click.option("--db", "db_path", required=True, type=click.Path(exists=True, dir_okay=False, resolve_path=True),
+              help="The catalog database.")
+@click.option("--sensor", help="LT1, BC, CSK or S1.")
+@click.option("--start", help="First date, YYYYMMDD.")
+@click.option("--end", help="Last date, YYYYMMDD.")
+@click.option("--bbox", nargs=4, type=float, default=None, help="AOI: min_lat max_lat min_lon max_lon.")
+@click.option("--direction", type=click.Choice(["ASCENDING", "DESCENDING"], case_sensitive=False))
+@click.option("--track", type=int, help="Relative orbit.")
+def catalog_query(db_path, sensor, start, end, bbox, direction, track):
+    """
+    List the acquisitions of the catalog matching the filters
+    """
+    from teresa.slcStack.acquisitionCatalog import acquisitionCatalog
 
+    with acquisitionCatalog(db_path) as acq_catalog:
+        acquisitions = acq_catalog.query(sensor=sensor, start=start, end=end, aoi=bbox or None,
+                                         direction=direction, track=track)
+    for acq in acquisitions:
+        click.echo(f"{acq['date']}  {acq['sensor']:<4} {acq['direction'] or '-':<10} "
+                   f"track {acq['track'] if acq['track'] is not None else '-':<4} {acq['meta_path']}")
+    click.echo(f"{len(acquisitions)} acquisitions")
@@ -1,16 +1,26 @@
 import os
 import shutil
+from collections import deque
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from datetime import datetime
 from teresa.utils.TeresaLog import global_log
 
 from teresa.processor.dorisProcessor import dorisProcessor
-from teresa.dump.dump_funcs_map import dump_header2doris_funcs, dump_data_funcs 
+from teresa.coregistion.dorisIngest import create_ingest_pool, ingest_date_safe, verify_ingest
+from teresa.coregistion.stackManifest import stackManifest
+from teresa.coregistion.dorisScheduler import dorisScheduler, schedulerTask, run_doris_step, run_ingest, STEP_DEPENDS, STEP_RESOURCES
 
 class dorisCoregistion():
     def __init__(self, params, slc_stack):
         self.slc_stack = slc_stack
         self.params    = params
         self.doris     = dorisProcessor(params)
+        self.failed_dates = set()
+        # Pools kept alive across calls by the watch mode, created per call if None
+        # watch 模式下跨调用保留的进程池/执行器，为 None 时每次调用时创建
+        self.ingest_pool = None
+        self.executor = None
     
     def run(self):
         """
@@ -25,41 +35,21 @@ class dorisCoregistion():
         self.write_params_to_dorisin()
 
         # Step 3: Use a Python script to read and crop domestic satellite data.
+        # The master is read first, the slaves are read ahead of Doris in step 5.
         # 3. 用 python 脚本实现 国产卫星数据的 的 读入 和 crop 操作 。
-        for date in self.slc_stack.dates:
-            self.read_files(date)
+        # 先读入 master，slave 在第 5 步中边读入边处理
+        self.read_files(self.slc_stack.master_date)
 
         # Step 4: Determine the master image and copy it to the master folder.
         # 4. 确定 master ，并且把对应的复制到 master 文件夹中，
         self.get_master()
 
-        # Step 5: Execute the core processing workflow of Doris.
-        # 5. 执行 doris 的核心处理流程
-        for date in self.slc_stack.dates:
-            if date == self.slc_stack.master_date:
-                continue
-            
-            # date_dir: folder corresponding to each date
-            # 这里的 date_dir 是指每个日期对应的文件夹
-            date_dir = self.slc_stack.work_dir + os.sep + "workspace" + os.sep + date
-
-            global_log.start_task(self.get_task_info(date))
-            
-            self.doris.coarseorb(date_dir)
-            self.doris.coarsecorr(date_dir)
-            self.doris.fine(date_dir)
-            self.doris.coregpm(date_dir)
-            self.doris.resample(date_dir)
-            
-            # interferogram
-            # 干涉图
-            self.doris.interfero(date_dir)
-            self.doris.comprefpha(date_dir)
-            self.doris.subtrrefpha(date_dir)
-            self.doris.comprefdem(date_dir)
-            self.doris.subtrrefdem(date_dir)
-
-            global_log.end_task(success=True)
+        # Step 5: Execute the core processing workflow of Doris. The slaves are
+        # ingested in a process pool while Doris processes the previous ones.
+        # 5. 执行 doris 的核心处理流程。slave 的读入在进程池中进行，与 doris 处理重叠
+        slave_dates = [date for date in self.slc_stack.dates if date != self.slc_stack.master_date]
+        self.process_slaves(slave_dates)
+        self.update_manifest(slave_dates)
 
         # Step 6: Generate the DEM file
         # 6. 生成 dem 文件
@@ -70,6 +60,82 @@ class dorisCoregistion():
 
         self.doris.geocode(self.slc_stack.work_dir + os.sep + "workspace")
 
+    def append(self):
+        """
+        Append the new dates of the stack: only the dates that are not done in
+        the stack manifest are ingested and processed against the existing
+        master, the dates already processed are not touched.
+        """
+        workspace = self.slc_stack.work_dir + os.sep + "workspace"
+        manifest = stackManifest(workspace).load()
+        master_res_path = workspace + os.sep + "master" + os.sep + "master.res"
+        if manifest.master_date is None or not os.path.exists(master_res_path):
+            raise FileNotFoundError(f"No processed stack found in {workspace}, run coregister first.")
+        if manifest.master_date != self.slc_stack.master_date:
+            raise ValueError(f"Master date {self.slc_stack.master_date} differs from the master "
+                             f"{manifest.master_date} of the existing stack.")
+
+        new_dates = [date for date in self.slc_stack.dates
+                     if date != manifest.master_date and not manifest.is_done(date)]
+        global_log.task_count = len(new_dates)
+        if not new_dates:
+            global_log.write("No new dates to append.")
+            return
+
+        # Only the folders of the new dates are created, the rendered dorisin
+        # files of the stack are kept
+        # 只为新日期创建目录，保留已有的 dorisin 文件
+        for date in new_dates:
+            self.create_date_dir(date)
+        self.write_params_to_dorisin()
+
+        self.process_slaves(new_dates)
+        self.update_manifest(new_dates, manifest)
+
+        self.doris.geocode(workspace)
+
+    def process_slaves(self, dates):
+        """
+        Ingest and process the slave dates with the configured executor: the
+        DAG scheduler, a pool of doris_workers, or one date after the other.
+
+        Parameters:
+            dates (list): The slave dates.
+        """
+        doris_workers = int(self.params['stack_parameters'].get('doris_workers', 1))
+        if self.params['stack_parameters'].get('scheduler') == 'dag':
+            self.process_dag(dates)
+        elif doris_workers <= 1:
+            for date in self.ingest_ahead(dates):
+                if date in self.failed_dates:
+                    continue
+                # A failed date is recorded and the others go on, as in process_concurrent
+                # 失败的日期被记录下来，其余日期继续处理，与 process_concurrent 一致
+                try:
+                    self.process_date(date)
+                except Exception as e:
+                    self.failed_dates.add(date)
+                    global_log.write(f"{date} failed: {type(e).__name__}: {e}")
+        else:
+            self.process_concurrent(dates, doris_workers)
+
+    def update_manifest(self, dates, manifest=None):
+        """
+        Record the processed dates in the stack manifest.
+
+        Parameters:
+            dates (list): The slave dates just processed.
+            manifest (stackManifest): The loaded manifest, loaded from the workspace if None.
+        """
+        if manifest is None:
+            manifest = stackManifest(self.slc_stack.work_dir + os.sep + "workspace").load()
+        manifest.radar_type = self.slc_stack.radar_type
+        manifest.master_date = self.slc_stack.master_date
+        for date in dates:
+            manifest.update(date, "failed" if date in self.failed_dates else "done",
+                            self.slc_stack.meta_path_map.get(date), self.slc_stack.data_path_map.get(date))
+        manifest.save()
+
     def create_work_dir(self):
         """
         Create the working directory for coregistration.
@@ -95,23 +161,7 @@ class dorisCoregistion():
         # Step 4: Create directories for all dates
         # 4. 生成所有 date 的目录
         for date in self.slc_stack.dates:
-            # The working directory corresponding to each date
-            # 每个日期对应的工作目录
-            date_path = work_dir + os.sep + date
-            if not os.path.exists(date_path):
-                os.makedirs(date_path)
-            
-            # Create symbolic links for meta and data files
-            # 创建 meta 和 数据文件 的软连接
-            src_meta = self.slc_stack.meta_path_map[date]
-            dst_meta = date_path + os.sep + os.path.basename(src_meta)
-            if not os.path.exists(dst_meta):
-                os.symlink(src_meta, dst_meta)
-
-            src_data = self.slc_stack.data_path_map[date]
-            dst_data = date_path + os.sep + os.path.basename(src_data)
-            if not os.path.exists(dst_data):
-                os.symlink(src_data, dst_data)
+            self.create_date_dir(date)
         
         # Step 5: Create the dorisin directory
         # 5. 生成 dorisin 目录，并且将 dorisin 文件复制进去
@@ -134,6 +184,28 @@ class dorisCoregistion():
             dst_file = os.path.join(dst_dorisin_dir, os.path.basename(file))
             shutil.copy(file, dst_file)
 
+    def create_date_dir(self, date):
+        """
+        Create the working directory of a date with the links to its files.
+        """
+        # The working directory corresponding to each date
+        # 每个日期对应的工作目录
+        date_path = self.slc_stack.work_dir + os.sep + "workspace" + os.sep + date
+        if not os.path.exists(date_path):
+            os.makedirs(date_path)
+        
+        # Create symbolic links for meta and data files
+        # 创建 meta 和 数据文件 的软连接
+        src_meta = self.slc_stack.meta_path_map[date]
+        dst_meta = date_path + os.sep + os.path.basename(src_meta)
+        if not os.path.exists(dst_meta):
+            os.symlink(src_meta, dst_meta)
+
+        src_data = self.slc_stack.data_path_map[date]
+        dst_data = date_path + os.sep + os.path.basename(src_data)
+        if not os.path.exists(dst_data):
+            os.symlink(src_data, dst_data)
+
     def write_params_to_dorisin(self):
         """
         Write the parameters to the dorisin file.
@@ -161,50 +233,226 @@ class dorisCoregistion():
                     with open(dorisin_path, 'w', encoding='utf-8') as f:
                         f.writelines(updated_lines)
 
-    def read_files(self, date):
+    def process_date(self, date, buffered=False):
         """
-        Read files from the specified date path.
+        Run the Doris chain from coarseorb to subtrrefdem for a slave date.
+
+        Parameters:
+            date (str): The slave date.
+            buffered (bool): Keep the log of the task until it ends, for
+                             dates processed concurrently.
+        """
+        # date_dir: folder corresponding to each date
+        # 这里的 date_dir 是指每个日期对应的文件夹
+        date_dir = self.slc_stack.work_dir + os.sep + "workspace" + os.sep + date
+
+        global_log.start_task(self.get_task_info(date), buffered=buffered)
         
+        try:
+            self.doris.coarseorb(date_dir)
+            self.doris.coarsecorr(date_dir)
+            self.doris.fine(date_dir)
+            self.doris.coregpm(date_dir)
+            self.doris.resample(date_dir)
+            
+            # interferogram
+            # 干涉图
+            self.doris.interfero(date_dir)
+            self.doris.comprefpha(date_dir)
+            self.doris.subtrrefpha(date_dir)
+            self.doris.comprefdem(date_dir)
+            self.doris.subtrrefdem(date_dir)
+        except Exception:
+            global_log.end_task(success=False)
+            raise
+
+        global_log.end_task(success=True)
+
+    def process_concurrent(self, dates, workers):
+        """
+        Run the Doris chain of several slave dates at the same time. The dates
+        are handed to the pool as their ingest completes, at most workers of
+        them running at once; a failed date is recorded and the others go on.
+
         Parameters:
-            date_path (str): The path to the date directory.
+            dates (list): The slave dates.
+            workers (int): Number of dates processed concurrently.
         """
-        # Convert to a string in the “2024-07-18” format
-        # 转为 "2024-07-18" 格式字符串
-        dt = datetime.strptime(date, "%Y%m%d")
-        formatted_date = dt.strftime("%Y-%m-%d")
-        global_log.start_read(formatted_date)
+        running = {}
+
+        def collect(done):
+            for future in done:
+                date = running.pop(future)
+                error = future.exception()
+                if error is not None:
+                    self.failed_dates.add(date)
+                    global_log.write(f"{date} failed: {type(error).__name__}: {error}")
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for date in self.ingest_ahead(dates):
+                if date in self.failed_dates:
+                    continue
+                # Wait for a free worker before taking the next date, so the
+                # ingest stays at most ingest_prefetch dates ahead
+                # 等待空闲的 worker 后再取下一个日期，使读入最多领先 ingest_prefetch 个日期
+                if len(running) >= workers:
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    collect(done)
+                running[pool.submit(self.process_date, date, True)] = date
+
+            done, _ = wait(running)
+            collect(done)
+
+    def process_dag(self, dates):
+        """
+        Ingest and process the slave dates with the DAG scheduler: the steps
+        of all dates are admitted under the core, memory and IO budgets of the
+        node, one step at a time per date since they share coreg.out.
+
+        Parameters:
+            dates (list): The slave dates.
+        """
+        stack_parameters = self.params['stack_parameters']
+        # io_jobs defaults to ingest_workers, as for the ingest pool of the other paths
+        # io_jobs 默认等于 ingest_workers，与其他路径的导入进程池一致
+        workers = max(1, int(stack_parameters.get('ingest_workers', 1)))
+        scheduler = dorisScheduler(cores=stack_parameters.get('cores'),
+                                   memory_mb=stack_parameters.get('memory_mb'),
+                                   io_jobs=int(stack_parameters.get('io_jobs', workers)),
+                                   executor=self.executor or stack_parameters.get('executor', 'thread'))
+
+        for date in dates:
+            date_dir = self.slc_stack.work_dir + os.sep + "workspace" + os.sep + date
+            ingest_depends = []
+            if not self.is_ingested(date):
+                scheduler.add(schedulerTask((date, "ingest"), run_ingest,
+                                            (self.params, *self.get_ingest_args(date)),
+                                            lock=date, **STEP_RESOURCES["ingest"]))
+                ingest_depends = [(date, "ingest")]
+            for step, depends in STEP_DEPENDS.items():
+                depends = [(date, dep) for dep in depends] or ingest_depends
+                scheduler.add(schedulerTask((date, step), run_doris_step,
+                                            (self.params, step, date_dir),
+                                            depends=depends, lock=date, **STEP_RESOURCES[step]))
+
+        status = scheduler.run()
+        for (date, step), task_status in status.items():
+            if task_status != "SUCCESS":
+                self.failed_dates.add(date)
+        global_log.write(f"[DAG] {len(dates) - len(self.failed_dates)} / {len(dates)} dates processed")
+
+    def ingest_ahead(self, dates, prefetch=None):
+        """
+        Ingest the dates in a process pool and yield each of them, in order,
+        once its data is ready. At most prefetch dates are queued or being
+        read ahead of the consumer, so the dump I/O overlaps the processing
+        of the yielded dates without filling the disk in advance.
+
+        Parameters:
+            dates (list): The dates to ingest.
+            prefetch (int): Depth of the queue, ingest_prefetch by default.
+
+        Yields:
+            str: The next ingested (or failed) date.
+        """
+        stack_parameters = self.params['stack_parameters']
+        workers = max(1, int(stack_parameters.get('ingest_workers', 1)))
+        io_jobs = int(stack_parameters.get('io_jobs', workers))
+        if prefetch is None:
+            prefetch = int(stack_parameters.get('ingest_prefetch', workers + 1))
+        prefetch = max(1, prefetch)
+
+        with nullcontext(self.ingest_pool) if self.ingest_pool else create_ingest_pool(workers, io_jobs) as pool:
+            pending = deque()
+            remaining = iter(dates)
+
+            def fill():
+                # Keep the bounded queue full; dates already read need no job
+                # 保持队列填满；已经读入的日期不需要提交任务
+                while len(pending) < prefetch:
+                    date = next(remaining, None)
+                    if date is None:
+                        return
+                    future = None
+                    if not self.is_ingested(date):
+                        future = pool.submit(ingest_date_safe, self.params, *self.get_ingest_args(date))
+                    pending.append((date, future))
+
+            fill()
+            while pending:
+                date, future = pending.popleft()
+                self.read_files(date, future)
+                fill()
+                yield date
+
+    def is_ingested(self, date):
+        """
+        Check whether the data of the date has already been read completely,
+        i.e. image.raw matches the crop block of slave.res.
+        """
+        date_dir = self.slc_stack.work_dir + os.sep + "workspace" + os.sep + date
+        return verify_ingest(date_dir, checksum=self.params['stack_parameters'].get('verify_checksum', False))
 
+    def get_ingest_args(self, date):
+        """
+        Get the arguments of ingest_date for the date.
+
+        Returns:
+            tuple: (radar_type, date_dir, meta_name, data_name)
+        """
         # Two parameters: one is data, the path to the data; the other is date, 
         # the working directory corresponding to the date. 
         # They differ by only one letter—do not confuse them. 
         # 两个参数，一个是 data 数据的路径，一个是 date 日期对应的工作路径，只差一个字母，不要混淆
         date_dir = self.slc_stack.work_dir + os.sep + "workspace" + os.sep + date
+        meta_name = os.path.basename(self.slc_stack.meta_path_map[date])
+        data_name = os.path.basename(self.slc_stack.data_path_map[date])
+        return self.slc_stack.radar_type, date_dir, meta_name, data_name
+
+    def read_files(self, date, future=None):
+        """
+        Read files from the specified date path.
+        
+        Parameters:
+            date (str): The date to read.
+            future (Future): The pending result of the date in the ingest pool,
+                             None to read the date in this process.
+        """
+        # Convert to a string in the “2024-07-18” format
+        # 转为 "2024-07-18" 格式字符串
+        dt = datetime.strptime(date, "%Y%m%d")
+        formatted_date = dt.strftime("%Y-%m-%d")
+        global_log.start_read(formatted_date)
 
-        image_path = os.path.join(date_dir, "image.raw")
-        resFile_path = os.path.join(date_dir, "slave.res")  
-        if os.path.exists(image_path) and os.path.exists(resFile_path):
+        if future is None and self.is_ingested(date):
             global_log.read_status("SKIPPED")
             return
 
-        radar_type = self.slc_stack.radar_type
-        meta_name = os.path.basename(self.slc_stack.meta_path_map[date])
-        data_name = os.path.basename(self.slc_stack.data_path_map[date])
+        radar_type, date_dir, meta_name, data_name = self.get_ingest_args(date)
+        global_log.read_meta(meta_name)
+        global_log.read_data(data_name)
 
-        global_log.read_meta(os.path.basename(meta_name))
-        meta_symlink = os.path.join(date_dir, meta_name)
-        dump_header2doris_funcs[radar_type](meta_symlink, date_dir)
+        if future is None:
+            status, error = ingest_date_safe(self.params, radar_type, date_dir, meta_name, data_name)
+        else:
+            status, error = future.result()
 
-        global_log.read_data(os.path.basename(data_name))
-        data_symlink = os.path.join(date_dir, data_name)
-        dump_data_funcs[radar_type](data_symlink, date_dir)      
-
-        global_log.read_status("SUCCESS") 
+        # A failed date is reported and left out of the processing
+        # 导入失败的日期记录到日志中，并跳过后续处理
+        if status != "SUCCESS":
+            self.failed_dates.add(date)
+            global_log.read_status(f"{status} ({error})")
+            return
 
+        global_log.read_status(status)
 
     def get_master(self):
         """
         Determine the master image and copy it to the master folder.
         """
+        if self.slc_stack.master_date in self.failed_dates:
+            raise RuntimeError(f"Failed to ingest the master date: {self.slc_stack.master_date}")
+
         master_data_path = self.slc_stack.work_dir + os.sep + "workspace" + os.sep + self.slc_stack.master_date + os.sep + "image.raw"
         if not os.path.exists(master_data_path):
             raise FileNotFoundError(f"Master data file not found: {master_data_path}")
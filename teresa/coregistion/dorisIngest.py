@@ -0,0 +1,225 @@
+import os
+import re
+import json
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+
+from teresa.dump.sensor_reader import get_sensor_reader
+from teresa.dump.dump_utils import DEFAULT_MEMORY_MB
+from teresa.utils.atomicWrite import atomic_write, file_crc32
+
+# Record of a completed ingest: byte size (and crc32) of image.raw
+# 导入完成的记录：image.raw 的字节数（以及 crc32 校验值）
+INGEST_RECORD = ".teresa_ingest.json"
+
+# complex_short: two int16 per pixel
+BYTES_PER_PIXEL = 4
+
+# Semaphore limiting the concurrent data dumps of the worker processes
+# 限制各工作进程同时进行数据 dump（磁盘 IO）数量的信号量
+_io_semaphore = None
+
+
+def _init_worker(io_semaphore):
+    """
+    Initialize an ingest worker process with the shared IO semaphore.
+    """
+    global _io_semaphore
+    _io_semaphore = io_semaphore
+
+
+def create_ingest_pool(workers, io_jobs):
+    """
+    Create the process pool for the per-date ingest.
+
+    Parameters:
+        workers (int): Number of worker processes.
+        io_jobs (int): Maximum number of data dumps running at the same time.
+
+    Returns:
+        ProcessPoolExecutor: The ingest pool.
+    """
+    return ProcessPoolExecutor(max_workers=workers,
+                               initializer=_init_worker,
+                               initargs=(mp.Semaphore(max(1, io_jobs)),))
+
+
+def crop_window(params, date_dir):
+    """
+    Map the lat/lon AOI of the parameters to the crop window of a date.
+
+    Parameters:
+        params (dict): The parameters of doris.parms.
+        date_dir (str): The working directory of the date, whose slave.res
+                        already holds the header of the scene.
+
+    Returns:
+        tuple: (l0, lN, p0, pN), 1-based, or None when no AOI is set.
+    """
+    stack_parameters = params['stack_parameters']
+    aoi_keys = ('min_lat', 'max_lat', 'min_lon', 'max_lon')
+    if any(stack_parameters.get(key) is None for key in aoi_keys):
+        return None
+
+    # Imported here: numba and scipy are only needed when an AOI is set
+    # 在此处导入：只有设置了 AOI 时才需要 numba 和 scipy
+    from teresa.utils.geocode._geocode import geo_to_radar_window
+
+    # The window is padded by aoi_margin lines/pixels to absorb the
+    # topography and the orbit errors
+    # 窗口四周额外扩展 aoi_margin 个像素，以容纳地形起伏和轨道误差
+    return geo_to_radar_window(os.path.join(date_dir, "slave.res"),
+                               *[float(stack_parameters[key]) for key in aoi_keys],
+                               margin=int(stack_parameters.get('aoi_margin', 100)))
+
+
+def scene_pixels(res_file):
+    """
+    Number of pixels of the full scene from the header of a res file.
+
+    Returns:
+        int: The number of pixels, or None when it is not known.
+    """
+    with open(res_file) as f:
+        match = re.search(r'^Number_of_pixels_original:\s+(\d+)', f.read(), re.MULTILINE)
+    return int(match.group(1)) if match else None
+
+
+def dump_window(params, reader, date_dir):
+    """
+    Choose the window to dump from the capabilities of the sensor reader.
+
+    A reader without window reads dumps the full scene, so the AOI window is
+    not even computed. With prefer_zero_copy, the AOI window of a zero-copy
+    reader is widened to full rows: a byte range copied in the kernel is
+    faster than decoding the columns of the AOI, at the cost of a wider image.
+
+    Returns:
+        tuple: (l0, lN, p0, pN), 1-based, or None for the full scene.
+    """
+    if not reader.supports_window_read:
+        return None
+    # Only dump the window covering the AOI (None for the full scene)
+    # 只导出 AOI 覆盖的窗口（未设置 AOI 时为整景）
+    window = crop_window(params, date_dir)
+    if window is not None and reader.supports_zero_copy and params['stack_parameters'].get('prefer_zero_copy', False):
+        npixels = scene_pixels(os.path.join(date_dir, "slave.res"))
+        if npixels is not None:
+            window = (window[0], window[1], 1, npixels)
+    return window
+
+
+def ingest_date(params, radar_type, date_dir, meta_name, data_name):
+    """
+    Convert the header and dump the data of one date into its working directory.
+
+    Parameters:
+        params (dict): The parameters of doris.parms.
+        radar_type (str): The radar type, key of the sensor readers.
+        date_dir (str): The working directory of the date.
+        meta_name (str): File name of the meta file symlink in date_dir.
+        data_name (str): File name of the data file symlink in date_dir.
+    """
+    reader = get_sensor_reader(radar_type)
+    reader.dump_header(os.path.join(date_dir, meta_name), date_dir)
+
+    # Memory ceiling (MB) for streaming the data into image.raw
+    # 数据 dump 时的内存上限（MB）
+    memory_mb = params['stack_parameters'].get('ingest_memory_mb', DEFAULT_MEMORY_MB)
+    window = dump_window(params, reader, date_dir)
+
+    if _io_semaphore is not None:
+        _io_semaphore.acquire()
+    try:
+        reader.dump_data(os.path.join(date_dir, data_name), date_dir,
+                         memory_mb=memory_mb, window=window)
+    finally:
+        if _io_semaphore is not None:
+            _io_semaphore.release()
+
+    # Check the dump against the crop block and record it as complete
+    # 按 crop 块校验导出结果，并记录导入完成
+    image_path = os.path.join(date_dir, "image.raw")
+    expected_size = crop_size(os.path.join(date_dir, "slave.res"))
+    if expected_size is None or os.path.getsize(image_path) != expected_size:
+        raise IOError(f"Incomplete ingest: {image_path} has {os.path.getsize(image_path)} bytes, "
+                      f"crop block expects {expected_size}")
+    record = {"size": expected_size}
+    if params['stack_parameters'].get('verify_checksum', False):
+        record["crc32"] = file_crc32(image_path)
+    with atomic_write(os.path.join(date_dir, INGEST_RECORD)) as f:
+        json.dump(record, f)
+
+
+def crop_size(res_file):
+    """
+    Expected byte size of image.raw from the crop block of a res file.
+
+    Returns:
+        int: The size, or None when the crop block is missing or incomplete.
+    """
+    if not os.path.exists(res_file):
+        return None
+    with open(res_file) as f:
+        content = f.read()
+    block = re.search(r'\*_Start_crop:.*?\* End_crop:_NORMAL', content, re.DOTALL)
+    if block is None:
+        return None
+    bounds = []
+    for name in ("First_line", "Last_line", "First_pixel", "Last_pixel"):
+        match = re.search(rf'{name} \(w\.r\.t\. original_image\):\s+(\d+)', block.group(0))
+        if match is None:
+            return None
+        bounds.append(int(match.group(1)))
+    l0, lN, p0, pN = bounds
+    return (lN - l0 + 1) * (pN - p0 + 1) * BYTES_PER_PIXEL
+
+
+def verify_ingest(date_dir, checksum=False):
+    """
+    Check that the ingest of a date is complete: the crop block of slave.res
+    is there and image.raw has the size it implies (and, when asked, the
+    recorded crc32).
+
+    Parameters:
+        date_dir (str): The working directory of the date.
+        checksum (bool): Also compare the crc32 recorded by the ingest.
+
+    Returns:
+        bool: True if the ingest can be reused.
+    """
+    image_path = os.path.join(date_dir, "image.raw")
+    if not os.path.exists(image_path):
+        return False
+    expected_size = crop_size(os.path.join(date_dir, "slave.res"))
+    if expected_size is None or os.path.getsize(image_path) != expected_size:
+        return False
+    if checksum:
+        record_path = os.path.join(date_dir, INGEST_RECORD)
+        if not os.path.exists(record_path):
+            return False
+        with open(record_path) as f:
+            record = json.load(f)
+        if "crc32" in record and record["crc32"] != file_crc32(image_path):
+            return False
+    return True
+
+
+def ingest_date_safe(params, radar_type, date_dir, meta_name, data_name):
+    """
+    Run ingest_date and report the failure instead of raising it, so that
+    one broken date does not stop the others.
+
+    Returns:
+        tuple: (status, error), status is "SUCCESS" or "FAIL".
+    """
+    try:
+        ingest_date(params, radar_type, date_dir, meta_name, data_name)
+        return "SUCCESS", None
+    except Exception as e:
+        # Remove the partial output so the date is not skipped on the next run
+        # 删除不完整的输出，避免下次运行时被误认为已经导入
+        for name in ("image.raw", INGEST_RECORD):
+            if os.path.exists(os.path.join(date_dir, name)):
+                os.remove(os.path.join(date_dir, name))
+        return "FAIL", f"{type(e).__name__}: {e}"
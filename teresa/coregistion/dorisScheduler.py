@@ -0,0 +1,207 @@
+import os
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from teresa.utils.TeresaLog import global_log
+from teresa.processor.dorisProcessor import dorisProcessor, STEP_DEPENDS
+from teresa.coregistion.dorisIngest import ingest_date_safe
+
+# Resource class of each step: cores, memory (MB) and IO slots it holds while running
+# 各步骤运行时占用的资源：CPU 核数、内存（MB）和 IO 并发数
+STEP_RESOURCES = {
+    "ingest":      {"cores": 1, "mem_mb": 512,  "io": 1},
+    "coarseorb":   {"cores": 1, "mem_mb": 64,   "io": 0},
+    "coarsecorr":  {"cores": 1, "mem_mb": 512,  "io": 0},
+    "fine":        {"cores": 1, "mem_mb": 1024, "io": 0},
+    "coregpm":     {"cores": 1, "mem_mb": 128,  "io": 0},
+    "resample":    {"cores": 1, "mem_mb": 4096, "io": 1},
+    "interfero":   {"cores": 1, "mem_mb": 2048, "io": 1},
+    "comprefpha":  {"cores": 1, "mem_mb": 64,   "io": 0},
+    "subtrrefpha": {"cores": 1, "mem_mb": 1024, "io": 1},
+    "comprefdem":  {"cores": 1, "mem_mb": 4096, "io": 1},
+    "subtrrefdem": {"cores": 1, "mem_mb": 1024, "io": 1},
+}
+
+
+def run_doris_step(params, step, date_dir):
+    """
+    Run one Doris step of a date. Module level so that it can be sent to a
+    process pool.
+
+    Parameters:
+        params (dict): The parameters of doris.parms.
+        step (str): Name of the dorisProcessor step.
+        date_dir (str): The working directory of the date.
+
+    Returns:
+        list: The log lines written by the step.
+    """
+    with global_log.capture() as lines:
+        getattr(dorisProcessor(params), step)(date_dir)
+    return lines
+
+
+def run_ingest(params, radar_type, date_dir, meta_name, data_name):
+    """
+    Ingest one date as a scheduler task, raising when the ingest fails.
+
+    Returns:
+        list: The log lines of the ingest.
+    """
+    status, error = ingest_date_safe(params, radar_type, date_dir, meta_name, data_name)
+    if status != "SUCCESS":
+        raise RuntimeError(error)
+    return [f"[Step] {'ingest':<15} | Status: {status}"]
+
+
+def total_memory_mb():
+    """
+    Physical memory of the node in MB.
+    """
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES') // (1024 * 1024)
+    except (ValueError, OSError, AttributeError):
+        return 8192
+
+
+class schedulerTask():
+    def __init__(self, key, func, args, depends=(), cores=1, mem_mb=0, io=0, lock=None):
+        """
+        A task of the scheduler.
+
+        Parameters:
+            key (tuple): Unique key of the task, e.g. (date, step).
+            func (callable): Function run by the executor, must be picklable
+                             for the process executor.
+            args (tuple): Arguments of func.
+            depends (list): Keys of the tasks that must succeed first.
+            cores (int): Cores held while running.
+            mem_mb (int): Memory (MB) held while running.
+            io (int): IO slots held while running.
+            lock (str): Tasks sharing a lock never run at the same time.
+        """
+        self.key = key
+        self.func = func
+        self.args = args
+        self.depends = list(depends)
+        self.cores = cores
+        self.mem_mb = mem_mb
+        self.io = io
+        self.lock = lock
+        self.status = "PENDING"
+        self.error = None
+
+
+class dorisScheduler():
+    def __init__(self, cores=None, memory_mb=None, io_jobs=None, executor="thread"):
+        """
+        Run a DAG of tasks under per-node budgets of cores, memory and
+        concurrent IO jobs. A ready task is admitted as soon as its resources
+        fit, so cheap tasks pass by the heavy ones waiting for memory or IO.
+
+        Parameters:
+            cores (int): Core budget, all cores of the node by default.
+            memory_mb (int): Memory budget (MB), 80% of the node by default.
+            io_jobs (int): Number of IO heavy tasks running at once, 2 by default.
+            executor (str | Executor): "thread", "process", or an Executor
+                                       instance (e.g. a cluster pool).
+        """
+        self.cores = int(cores or os.cpu_count() or 1)
+        self.memory_mb = int(memory_mb or total_memory_mb() * 0.8)
+        self.io_jobs = int(io_jobs or 2)
+        self.executor = executor
+        self.tasks = {}
+
+    def add(self, task):
+        """
+        Add a task, its dependencies must be added before it.
+        """
+        for key in task.depends:
+            if key not in self.tasks:
+                raise ValueError(f"Unknown dependency {key} of task {task.key}")
+        self.tasks[task.key] = task
+
+    def create_executor(self):
+        if self.executor == "thread":
+            return ThreadPoolExecutor(max_workers=self.cores)
+        if self.executor == "process":
+            return ProcessPoolExecutor(max_workers=self.cores)
+        return self.executor
+
+    def cancel_dependents(self, key):
+        """
+        Cancel the tasks depending, directly or not, on a failed task.
+        """
+        for task in self.tasks.values():
+            if key in task.depends and task.status == "PENDING":
+                task.status = "CANCELLED"
+                self.log(task, [f"[Step] {task.key[-1]:<15} | Status: CANCELLED"])
+                self.cancel_dependents(task.key)
+
+    def log(self, task, lines):
+        prefix = f"[{task.key[0]}] " if len(task.key) > 1 else ""
+        for line in lines:
+            if line:
+                global_log.write(prefix + line)
+
+    def run(self):
+        """
+        Run all tasks.
+
+        Returns:
+            dict: The final status of each task ("SUCCESS", "FAIL", "CANCELLED").
+        """
+        free = {"cores": self.cores, "mem_mb": self.memory_mb, "io": self.io_jobs}
+        locks = set()
+        running = {}
+
+        def fits(task):
+            # A task larger than the whole budget runs alone
+            # 超出总预算的任务在没有其他任务运行时单独执行
+            if not running:
+                return True
+            return (min(task.cores, self.cores) <= free["cores"]
+                    and min(task.mem_mb, self.memory_mb) <= free["mem_mb"]
+                    and min(task.io, self.io_jobs) <= free["io"])
+
+        def hold(task, sign):
+            free["cores"] -= sign * min(task.cores, self.cores)
+            free["mem_mb"] -= sign * min(task.mem_mb, self.memory_mb)
+            free["io"] -= sign * min(task.io, self.io_jobs)
+
+        executor = self.create_executor()
+        try:
+            while True:
+                for task in self.tasks.values():
+                    if task.status != "PENDING" or task.lock in locks:
+                        continue
+                    if any(self.tasks[key].status != "SUCCESS" for key in task.depends):
+                        continue
+                    if not fits(task):
+                        continue
+                    hold(task, 1)
+                    if task.lock is not None:
+                        locks.add(task.lock)
+                    task.status = "RUNNING"
+                    running[executor.submit(task.func, *task.args)] = task
+
+                if not running:
+                    break
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    task = running.pop(future)
+                    hold(task, -1)
+                    locks.discard(task.lock)
+                    try:
+                        self.log(task, future.result())
+                        task.status = "SUCCESS"
+                    except Exception as e:
+                        task.status = "FAIL"
+                        task.error = f"{type(e).__name__}: {e}"
+                        self.log(task, [f"[Step] {task.key[-1]:<15} | Status: FAIL ({task.error})"])
+                        self.cancel_dependents(task.key)
+        finally:
+            if executor is not self.executor:
+                executor.shutdown()
+
+        return {key: task.status for key, task in self.tasks.items()}
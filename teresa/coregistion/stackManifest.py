@@ -0,0 +1,93 @@
+import os
+import re
+import json
+from datetime import datetime
+
+from teresa.utils.atomicWrite import atomic_write
+
+MANIFEST_FILE = "stack_manifest.json"
+
+
+def coreg_done(date_dir):
+    """
+    Check whether the Doris chain of a slave date has completed, i.e. the
+    subtrrefdem flag of its coreg.out is set.
+
+    Parameters:
+        date_dir (str): The working directory of the date.
+
+    Returns:
+        bool: True if the date is done.
+    """
+    coreg_out = os.path.join(date_dir, "coreg.out")
+    if not os.path.exists(coreg_out):
+        return False
+    with open(coreg_out) as f:
+        return re.search(r'^subtr_refdem:\s+1', f.read(), re.MULTILINE) is not None
+
+
+class stackManifest():
+    def __init__(self, workspace):
+        """
+        Record of the dates of a processed stack, kept in the workspace so that
+        an append only has to look at the dates that are not in it yet.
+
+        Parameters:
+            workspace (str): The workspace directory of the stack.
+        """
+        self.workspace = workspace
+        self.path = os.path.join(workspace, MANIFEST_FILE)
+        self.radar_type = None
+        self.master_date = None
+        self.dates = {}
+
+    def load(self):
+        """
+        Load the manifest, or rebuild it from the workspace of a stack processed
+        before the manifest existed.
+
+        Returns:
+            stackManifest: self
+        """
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                manifest = json.load(f)
+            self.radar_type = manifest.get("radar_type")
+            self.master_date = manifest.get("master_date")
+            self.dates = manifest.get("dates", {})
+        else:
+            self.bootstrap()
+        return self
+
+    def bootstrap(self):
+        """
+        Rebuild the manifest from the workspace: the master date from the
+        dorisstack file, and a date is done when its subtrrefdem flag is set.
+        """
+        dorisstack = os.path.join(self.workspace, "dorisstack")
+        if os.path.exists(dorisstack):
+            with open(dorisstack) as f:
+                self.master_date = f.read().strip() or None
+        if not os.path.isdir(self.workspace):
+            return
+        for name in sorted(os.listdir(self.workspace)):
+            coreg_out = os.path.join(self.workspace, name, "coreg.out")
+            if not re.fullmatch(r'\d{8}', name) or name == self.master_date or not os.path.exists(coreg_out):
+                continue
+            self.dates[name] = {"status": "done" if coreg_done(os.path.join(self.workspace, name)) else "failed"}
+
+    def save(self):
+        with atomic_write(self.path) as f:
+            json.dump({"radar_type": self.radar_type,
+                       "master_date": self.master_date,
+                       "updated": datetime.now().isoformat(timespec="seconds"),
+                       "dates": self.dates}, f, indent=2, sort_keys=True)
+
+    def update(self, date, status, meta_path=None, data_path=None):
+        """
+        Record the outcome of a date, "done" or "failed".
+        """
+        self.dates[date] = {"status": status, "meta_path": meta_path, "data_path": data_path}
+
+    def is_done(self, date):
+        return self.dates.get(date, {}).get("status") == "done"
@@ -0,0 +1,159 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from teresa.utils.TeresaLog import global_log
+from teresa.slcStack.stackCatalog import stackCatalog
+from teresa.coregistion.dorisIngest import create_ingest_pool
+from teresa.coregistion.stackManifest import stackManifest, coreg_done
+
+
+class stackWatcher():
+    def __init__(self, coregistion, interval=None, settle=None):
+        """
+        Watch the data directories of a processed stack and coregister each
+        new acquisition once its meta and data files are complete.
+
+        The ingest pool and the DAG executor are created once and kept for
+        the lifetime of the watcher, and the catalog of data_dirs is refreshed
+        incrementally, so a new scene pays neither a pool startup nor a crawl
+        of the whole archive.
+
+        Parameters:
+            coregistion (dorisCoregistion): The coregistration of the stack.
+            interval (float): Seconds between two polls, watch_interval (30) by default.
+            settle (float): Seconds the sizes of a pair must stay unchanged before it
+                            is taken as complete, watch_settle (60) by default.
+        """
+        self.coregistion = coregistion
+        self.slc_stack = coregistion.slc_stack
+        stack_parameters = coregistion.params['stack_parameters']
+        self.interval = float(interval if interval is not None else stack_parameters.get('watch_interval', 30))
+        self.settle = float(settle if settle is not None else stack_parameters.get('watch_settle', 60))
+
+        workspace = self.slc_stack.work_dir + os.sep + "workspace"
+        self.manifest = stackManifest(workspace).load()
+        catalog_path = None
+        if stack_parameters.get('stack_catalog', True):
+            catalog_path = os.path.join(workspace, "stack_catalog.json")
+        self.catalog = stackCatalog(self.slc_stack.data_dir, catalog_path)
+
+        # date -> (meta size, data size, time the sizes were first seen)
+        self.sizes = {}
+        # date -> sizes of the pair when it failed, retried only if they change
+        self.failed = {}
+
+    def pair_sizes(self, meta_path, data_path):
+        try:
+            return os.stat(meta_path).st_size, os.stat(data_path).st_size
+        except OSError:
+            return None
+
+    def poll(self):
+        """
+        Refresh the catalog and find the new pairs whose sizes have been stable
+        for settle seconds. A file growing in place does not change the mtime
+        of its directory, so the candidate pairs are stat'ed directly.
+
+        Returns:
+            list: The dates ready to be processed.
+        """
+        self.catalog.refresh()
+        meta_path_map, data_path_map = self.catalog.path_maps(self.slc_stack.radar_type)
+        now = time.time()
+        ready = []
+        for date in sorted(set(meta_path_map) & set(data_path_map)):
+            if date == self.slc_stack.master_date or self.manifest.is_done(date):
+                continue
+            sizes = self.pair_sizes(meta_path_map[date], data_path_map[date])
+            if sizes is None or sizes[1] == 0 or self.failed.get(date) == sizes:
+                continue
+            seen = self.sizes.get(date)
+            if seen is None or seen[:2] != sizes:
+                self.sizes[date] = (*sizes, now)
+                continue
+            if now - seen[2] >= self.settle:
+                self.slc_stack.meta_path_map[date] = meta_path_map[date]
+                self.slc_stack.data_path_map[date] = data_path_map[date]
+                ready.append(date)
+        return ready
+
+    def process(self, dates):
+        """
+        Ingest and process the ready dates and record them in the manifest.
+        """
+        coregistion = self.coregistion
+        for date in dates:
+            if date not in self.slc_stack.dates:
+                self.slc_stack.dates.append(date)
+            coregistion.create_date_dir(date)
+        self.slc_stack.dates.sort()
+        global_log.task_count += len(dates)
+
+        coregistion.failed_dates.difference_update(dates)
+        try:
+            coregistion.process_slaves(dates)
+        except Exception as e:
+            # Keep watching: the dates not recorded as done are marked failed
+            # 继续监视：未完成的日期记为失败
+            global_log.write(f"Processing {', '.join(dates)} failed: {type(e).__name__}: {e}")
+            workspace = self.manifest.workspace
+            coregistion.failed_dates.update(date for date in dates
+                                            if not coreg_done(os.path.join(workspace, date)))
+        finally:
+            coregistion.update_manifest(dates, self.manifest)
+            for date in dates:
+                sizes = self.sizes.pop(date)[:2]
+                if date in coregistion.failed_dates:
+                    self.failed[date] = sizes
+                else:
+                    self.failed.pop(date, None)
+
+    def run(self, max_polls=None):
+        """
+        Poll until interrupted (or max_polls polls), processing each batch of
+        new dates as it becomes ready.
+
+        Parameters:
+            max_polls (int): Stop after this number of polls, None to run forever.
+        """
+        coregistion = self.coregistion
+        stack_parameters = coregistion.params['stack_parameters']
+        master_res_path = self.manifest.workspace + os.sep + "master" + os.sep + "master.res"
+        if self.manifest.master_date is None or not os.path.exists(master_res_path):
+            raise FileNotFoundError(f"No processed stack found in {self.manifest.workspace}, run coregister first.")
+        if self.manifest.master_date != self.slc_stack.master_date:
+            raise ValueError(f"Master date {self.slc_stack.master_date} differs from the master "
+                             f"{self.manifest.master_date} of the existing stack.")
+        coregistion.write_params_to_dorisin()
+
+        workers = max(1, int(stack_parameters.get('ingest_workers', 1)))
+        io_jobs = int(stack_parameters.get('io_jobs', workers))
+        coregistion.ingest_pool = create_ingest_pool(workers, io_jobs)
+        if stack_parameters.get('scheduler') == 'dag':
+            cores = int(stack_parameters.get('cores') or os.cpu_count() or 1)
+            if stack_parameters.get('executor', 'thread') == 'process':
+                coregistion.executor = ProcessPoolExecutor(max_workers=cores)
+            else:
+                coregistion.executor = ThreadPoolExecutor(max_workers=cores)
+
+        global_log.write(f"Watching {self.slc_stack.data_dir} every {self.interval:g} s")
+        polls = 0
+        try:
+            while max_polls is None or polls < max_polls:
+                started = time.time()
+                dates = self.poll()
+                if dates:
+                    global_log.write(f"New dates: {', '.join(dates)}")
+                    self.process(dates)
+                polls += 1
+                if max_polls is None or polls < max_polls:
+                    time.sleep(max(0.0, self.interval - (time.time() - started)))
+        except KeyboardInterrupt:
+            global_log.write("Watch stopped.")
+        finally:
+            coregistion.ingest_pool.shutdown()
+            coregistion.ingest_pool = None
+            if coregistion.executor is not None:
+                coregistion.executor.shutdown()
+                coregistion.executor = None
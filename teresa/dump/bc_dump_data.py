@@ -5,12 +5,17 @@
 # with open(activate_venv_path) as f:
 #     exec(f.read(), {'__file__': activate_venv_path})
 
+import io
 import os
 import sys
 import warnings
 import rasterio
 import numpy as np
 from datetime import datetime
+from rasterio.windows import Window
+
+from teresa.dump.dump_utils import DEFAULT_MEMORY_MB, block_lines, iter_row_blocks, write_complex_short
+from teresa.utils.atomicWrite import atomic_path, atomic_write
 # from SarSpectrum import SarSpectrum
 
 """
@@ -30,29 +35,32 @@ def bc3_to_data(
     lN: int = None,
     p0: int = None,
     pN: int = None,
+    memory_mb: int = DEFAULT_MEMORY_MB,
 ) -> tuple:
 
     if not os.path.exists(filein):
         raise FileNotFoundError("File {} not found!".format(filein))
 
     with rasterio.open(filein) as src:
-        w = src.read()
-
-    if l0 is None:
-        l0 = 1
-    if lN is None:
-        lN = src.height
-    if p0 is None:
-        p0 = 1
-    if pN is None:
-        pN = src.width
-
-    with open(fileout, "wb") as fout:
-        for ln in range(l0 - 1, lN):
-            cdata = np.empty((pN - p0 + 1) * 2, dtype="<i2")
-            cdata[0::2] = w[0, ln, p0 - 1: pN].real
-            cdata[1::2] = w[0, ln, p0 - 1: pN].imag
-            cdata.tofile(fout)
+        if l0 is None:
+            l0 = 1
+        if lN is None:
+            lN = src.height
+        if p0 is None:
+            p0 = 1
+        if pN is None:
+            pN = src.width
+
+        # stream the complex band window by window to bound the memory
+        width = pN - p0 + 1
+        # complex_int16 is not a numpy type; rasterio reads it as complex64
+        row_bytes = np.dtype(np.complex64).itemsize * width + width * 4
+        nlines = block_lines(row_bytes, memory_mb)
+
+        with open(fileout, "wb") as fout:
+            for row, nrows in iter_row_blocks(l0, lN, nlines):
+                w = src.read(1, window=Window(p0 - 1, row, width, nrows))
+                write_complex_short(fout, w.real, w.imag)
 
     return lN - l0 + 1, pN - p0 + 1
 
@@ -65,7 +73,12 @@ def bc3_to_res(resFile: str, l0: int, lN: int, p0: int, pN: int) -> bool:
         raise FileNotFoundError()
 
     # check whether the file exist
-    outStream = open(resFile, "a")
+    inputStream = open(resFile, "r")
+    textStream = inputStream.read()
+    inputStream.close()
+
+    # build the crop block in memory, the res file is written once below
+    outStream = io.StringIO()
 
     outStream.write("\n")
     outStream.write("**************************************************\n")
@@ -87,17 +100,11 @@ def bc3_to_res(resFile: str, l0: int, lN: int, p0: int, pN: int) -> bool:
     outStream.write("    Current time: {}\n".format(datetime.now))
     outStream.write("\n")
 
-    outStream.close()
-
     # replace crop tag in result file from 0 (not done) to 1 (done)
     sourceText = "crop:			0"
     replaceText = "crop:			1"
-    inputStream = open(resFile, "r")
-    textStream = inputStream.read()
-    inputStream.close()
-    outputStream = open(resFile, "w")
-    outputStream.write(textStream.replace(sourceText, replaceText))
-    outputStream.close()
+    with atomic_write(resFile) as outputStream:
+        outputStream.write(textStream.replace(sourceText, replaceText) + outStream.getvalue())
 
     return True
 
@@ -114,13 +121,17 @@ def bc3_to_res(resFile: str, l0: int, lN: int, p0: int, pN: int) -> bool:
 #     print("        pN               is the last range pixel")
 
 
-def bc_dump_data(source_data_path, work_dir):
+def bc_dump_data(source_data_path, work_dir, memory_mb=DEFAULT_MEMORY_MB, window=None):
 
     target_data_path = os.path.join(work_dir, "image.raw")
-    l0, lN, p0, pN = None, None, None, None  # type:ignore
+    # crop window (l0, lN, p0, pN) of the AOI, or the full scene
+    l0, lN, p0, pN = window if window is not None else (None, None, None, None)  # type:ignore
 
     # read LT1 file
-    az_lines, ra_samples = bc3_to_data(source_data_path, target_data_path, l0, lN, p0, pN)
+    # write to a temporary file renamed onto image.raw once complete
+    with atomic_path(target_data_path) as tmp_data_path:
+        az_lines, ra_samples = bc3_to_data(source_data_path, tmp_data_path, l0, lN, p0, pN,
+                                           memory_mb=memory_mb)
 
     # ------------------ Plot is Optional -----------------------------------
 
@@ -12,6 +12,8 @@ from typing import Any, Dict
 from xml.etree import ElementTree
 from datetime import datetime, timedelta
 
+from teresa.utils.atomicWrite import atomic_write
+
 
 SPEED_OF_LIGHT = 299792458
 
@@ -483,7 +485,7 @@ def bc_dump_header2doris(source_meta_path, work_dir):
     bc = BC()
 
     bc.meta["path"] = source_meta_path
-    with open(result_file, "w") as f:
+    with atomic_write(result_file) as f:
         with redirect_stdout(f):
             bc.usage()
             bc.read_meta()
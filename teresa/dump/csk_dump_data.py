@@ -1,7 +1,12 @@
+import io
 import os
 import h5py
+import numpy as np
 from datetime import datetime
 
+from teresa.dump.dump_utils import DEFAULT_MEMORY_MB, block_lines, iter_row_blocks
+from teresa.utils.atomicWrite import atomic_path, atomic_write
+
 def csk_to_res(res_file, l0, lN, p0, pN):
     """
     将 crop (裁剪) 块信息追加写入到 Doris 的 res 文件中。
@@ -9,39 +14,129 @@ def csk_to_res(res_file, l0, lN, p0, pN):
     """
     fileout = "image.raw"
     
-    # 确保以追加模式(a)打开，这样不会覆盖 header2doris 写入的头部信息
-    with open(res_file, "a") as outStream:
-        outStream.write("\n")
-        outStream.write("**************************************************\n")
-        outStream.write("*_Start_crop:			CSK\n")
-        outStream.write("**************************************************\n")
-        outStream.write(f"Data_output_file: 	{fileout}\n")
-        outStream.write("Data_output_format: 			complex_short\n")
-        outStream.write(f"First_line (w.r.t. original_image): 	{l0}\n")
-        outStream.write(f"Last_line (w.r.t. original_image): 	{lN}\n")
-        outStream.write(f"First_pixel (w.r.t. original_image): 	{p0}\n")
-        outStream.write(f"Last_pixel (w.r.t. original_image): 	{pN}\n")
-        outStream.write("**************************************************\n")
-        outStream.write("* End_crop:_NORMAL\n")
-        outStream.write("**************************************************\n")
-        outStream.write("\n")
-        outStream.write(f"    Current time: {datetime.now()}\n")
-        outStream.write("\n")
-
-    # 替换 res 文件头部的 process_control 状态标识 (将 crop: 0 改为 1)
+    # 读入 header2doris 写入的头部信息，裁剪块追加在其后，不覆盖原有内容
+    textStream = ""
     if os.path.exists(res_file):
         with open(res_file, "r") as inputStream:
             textStream = inputStream.read()
-        sourceText = "crop:\t\t0"
-        replaceText = "crop:\t\t1"
-        if sourceText in textStream:
-            with open(res_file, "w") as outputStream:
-                outputStream.write(textStream.replace(sourceText, replaceText))
 
-def csk_dump_data(source_data_path, work_dir):
+    # 在内存中生成裁剪块，res 文件在下面一次性原子写入
+    outStream = io.StringIO()
+    outStream.write("\n")
+    outStream.write("**************************************************\n")
+    outStream.write("*_Start_crop:			CSK\n")
+    outStream.write("**************************************************\n")
+    outStream.write(f"Data_output_file: 	{fileout}\n")
+    outStream.write("Data_output_format: 			complex_short\n")
+    outStream.write(f"First_line (w.r.t. original_image): 	{l0}\n")
+    outStream.write(f"Last_line (w.r.t. original_image): 	{lN}\n")
+    outStream.write(f"First_pixel (w.r.t. original_image): 	{p0}\n")
+    outStream.write(f"Last_pixel (w.r.t. original_image): 	{pN}\n")
+    outStream.write("**************************************************\n")
+    outStream.write("* End_crop:_NORMAL\n")
+    outStream.write("**************************************************\n")
+    outStream.write("\n")
+    outStream.write(f"    Current time: {datetime.now()}\n")
+    outStream.write("\n")
+
+    # 替换 res 文件头部的 process_control 状态标识 (将 crop: 0 改为 1)，并追加裁剪块
+    sourceText = "crop:\t\t0"
+    replaceText = "crop:\t\t1"
+    with atomic_write(res_file) as outputStream:
+        outputStream.write(textStream.replace(sourceText, replaceText) + outStream.getvalue())
+
+def csk_to_data(sbi_dataset, fileout, memory_mb=DEFAULT_MEMORY_MB, window=None):
+    """
+    按 HDF5 的 chunk 布局分块流式读取 SBI 数据集，并逐块写入 image.raw。
+    使用 read_direct 读入可复用的预分配缓存，内存占用与景大小无关。
+    window 为裁剪窗口 (l0, lN, p0, pN)（从 1 开始），为 None 时导出整景。
+
+    返回 (行数, 列数)。
+    """
+    l0, lN, p0, pN = window if window is not None else (1, sbi_dataset.shape[0], 1, sbi_dataset.shape[1])
+    shape = (lN - l0 + 1, pN - p0 + 1) + sbi_dataset.shape[2:]
+    row_bytes = int(np.prod(shape[1:])) * sbi_dataset.dtype.itemsize
+    nlines = block_lines(row_bytes, memory_mb)
+
+    # 块的行数按 chunk 的行数对齐，块的边界落在 chunk 边界上（裁剪窗口的第一块相应缩短），
+    # 保证每个 chunk 只被读取、解压一次
+    chunk_lines = 1
+    if sbi_dataset.chunks is not None:
+        chunk_lines = sbi_dataset.chunks[0]
+        if nlines < chunk_lines:
+            # 一个 chunk 行带已超过内存上限，缓存按一个 chunk 行带分配
+            print(f"一个 chunk 行带 ({chunk_lines} 行, {chunk_lines * row_bytes / 2**20:.1f} MB) "
+                  f"超过内存上限 {memory_mb} MB，缓存提高为一个 chunk 行带")
+        nlines = max(chunk_lines, nlines // chunk_lines * chunk_lines)
+
+    # 读入时统一转换为小端 int16，即 Doris 的 complex_short 格式
+    buffer = np.empty((min(nlines, shape[0]),) + shape[1:], dtype="<i2")
+    with open(fileout, 'wb') as out_f:
+        for row, nrows in iter_row_blocks(l0, lN, nlines, align=chunk_lines):
+            sbi_dataset.read_direct(buffer, np.s_[row:row + nrows, p0 - 1:pN], np.s_[0:nrows])
+            buffer[:nrows].tofile(out_f)
+
+    return shape[0], shape[1]
+
+
+def csk_contiguous_offset(sbi_dataset):
+    """
+    若 SBI 数据集为连续存储、未压缩的小端 int16，其字节已经是 complex_short
+    格式，返回数据在 HDF5 文件中的字节偏移；否则返回 None。
+    """
+    if sbi_dataset.chunks is not None or sbi_dataset.compression is not None:
+        return None
+    if sbi_dataset.external or sbi_dataset.dtype != np.dtype("<i2"):
+        return None
+    # 数据尚未分配存储空间时 get_offset 返回 None
+    return sbi_dataset.id.get_offset()
+
+
+def csk_copy_range(filein, fileout, offset, nbytes):
+    """
+    在内核中把 filein 中 [offset, offset + nbytes) 的字节直接复制为 fileout，
+    数据不经过 Python。优先使用 copy_file_range（支持的文件系统上会自动 reflink），
+    其次使用 sendfile。
+
+    返回所用的复制方式；两者都不可用时返回 None。
+    """
+    with open(filein, 'rb') as in_f, open(fileout, 'wb') as out_f:
+        in_fd, out_fd = in_f.fileno(), out_f.fileno()
+        copied = 0
+
+        if hasattr(os, "copy_file_range"):
+            try:
+                while copied < nbytes:
+                    n = os.copy_file_range(in_fd, out_fd, nbytes - copied, offset + copied, copied)
+                    if n == 0:
+                        break
+                    copied += n
+            except OSError:
+                pass
+            if copied == nbytes:
+                return "copy_file_range"
+
+        if hasattr(os, "sendfile"):
+            try:
+                os.lseek(out_fd, copied, os.SEEK_SET)
+                while copied < nbytes:
+                    n = os.sendfile(out_fd, in_fd, offset + copied, nbytes - copied)
+                    if n == 0:
+                        break
+                    copied += n
+            except OSError:
+                pass
+            if copied == nbytes:
+                return "sendfile"
+
+    return None
+
+
+def csk_dump_data(source_data_path, work_dir, memory_mb=DEFAULT_MEMORY_MB, window=None):
     """
     从 CSK HDF5 文件中提取纯二进制 SLC 数据，并更新 Doris 记录。
-    接口已完全对齐 teresa 规范。
+    接口已完全对齐 teresa 规范，memory_mb 为分块读写缓存的内存上限（MB），
+    window 为 AOI 对应的裁剪窗口 (l0, lN, p0, pN)，为 None 时导出整景。
     """
     print(f"正在读取 CSK 数据: {source_data_path}")
     
@@ -57,15 +152,32 @@ def csk_dump_data(source_data_path, work_dir):
             shape = sbi_dataset.shape
             print(f"找到数据集 S01/SBI, 形状: {shape}, 类型: {sbi_dataset.dtype}")
             
+            l0, lN = 1, shape[0]
+            p0, pN = 1, shape[1]
+            if window is not None:
+                l0, lN, p0, pN = window
+
             # 1. 生成纯二进制文件
-            with open(target_data_path, 'wb') as out_f:
-                out_f.write(sbi_dataset[:].tobytes())
+            # 连续存储且未压缩时，直接在内核中按字节范围复制；否则分块流式写入
+            # 裁剪窗口覆盖整行时，所选行在文件中仍是连续的字节范围
+            # 先写入临时文件，完整写出后再原子重命名为 image.raw
+            with atomic_path(target_data_path) as tmp_data_path:
+                method = None
+                offset = csk_contiguous_offset(sbi_dataset)
+                if offset is not None and p0 == 1 and pN == shape[1]:
+                    row_bytes = sbi_dataset.nbytes // shape[0]
+                    method = csk_copy_range(source_data_path, tmp_data_path,
+                                            offset + (l0 - 1) * row_bytes, (lN - l0 + 1) * row_bytes)
+                if method is not None:
+                    print(f"数据集为连续存储，使用零拷贝方式 ({method}) 导出")
+                else:
+                    print(f"数据集无法零拷贝（chunks={sbi_dataset.chunks}, compression={sbi_dataset.compression}, "
+                          f"dtype={sbi_dataset.dtype.str}），使用分块流式方式导出")
+                    csk_to_data(sbi_dataset, tmp_data_path, memory_mb=memory_mb, window=(l0, lN, p0, pN))
                 
             print(f"数据已成功 Dump 至: {target_data_path}")
             
             # 2. 将数据矩阵的边界信息写入 slave.res
-            l0, lN = 1, shape[0]
-            p0, pN = 1, shape[1]
             csk_to_res(res_file, l0, lN, p0, pN)
             print(f"Crop 参数已成功追加至: {res_file}")
 
@@ -3,6 +3,8 @@ import h5py
 from datetime import datetime
 from contextlib import redirect_stdout
 
+from teresa.utils.atomicWrite import atomic_write
+
 def extract_csk_meta(h5_file_path):
     """提取 CSK 参数并进行单位换算，以适配 Doris 格式"""
     meta = {}
@@ -44,6 +46,19 @@ def extract_csk_meta(h5_file_path):
         meta["Scene_centre_latitude"] = lat
         meta["Scene_centre_longitude"] = lon
         meta["Scene location"] = f"lat: {lat} lon: {lon}"
+        meta["Orbit_direction"] = direction
+
+        # 四角点经纬度（目录索引使用，不写入 res 文件）
+        corner_lats, corner_lons = [], []
+        corner_attrs = f['S01/SBI'].attrs if 'S01/SBI' in f else {}
+        for corner in ('Top Left', 'Top Right', 'Bottom Right', 'Bottom Left'):
+            name = f'{corner} Geodetic Coordinates'
+            coords = corner_attrs.get(name, f.attrs.get(name))
+            if coords is not None and len(coords) >= 2:
+                corner_lats.append(float(coords[0]))
+                corner_lons.append(float(coords[1]))
+        meta["Scene_corner_latitude"] = corner_lats or [lat]
+        meta["Scene_corner_longitude"] = corner_lons or [lon]
         
         meta["Leader file"] = meta["Volume file"]
         meta["Sensor platform mission identifer"] = f.attrs.get('Satellite ID', b'Unknown').decode('utf-8')
@@ -202,7 +217,7 @@ def csk_dump_header2doris(source_meta_path, work_dir):
     result_file = os.path.join(work_dir, "slave.res")
     meta = extract_csk_meta(source_meta_path)
     
-    with open(result_file, "w") as f:
+    with atomic_write(result_file) as f:
         with redirect_stdout(f):
             write_res_file(meta)
             
@@ -1,20 +1,28 @@
-from teresa.dump.lt1_dump_data import lt1_dump_data
-from teresa.dump.lt1_dump_header2doris import lt1_dump_header2doris
-
-from teresa.dump.bc_dump_data import bc_dump_data
-from teresa.dump.bc_dump_header2doris import bc_dump_header2doris
-
-from teresa.dump.csk_dump_data import csk_dump_data
-from teresa.dump.csk_dump_header2doris import csk_dump_header2doris
-
-dump_header2doris_funcs = {
-    'LT1': lt1_dump_header2doris,
-    'BC': bc_dump_header2doris,
-    'CSK': csk_dump_header2doris,
-}
-
-dump_data_funcs = {
-    'LT1': lt1_dump_data,
-    'BC': bc_dump_data,
-    'CSK': csk_dump_data,
-}
+from collections.abc import Mapping
+
+from teresa.dump.sensor_reader import sensor_readers
+
+
+class _readerFuncMap(Mapping):
+    """
+    radar type -> bound method of its SensorReader. The reader module (and its
+    h5py/rasterio imports) is only loaded when the radar type is selected.
+    """
+    def __init__(self, method):
+        self.method = method
+
+    def __getitem__(self, radar_type):
+        return getattr(sensor_readers[radar_type](), self.method)
+
+    def __iter__(self):
+        return iter(sensor_readers)
+
+    def __len__(self):
+        return len(sensor_readers)
+
+
+# Header and data functions of each radar type, delegating to the sensor readers
+# 各雷达类型的头文件和数据读取函数，由传感器读取器提供
+dump_header2doris_funcs = _readerFuncMap("dump_header")
+
+dump_data_funcs = _readerFuncMap("dump_data")
@@ -5,12 +5,17 @@ import os
 # with open(activate_venv_path) as f:
 #     exec(f.read(), {'__file__': activate_venv_path})
 
+import io
 import os
 import sys
 import warnings
 import rasterio
 import numpy as np
 from datetime import datetime
+from rasterio.windows import Window
+
+from teresa.dump.dump_utils import DEFAULT_MEMORY_MB, block_lines, iter_row_blocks, write_complex_short
+from teresa.utils.atomicWrite import atomic_path, atomic_write
 
 """
 LT1_DUMP_DATA() reads the LuTan-1 format SLC data, and writes to disk the
@@ -29,9 +34,13 @@ def lt1_to_data(
     lN: int = None,
     p0: int = None,
     pN: int = None,
+    memory_mb: int = DEFAULT_MEMORY_MB,
 ) -> tuple:
     """Convert LT1 data to DORIS format
 
+    The raster is streamed block by block through rasterio windows, so the
+    peak memory is bounded by ``memory_mb`` regardless of the scene size.
+
     Parameters
     ----------
     filein : str
@@ -46,6 +55,8 @@ def lt1_to_data(
         First pixel to read (1-based), by default None
     pN : int, optional
         Last pixel to read, by default None
+    memory_mb : int, optional
+        Memory ceiling (MB) for the read buffers, by default DEFAULT_MEMORY_MB
 
     Returns
     -------
@@ -57,24 +68,24 @@ def lt1_to_data(
         raise FileNotFoundError("File {} not found!".format(filein))
 
     with rasterio.open(filein) as src:
-        w = src.read()
-
-    if l0 is None:
-        l0 = 1
-    if lN is None:
-        lN = src.height
-    if p0 is None:
-        p0 = 1
-    if pN is None:
-        pN = src.width
-
-
-    with open(fileout, "wb") as fout:
-        for ln in range(l0 - 1, lN):
-            cdata = np.empty((pN - p0 + 1) * 2, dtype="<i2")
-            cdata[0::2] = w[0, ln, p0 - 1: pN]
-            cdata[1::2] = w[1, ln, p0 - 1: pN]
-            cdata.tofile(fout)
+        if l0 is None:
+            l0 = 1
+        if lN is None:
+            lN = src.height
+        if p0 is None:
+            p0 = 1
+        if pN is None:
+            pN = src.width
+
+        # bytes per line: all bands of the window plus the interleaved output
+        width = pN - p0 + 1
+        row_bytes = sum(np.dtype(dt).itemsize for dt in src.dtypes) * width + width * 4
+        nlines = block_lines(row_bytes, memory_mb)
+
+        with open(fileout, "wb") as fout:
+            for row, nrows in iter_row_blocks(l0, lN, nlines):
+                w = src.read(window=Window(p0 - 1, row, width, nrows))
+                write_complex_short(fout, w[0], w[1])
 
     return lN - l0 + 1, pN - p0 + 1
 
@@ -107,8 +118,12 @@ def lt1_to_res(resFile: str, l0: int, lN: int, p0: int, pN: int) -> bool:
         raise FileNotFoundError()
 
     # check whether the file exist
-    
-    outStream = open(resFile, "a")
+    inputStream = open(resFile, "r")
+    textStream = inputStream.read()
+    inputStream.close()
+
+    # build the crop block in memory, the res file is written once below
+    outStream = io.StringIO()
 
     outStream.write("\n")
     outStream.write("**************************************************\n")
@@ -121,8 +136,8 @@ def lt1_to_res(resFile: str, l0: int, lN: int, p0: int, pN: int) -> bool:
     outStream.write("Last_line (w.r.t. original_image): 	%s\n" % lN)
     outStream.write("First_pixel (w.r.t. original_image): 	%s\n" % p0)
     outStream.write("Last_pixel (w.r.t. original_image): 	%s\n" % pN)
-    outStream.write("Number of lines (non-multilooked): 	%s\n" % lN)
-    outStream.write("Number of pixels (non-multilooked): 	%s\n" % pN)
+    outStream.write("Number of lines (non-multilooked): 	%s\n" % (lN - l0 + 1))
+    outStream.write("Number of pixels (non-multilooked): 	%s\n" % (pN - p0 + 1))
 
     outStream.write("**************************************************\n")
     outStream.write("* End_crop:_NORMAL\n")
@@ -132,26 +147,25 @@ def lt1_to_res(resFile: str, l0: int, lN: int, p0: int, pN: int) -> bool:
     outStream.write("    Current time: {}\n".format(datetime.now()))
     outStream.write("\n")
 
-    outStream.close()
-
+    # replace crop tag in result file from 0 (not done) to 1 (done)
     sourceText = "crop:			0"
     replaceText = "crop:			1"
-    inputStream = open(resFile, "r")
-    textStream = inputStream.read()
-    inputStream.close()
-    outputStream = open(resFile, "w")
-    outputStream.write(textStream.replace(sourceText, replaceText))
-    outputStream.close()
+    with atomic_write(resFile) as outputStream:
+        outputStream.write(textStream.replace(sourceText, replaceText) + outStream.getvalue())
 
     return True
 
-def lt1_dump_data(source_data_path, work_dir):
+def lt1_dump_data(source_data_path, work_dir, memory_mb=DEFAULT_MEMORY_MB, window=None):
 
     target_data_path = os.path.join(work_dir, "image.raw")
-    l0, lN, p0, pN = None, None, None, None  
+    # crop window (l0, lN, p0, pN) of the AOI, or the full scene
+    l0, lN, p0, pN = window if window is not None else (None, None, None, None)
 
     # read LT1 file
-    az_lines, ra_samples = lt1_to_data(source_data_path, target_data_path, l0, lN, p0, pN)
+    # write to a temporary file renamed onto image.raw once complete
+    with atomic_path(target_data_path) as tmp_data_path:
+        az_lines, ra_samples = lt1_to_data(source_data_path, tmp_data_path, l0, lN, p0, pN,
+                                           memory_mb=memory_mb)
 
     if l0 is None and lN is None and p0 is None and pN is None:
         l0: int = 1
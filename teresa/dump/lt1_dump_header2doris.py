@@ -16,6 +16,8 @@ from typing import Any, Dict
 from xml.etree import ElementTree
 from datetime import datetime, timedelta
 
+from teresa.utils.atomicWrite import atomic_write
+
 
 SPEED_OF_LIGHT = 299792458
 TIME_OFFSET = 8  # time offset between UTC and external orbit file
@@ -425,7 +427,7 @@ def lt1_dump_header2doris(source_meta_path, work_dir):
     result_file = os.path.join(work_dir, "slave.res")
     lt1 = LT1()
     lt1.meta["path"] = source_meta_path
-    with open(result_file, "w") as f:
+    with atomic_write(result_file) as f:
         with redirect_stdout(f):
             lt1.usage()
             lt1.read_meta().update_external_orbit().export2res()
\ No newline at end of file
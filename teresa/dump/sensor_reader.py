@@ -0,0 +1,141 @@
+"""
+Sensor reader plugins.
+
+A sensor is described by a SensorReader subclass: the file name patterns of
+its meta and data files, the functions converting them for Doris, and the
+capabilities ingest uses to pick the fastest dump path. The built-in readers
+are defined below; third-party packages register theirs under the
+``teresa.sensors`` entry point group, e.g. in pyproject.toml::
+
+    [project.entry-points."teresa.sensors"]
+    SAOCOM = "teresa_saocom.reader:SAOCOMReader"
+
+A reader module is imported when the sensors are listed. Keep its heavy
+imports (h5py, rasterio, GDAL, ...) inside the dump functions, as the
+built-in readers do through their "module:function" specs.
+"""
+from importlib.metadata import entry_points
+
+from teresa.utils.lazyRegistry import lazyRegistry, load_object
+
+ENTRY_POINT_GROUP = "teresa.sensors"
+
+
+class SensorReader():
+    """
+    Base class of the sensor readers.
+
+    Attributes:
+        name (str): Radar type key, e.g. "LT1".
+        meta_pattern (str): Regex matching the meta file names.
+        data_pattern (str): Regex matching the data file names.
+        date_pattern (dict): {"meta": regex, "data": regex}, the first group
+            being the acquisition date (YYYYMMDD).
+        header_func (str | callable): Converts the meta file into slave.res,
+            called as header_func(meta_path, work_dir).
+        data_func (str | callable): Dumps the data into image.raw, called as
+            data_func(data_path, work_dir, memory_mb=..., window=...).
+        record_func (str | callable): Reads the acquisition record of the
+            catalog from the meta file, None if not supported.
+        supports_window_read (bool): The data function reads only the crop
+            window, so ingest computes the AOI window before the dump.
+        supports_zero_copy (bool): Full-row windows are copied byte for byte
+            (no decoding) when the file layout allows it.
+        native_layout (str): Sample layout of the data file: "complex_short"
+            when it already is the Doris image.raw format (little-endian
+            interleaved int16), "complex_int16" for a GDAL CInt16 band,
+            "iq_bands" for separate I and Q bands.
+    """
+    name = None
+    meta_pattern = None
+    data_pattern = None
+    date_pattern = None
+    header_func = None
+    data_func = None
+    record_func = None
+
+    supports_window_read = False
+    supports_zero_copy = False
+    native_layout = None
+
+    def _func(self, attr):
+        # Read from the class, so a plain function is not bound to the reader
+        spec = getattr(type(self), attr)
+        return load_object(spec) if isinstance(spec, str) else spec
+
+    def dump_header(self, meta_path, work_dir):
+        return self._func("header_func")(meta_path, work_dir)
+
+    def dump_data(self, data_path, work_dir, memory_mb=None, window=None):
+        kwargs = {"window": window}
+        if memory_mb is not None:
+            kwargs["memory_mb"] = memory_mb
+        return self._func("data_func")(data_path, work_dir, **kwargs)
+
+    def read_record(self, meta_path):
+        if self.record_func is None:
+            raise NotImplementedError(f"The {self.name} reader does not support the acquisition catalog.")
+        return self._func("record_func")(meta_path)
+
+
+class LT1Reader(SensorReader):
+    name = "LT1"
+    meta_pattern = r'^LT1.*\.meta\.xml$'
+    data_pattern = r'^LT1.*\.tiff$'
+    date_pattern = {"meta": r'LT1.*_(20\d{6})', "data": r'LT1.*_(20\d{6})'}
+    header_func = "teresa.dump.lt1_dump_header2doris:lt1_dump_header2doris"
+    data_func = "teresa.dump.lt1_dump_data:lt1_dump_data"
+    record_func = "teresa.slcStack.acquisitionCatalog:read_lt1"
+    supports_window_read = True
+    native_layout = "iq_bands"
+
+
+class BCReader(SensorReader):
+    name = "BC"
+    meta_pattern = r'^bc.*\.xml$'
+    data_pattern = r'^bc.*\.tiff$'
+    date_pattern = {"meta": r'bc.*(20\d{6})', "data": r'bc.*(20\d{6})'}
+    header_func = "teresa.dump.bc_dump_header2doris:bc_dump_header2doris"
+    data_func = "teresa.dump.bc_dump_data:bc_dump_data"
+    record_func = "teresa.slcStack.acquisitionCatalog:read_bc"
+    supports_window_read = True
+    native_layout = "complex_int16"
+
+
+class CSKReader(SensorReader):
+    name = "CSK"
+    meta_pattern = r'^CSK.*\.h5$'
+    data_pattern = r'^CSK.*\.h5$'
+    date_pattern = {"meta": r'_(20\d{6})\d{6}_', "data": r'_(20\d{6})\d{6}_'}
+    header_func = "teresa.dump.csk_dump_header2doris:csk_dump_header2doris"
+    data_func = "teresa.dump.csk_dump_data:csk_dump_data"
+    record_func = "teresa.slcStack.acquisitionCatalog:read_csk"
+    supports_window_read = True
+    supports_zero_copy = True
+    native_layout = "complex_short"
+
+
+def _load_sensor_readers():
+    registry = lazyRegistry({reader.name: reader for reader in (LT1Reader, BCReader, CSKReader)})
+    # Plugins may add sensors or replace a built-in reader
+    # 插件可以新增传感器，也可以替换内置的读取器
+    for entry_point in entry_points(group=ENTRY_POINT_GROUP):
+        registry.register(entry_point.name, entry_point.value)
+    return registry
+
+
+# Radar type -> SensorReader subclass, plugin modules imported on lookup
+# 雷达类型 -> SensorReader 子类，插件模块在查找时才导入
+sensor_readers = _load_sensor_readers()
+
+
+def get_sensor_reader(radar_type):
+    """
+    Get the reader of a radar type.
+
+    Returns:
+        SensorReader: An instance of the reader.
+    """
+    if radar_type not in sensor_readers:
+        raise ValueError(f"No sensor reader registered for radar type {radar_type}.")
+    return sensor_readers[radar_type]()
@@ -1,10 +1,20 @@
 import os
 
-from teresa.slcStack.dorisSlcStack import dorisSlcStack
-from teresa.slcStack.snapSlcStack import snapSlcStack  
-
-from teresa.coregistion.dorisCoregistion import dorisCoregistion
-from teresa.coregistion.snapCoregistion import snapCoregistion
+from teresa.utils.lazyRegistry import lazyRegistry
+
+# Engines selected by the name of the parameter file. The modules of an
+# engine are only imported when it is selected, so a Doris run does not
+# import the SNAP side (and the other way round).
+# 按参数文件名选择处理引擎，引擎的模块在选用时才导入
+slc_stack_engines = lazyRegistry({
+    'snap.parms': 'teresa.slcStack.snapSlcStack:snapSlcStack',
+    'doris.parms': 'teresa.slcStack.dorisSlcStack:dorisSlcStack',
+})
+
+coregistion_engines = lazyRegistry({
+    'snap.parms': 'teresa.coregistion.snapCoregistion:snapCoregistion',
+    'doris.parms': 'teresa.coregistion.dorisCoregistion:dorisCoregistion',
+})
 
 def createSlcStack(parms_path):
     """
@@ -22,10 +32,8 @@ def createSlcStack(parms_path):
     
     parms_file_name = os.path.basename(parms_path)
 
-    if parms_file_name == 'snap.parms':
-        return snapSlcStack(parms)
-    elif parms_file_name == 'doris.parms':
-        return dorisSlcStack(parms)
+    if parms_file_name in slc_stack_engines:
+        return slc_stack_engines[parms_file_name](parms)
     else:
         raise ValueError("The specified filename is incorrect. Please verify and try again.")
 
@@ -47,10 +55,8 @@ def createCoregistion(parms_path, slc_stack):
     
     parms_file_name = os.path.basename(parms_path)
 
-    if parms_file_name == 'snap.parms':
-        return snapCoregistion(parms, slc_stack)
-    elif parms_file_name == 'doris.parms':
-        return dorisCoregistion(parms, slc_stack)
+    if parms_file_name in coregistion_engines:
+        return coregistion_engines[parms_file_name](parms, slc_stack)
     else:
         raise ValueError("The specified filename is incorrect. Please verify and try again.")
 
@@ -3,237 +3,163 @@ import re
 import glob
 import subprocess
 from teresa.utils.TeresaLog import global_log
-from teresa.utils.geocode._geocode import run_geocode_forward
+from teresa.processor.dorisStepCache import dorisStepCache
+
+# process_control flag of each step and the res file holding it
+STEP_FLAGS = {
+    "coarseorb":   ("coarse_orbits", "coreg.out"),
+    "coarsecorr":  ("coarse_correl", "coreg.out"),
+    "fine":        ("fine_coreg", "coreg.out"),
+    "coregpm":     ("comp_coregpm", "coreg.out"),
+    "resample":    ("resample", "slave.res"),
+    "interfero":   ("interfero", "coreg.out"),
+    "comprefpha":  ("comp_refphase", "coreg.out"),
+    "subtrrefpha": ("subtr_refphase", "coreg.out"),
+    "comprefdem":  ("comp_refdem", "coreg.out"),
+    "subtrrefdem": ("subtr_refdem", "coreg.out"),
+    "dem":         ("dem_assist", "coreg.out"),
+}
+
+# Dependencies of the Doris steps of one slave date. comprefpha only needs the
+# orbits, comprefdem is computed on the multilooked interferogram grid.
+STEP_DEPENDS = {
+    "coarseorb":   [],
+    "coarsecorr":  ["coarseorb"],
+    "fine":        ["coarsecorr"],
+    "coregpm":     ["fine"],
+    "resample":    ["coregpm"],
+    "interfero":   ["resample"],
+    "comprefpha":  ["coarseorb"],
+    "subtrrefpha": ["interfero", "comprefpha"],
+    "comprefdem":  ["interfero"],
+    "subtrrefdem": ["subtrrefpha", "comprefdem"],
+}
+
+# Output LUTs of each geocode_products entry and their bytes per pixel
+GEOCODE_PRODUCT_FILES = {
+    "incidence":      (("incidence.raw",), 4),
+    "look_vector":    (("los_e.raw", "los_n.raw", "los_u.raw"), 4),
+    "slant_range":    (("slant_range.raw",), 4),
+    "heading":        (("heading.raw",), 4),
+    "layover_shadow": (("layover_shadow.raw",), 1),
+}
 
 # DorisExpert
 class dorisProcessor():
     def __init__(self, params):
         self.params = params   
 
-    def _doris(self, arg):
+    def _doris(self, arg, path):
+        # Run doris in the date folder through cwd instead of os.chdir, so that
+        # several dates can be processed at the same time
         _DORIS = os.getenv('STACK_BUILDER_DORIS', self.params['doris_path'])
-        with open("doris.log", 'a') as log_file:
-            return subprocess.call([_DORIS, arg], stdout=log_file, stderr=log_file)
+        with open(os.path.join(path, "doris.log"), 'a') as log_file:
+            return subprocess.call([_DORIS, arg], stdout=log_file, stderr=log_file, cwd=path)
+
+    def _step_status(self, res_file, flag):
+        # Read the process_control flag of a step, None if it is not there yet
+        if not os.path.exists(res_file):
+            return None
+        with open(res_file) as res:
+            lines = [line for line in res if flag + ':' in line]
+        return lines[0].split()[1] if lines else None
+
+    def _run_step(self, path, step):
+        global_log.step_start(step)
+        flag, res_name = STEP_FLAGS[step]
+        res_file = os.path.join(path, res_name)
+
+        # A step whose dorisin parameters or inputs changed since it ran is
+        # reset, together with its downstream steps, before the flag check
+        cache = None
+        if step in STEP_DEPENDS and self.params['stack_parameters'].get('step_cache', True):
+            cache = dorisStepCache(path, STEP_DEPENDS, STEP_FLAGS)
+            if cache.check(step):
+                global_log.write(f"[Step] {step:<15} | parameters or inputs changed, rerun")
+
+        if self._step_status(res_file, flag) == '1':
+            if cache is not None and step not in cache.entries:
+                cache.record(step)
+            global_log.step_end(step, status="SKIPPED")
+            return
 
-    def coarseorb(self, path):
-        global_log.step_start("coarseorb")
-        os.chdir(path)
-        if os.path.exists('coreg.out'):
-            with open('coreg.out') as coreg_out:
-                if [line for line in coreg_out if 'coarse_orbits:' in line][0].split()[1] == '1':
-                    global_log.step_end("coarseorb", status="SKIPPED")
-                    return
-        
-        self._doris('../dorisin/coarseorb.dorisin')
+        self._doris(f'../dorisin/{step}.dorisin', path)
 
-        if os.path.exists('coreg.out'):
-            with open('coreg.out') as coreg_out:
-                if [line for line in coreg_out if 'coarse_orbits:' in line][0].split()[1] == '0':
-                    global_log.step_end("coarseorb", status="FAIL")
-                    raise ValueError(f"coarseorb error.")
+        if self._step_status(res_file, flag) == '0':
+            global_log.step_end(step, status="FAIL")
+            raise ValueError(f"{step} error.")
         
-        global_log.step_end("coarseorb", status="SUCCESS")
+        if cache is not None:
+            cache.record(step)
+        global_log.step_end(step, status="SUCCESS")
+
+    def coarseorb(self, path):
+        self._run_step(path, "coarseorb")
 
     def coarsecorr(self, path):
-        global_log.step_start("coarsecorr")
-        os.chdir(path)
-        if os.path.exists('coreg.out'):
-            with open('coreg.out') as coreg_out:
-                if [line for line in coreg_out if 'coarse_correl:' in line][0].split()[1] == '1':
-                    global_log.step_end("coarsecorr", status="SKIPPED")
-                    return
-        
-        self._doris('../dorisin/coarsecorr.dorisin')
-        
-        if os.path.exists('coreg.out'):
-            with open('coreg.out') as coreg_out:
-                if [line for line in coreg_out if 'coarse_correl:' in line][0].split()[1] == '0':
-                    global_log.step_end("coarsecorr", status="FAIL")
-                    raise ValueError(f"coarsecorr error.")
-        
-        global_log.step_end("coarsecorr", status="SUCCESS")
+        self._run_step(path, "coarsecorr")
 
     def fine(self, path):
-        global_log.step_start("fine")
-        os.chdir(path)
-        if os.path.exists('coreg.out'):
-            with open('coreg.out') as coreg_out:
-                if [line for line in coreg_out if 'fine_coreg:' in line][0].split()[1] == '1':
-                    global_log.step_end("fine", status="SKIPPED")
-                    return
-
-        self._doris('../dorisin/fine.dorisin')
-
-        if os.path.exists('coreg.out'):
-            with open('coreg.out') as coreg_out:
-                if [line for line in coreg_out if 'fine_coreg:' in line][0].split()[1] == '0':
-                    global_log.step_end("fine", status="FAIL")
-                    raise ValueError(f"fine error.")
-        
-        global_log.step_end("fine", status="SUCCESS")
+        self._run_step(path, "fine")
 
     def coregpm(self, path):
-        global_log.step_start("coregpm")
-        os.chdir(path)
-        if os.path.exists('coreg.out'):
-            with open('coreg.out') as coreg_out:
-                if [line for line in coreg_out if 'comp_coregpm:' in line][0].split()[1] == '1':
-                    global_log.step_end("coregpm", status="SKIPPED")
-                    return
-                
-        self._doris('../dorisin/coregpm.dorisin')
-
-        if os.path.exists('coreg.out'):
-            with open('coreg.out') as coreg_out:
-                if [line for line in coreg_out if 'comp_coregpm:' in line][0].split()[1] == '0':
-                    global_log.step_end("coregpm", status="FAIL")
-                    raise ValueError(f"coregpm error.")
-        
-        global_log.step_end("coregpm", status="SUCCESS")
+        self._run_step(path, "coregpm")
 
     def resample(self, path):
-        global_log.step_start("resample")
-        os.chdir(path)
-        if os.path.exists('slave.res'):
-            with open('slave.res') as coreg_out:
-                if [line for line in coreg_out if 'resample:' in line][0].split()[1] == '1':
-                    global_log.step_end("resample", status="SKIPPED")
-                    return
-
-        self._doris('../dorisin/resample.dorisin')
-        
-        if os.path.exists('slave.res'):
-            with open('slave.res') as coreg_out:
-                if [line for line in coreg_out if 'resample:' in line][0].split()[1] == '0':
-                    global_log.step_end("resample", status="FAIL")
-                    raise ValueError(f"resample error.")
-        
-        global_log.step_end("resample", status="SUCCESS")
+        self._run_step(path, "resample")
 
     def interfero(self, path):
-        global_log.step_start("interfero")
-        os.chdir(path)
-        if os.path.exists('coreg.out'):
-            with open('coreg.out') as coreg_out:
-                if [line for line in coreg_out if 'interfero:' in line][0].split()[1] == '1':
-                    global_log.step_end("interfero", status="SKIPPED")
-                    return
-
-        self._doris('../dorisin/interfero.dorisin')
-
-        if os.path.exists('coreg.out'):
-            with open('coreg.out') as coreg_out:
-                if [line for line in coreg_out if 'interfero:' in line][0].split()[1] == '0':
-                    global_log.step_end("interfero", status="FAIL")
-                    raise ValueError(f"interfero error.")
-        
-        global_log.step_end("interfero", status="SUCCESS")
-
+        self._run_step(path, "interfero")
 
     def comprefpha(self, path):
-        global_log.step_start("comprefpha")
-        os.chdir(path)
-        if os.path.exists('coreg.out'):
-            with open('coreg.out') as coreg_out:
-                if [line for line in coreg_out if 'comp_refphase:' in line][0].split()[1] == '1':
-                    global_log.step_end("comprefpha", status="SKIPPED")
-                    return
-
-        self._doris('../dorisin/comprefpha.dorisin')
-
-        if os.path.exists('coreg.out'):
-            with open('coreg.out') as coreg_out:
-                if [line for line in coreg_out if 'comp_refphase:' in line][0].split()[1] == '0':
-                    global_log.step_end("comprefpha", status="FAIL")
-                    raise ValueError(f"comprefpha error.")
-        
-        global_log.step_end("comprefpha", status="SUCCESS")
-        
+        self._run_step(path, "comprefpha")
 
     def subtrrefpha(self, path):
-        global_log.step_start("subtrrefpha")
-        os.chdir(path)
-        if os.path.exists('coreg.out'):
-            with open('coreg.out') as coreg_out:
-                if [line for line in coreg_out if 'subtr_refphase:' in line][0].split()[1] == '1':
-                    global_log.step_end("subtrrefpha", status="SKIPPED")
-                    return
-
-        self._doris('../dorisin/subtrrefpha.dorisin')
-
-        if os.path.exists('coreg.out'):
-            with open('coreg.out') as coreg_out:
-                if [line for line in coreg_out if 'subtr_refphase:' in line][0].split()[1] == '0':
-                    global_log.step_end("subtrrefpha", status="FAIL")
-                    raise ValueError(f"subtrrefpha error.")
-        
-        global_log.step_end("subtrrefpha", status="SUCCESS")
+        self._run_step(path, "subtrrefpha")
 
     def comprefdem(self, path):
-        global_log.step_start("comprefdem")
-        os.chdir(path)
-        if os.path.exists('coreg.out'):
-            with open('coreg.out') as coreg_out:
-                if [line for line in coreg_out if 'comp_refdem:' in line][0].split()[1] == '1':
-                    global_log.step_end("comprefdem", status="SKIPPED")
-                    return
-
-        self._doris('../dorisin/comprefdem.dorisin')
-
-        if os.path.exists('coreg.out'):
-            with open('coreg.out') as coreg_out:
-                if [line for line in coreg_out if 'comp_refdem:' in line][0].split()[1] == '0':
-                    global_log.step_end("comprefdem", status="FAIL")
-                    raise ValueError(f"comprefdem error.")
-        
-        global_log.step_end("comprefdem", status="SUCCESS")
+        self._run_step(path, "comprefdem")
 
     def subtrrefdem(self, path):
-        global_log.step_start("subtrrefdem")
-        os.chdir(path)
-        if os.path.exists('coreg.out'):
-            with open('coreg.out') as coreg_out:
-                if [line for line in coreg_out if 'subtr_refdem:' in line][0].split()[1] == '1':
-                    global_log.step_end("subtrrefdem", status="SKIPPED")
-                    return
-
-        self._doris('../dorisin/subtrrefdem.dorisin')
-
-        if os.path.exists('coreg.out'):
-            with open('coreg.out') as coreg_out:
-                if [line for line in coreg_out if 'subtr_refdem:' in line][0].split()[1] == '0':
-                    global_log.step_end("subtrrefdem", status="FAIL")
-                    raise ValueError(f"subtrrefdem error.")
-        
-        global_log.step_end("subtrrefdem", status="SUCCESS")
+        self._run_step(path, "subtrrefdem")
 
     
     def dem(self, path):
-        global_log.step_start("dem")
-        os.chdir(path)
-        if os.path.exists('coreg.out'):
-            with open('coreg.out') as coreg_out:
-                if [line for line in coreg_out if 'dem_assist:' in line][0].split()[1] == '1':
-                    global_log.step_end("dem", status="SKIPPED")
-                    return
+        self._run_step(path, "dem")
 
-        self._doris('../dorisin/dem.dorisin')
-        
-        if os.path.exists('coreg.out'):
-            with open('coreg.out') as coreg_out:
-                if [line for line in coreg_out if 'dem_assist:' in line][0].split()[1] == '0':
-                    global_log.step_end("dem", status="FAIL")
-                    raise ValueError(f"dem error.")
-    
     def geocode(self, path):
         global_log.step_start("geocode")
-        if os.path.exists(os.path.join(path, "lat.raw")) and os.path.exists(os.path.join(path, "lon.raw")):
-            global_log.step_end("geocode", status="SKIPPED")
-            return
         dem_radar_file = glob.glob(os.path.join(path, "**", "dem_radar.raw"), recursive=True)
         if not dem_radar_file:
             global_log.step_end("geocode", status="FAIL")
             raise ValueError(f"dem_radar.raw not found for geocode.")
+
+        # lat.raw/lon.raw and the geometry LUTs are on the dem_radar.raw grid
+        # (float32 unless noted): reuse them only when all requested are complete
+        # lat.raw/lon.raw 与几何 LUT 均在 dem_radar.raw 网格上，全部完整时才跳过
+        geometry_products = self.params['stack_parameters'].get('geocode_products') or []
+        unknown = set(geometry_products) - set(GEOCODE_PRODUCT_FILES)
+        if unknown:
+            global_log.step_end("geocode", status="FAIL")
+            raise ValueError(f"Unknown geocode_products: {', '.join(sorted(unknown))}")
+        pixel_count = os.path.getsize(dem_radar_file[0]) // 4
+
+        def is_complete(names, itemsize=4):
+            return all(os.path.exists(os.path.join(path, name))
+                       and os.path.getsize(os.path.join(path, name)) == pixel_count * itemsize
+                       for name in names)
+
+        missing_products = [product for product in geometry_products
+                            if not is_complete(*GEOCODE_PRODUCT_FILES[product])]
+        if is_complete(("lat.raw", "lon.raw")):
+            if not missing_products:
+                global_log.step_end("geocode", status="SKIPPED")
+                return
+            # The pass writes lat/lon again, but only the missing geometry LUTs
+            # 重新运行时只计算缺失的几何 LUT
+            global_log.write(f"[Step] {'geocode':<15} | missing {', '.join(missing_products)}, rerun")
+        else:
+            missing_products = geometry_products
         
         # Read rlooks and alooks from coreg.out
         coreg_out_candidates: list = []
@@ -257,13 +183,22 @@ class dorisProcessor():
             if alooks_match is None or rlooks_match is None:
                 raise ValueError("Multilookfactor not found in _Start_comp_refdem block")
         
-        # Run geocode_forward to generate lat/lon LUTs
+        # Run geocode_forward to generate lat/lon LUTs. Imported here so that
+        # numba and scipy are not loaded by the steps that do not geocode
+        from teresa.utils.geocode._geocode import run_geocode_forward
+        # Extra geometry LUTs written next to lat.raw/lon.raw, e.g. ["incidence", "layover_shadow"]
+        # 与 lat.raw/lon.raw 一起输出的几何 LUT，例如 ["incidence", "layover_shadow"]
         run_geocode_forward(dem_radar_filename=dem_radar_file[0],
                             resfile=os.path.join(path, "dem", "slavedem.res"),
                             rlooks=int(rlooks_match.group(1)),
                             alooks=int(alooks_match.group(1)),
                             output_lat=os.path.join(path, "lat.raw"),
                             output_lon=os.path.join(path, "lon.raw"),
-                            log_file=os.path.join(path, "run_lut_generation.log"))
+                            log_file=os.path.join(path, "run_lut_generation.log"),
+                            memory_mb=self.params['stack_parameters'].get('geocode_memory_mb'),
+                            mode=self.params['stack_parameters'].get('geocode_mode', 'exact'),
+                            grid_step=int(self.params['stack_parameters'].get('geocode_grid_step', 16)),
+                            tolerance_m=float(self.params['stack_parameters'].get('geocode_tolerance_m', 0.1)),
+                            **{product: product in missing_products for product in GEOCODE_PRODUCT_FILES})
         
         global_log.step_end("geocode", status="SUCCESS")
\ No newline at end of file
@@ -0,0 +1,141 @@
+import os
+import re
+import json
+import hashlib
+
+from teresa.utils.atomicWrite import atomic_write
+
+# Cache of the step keys, one per date folder
+# 步骤缓存文件，每个日期目录一个
+CACHE_FILE = ".teresa_cache.json"
+
+# dorisin cards pointing at input files outside the date folder
+# dorisin 中引用日期目录外部输入文件的参数
+INPUT_CARDS = ("CRD_IN_DEM",)
+
+
+def fingerprint(path):
+    """
+    Fingerprint of a file (size and modification time, links followed).
+
+    Returns:
+        str: "size:mtime_ns", or "missing" when the file does not exist.
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return "missing"
+    return f"{st.st_size}:{st.st_mtime_ns}"
+
+
+class dorisStepCache():
+    def __init__(self, date_dir, step_depends, step_flags):
+        """
+        Content-addressed cache of the Doris steps of one date.
+
+        The key of a step hashes its rendered .dorisin, the keys of the steps it
+        depends on and, for the first step, the fingerprints of the slave and
+        master images. A changed parameter therefore changes the key of that
+        step and of everything downstream of it, and nothing else.
+
+        Parameters:
+            date_dir (str): The working directory of the date.
+            step_depends (dict): Steps each step depends on.
+            step_flags (dict): (process_control flag, res file name) of each step.
+        """
+        self.date_dir = date_dir
+        self.step_depends = step_depends
+        self.step_flags = step_flags
+        self.cache_path = os.path.join(date_dir, CACHE_FILE)
+        self.keys = {}
+        self.entries = {}
+        if os.path.exists(self.cache_path):
+            with open(self.cache_path) as f:
+                self.entries = json.load(f)
+
+    def save(self):
+        with atomic_write(self.cache_path) as f:
+            json.dump(self.entries, f, indent=2, sort_keys=True)
+
+    def step_key(self, step):
+        """
+        Compute the key of a step from its current inputs.
+        """
+        if step in self.keys:
+            return self.keys[step]
+
+        dorisin_path = os.path.join(self.date_dir, "..", "dorisin", step + ".dorisin")
+        with open(dorisin_path, encoding='utf-8') as f:
+            dorisin_text = f.read()
+
+        h = hashlib.sha256()
+        h.update(step.encode())
+        h.update(dorisin_text.encode())
+        depends = self.step_depends.get(step, [])
+        for dep in depends:
+            h.update(self.step_key(dep).encode())
+        if not depends:
+            h.update(fingerprint(os.path.join(self.date_dir, "image.raw")).encode())
+            h.update(fingerprint(os.path.join(self.date_dir, "..", "master", "image_crop.raw")).encode())
+        for card in INPUT_CARDS:
+            for match in re.finditer(rf'^{card}\s+(\S+)', dorisin_text, re.MULTILINE):
+                h.update(fingerprint(match.group(1)).encode())
+
+        self.keys[step] = h.hexdigest()
+        return self.keys[step]
+
+    def downstream(self, step):
+        """
+        The steps depending, directly or not, on a step.
+        """
+        result = []
+        for other, depends in self.step_depends.items():
+            if step in depends and other not in result:
+                result.append(other)
+                result += [s for s in self.downstream(other) if s not in result]
+        return result
+
+    def check(self, step):
+        """
+        Invalidate the step and its downstream steps when its stored key does
+        not match the current inputs. A step without a stored key (e.g. a
+        workspace processed before the cache existed) is trusted.
+
+        Returns:
+            bool: True if the step was invalidated.
+        """
+        stored = self.entries.get(step)
+        if stored is None or stored == self.step_key(step):
+            return False
+        for s in [step] + self.downstream(step):
+            self.reset_step(s)
+            self.entries.pop(s, None)
+        self.save()
+        return True
+
+    def record(self, step):
+        """
+        Store the key of a step that completed.
+        """
+        self.entries[step] = self.step_key(step)
+        self.save()
+
+    def reset_step(self, step):
+        """
+        Set the process_control flag of a step back to 0 and strip its result
+        block, so that Doris runs it again.
+        """
+        flag, res_name = self.step_flags[step]
+        res_path = os.path.join(self.date_dir, res_name)
+        if not os.path.exists(res_path):
+            return
+        with open(res_path) as f:
+            content = f.read()
+
+        flag_pattern = re.escape(flag)
+        content = re.sub(rf'^({flag_pattern}:\s+)1', r'\g<1>0', content, flags=re.MULTILINE)
+        content = re.sub(rf'\*+[ \t]*\n\*_Start_{flag_pattern}:.*?\* End_{flag_pattern}:_NORMAL[^\n]*\n(\*+[ \t]*\n)?',
+                         '', content, flags=re.DOTALL)
+
+        with atomic_write(res_path) as f:
+            f.write(content)
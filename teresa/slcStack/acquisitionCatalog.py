@@ -0,0 +1,340 @@
+import os
+import re
+import sqlite3
+import zipfile
+from datetime import datetime
+from xml.etree import ElementTree
+
+from teresa.slcStack.stackCatalog import stackCatalog
+from teresa.dump.sensor_reader import get_sensor_reader
+
+# S1 SAFE archives, indexed from the manifest.safe inside the zip
+# S1 的 SAFE 压缩包，从其中的 manifest.safe 读取元数据
+S1_ZIP_PAT = re.compile(r'^S1[A-D]_.*_SLC_.*\.zip$')
+
+S1_NAMESPACES = {
+    "safe": "http://www.esa.int/safe/sentinel-1.0",
+    "s1": "http://www.esa.int/safe/sentinel-1.0/sentinel-1",
+    "gml": "http://www.opengis.net/gml",
+}
+
+TIME_FORMATS = ("%d-%b-%Y %H:%M:%S.%f", "%Y-%m-%dT%H:%M:%S.%f", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d %H:%M:%S.%f")
+
+
+def parse_time(value):
+    """
+    Parse the time strings of the different header readers to ISO format.
+
+    Returns:
+        str: "YYYY-MM-DDTHH:MM:SS.ffffff", or None if it cannot be parsed.
+    """
+    if value is None:
+        return None
+    value = str(value).strip()
+    for time_format in TIME_FORMATS:
+        try:
+            return datetime.strptime(value, time_format).isoformat(timespec="microseconds")
+        except ValueError:
+            continue
+    return None
+
+
+def _floats(values):
+    result = []
+    for value in values or []:
+        try:
+            result.append(float(value))
+        except (TypeError, ValueError):
+            continue
+    return result
+
+
+def _int_or_none(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def read_lt1(meta_path):
+    """
+    Read the catalog record of an LT1 scene with LT1.read_meta.
+    """
+    from teresa.dump.lt1_dump_header2doris import LT1
+
+    lt1 = LT1()
+    lt1.meta["path"] = meta_path
+    meta = lt1.read_meta().meta
+
+    # read_meta only keeps the scene centre: take the corners and the relative
+    # orbit from the XML
+    root = ElementTree.parse(meta_path).getroot()
+    corners = root.findall("productInfo//sceneInfo//sceneCornerCoord")
+    lats = _floats([corner.findtext("lat") for corner in corners]) or _floats([meta.get("Scene_centre_latitude")])
+    lons = _floats([corner.findtext("lon") for corner in corners]) or _floats([meta.get("Scene_centre_longitude")])
+    return {
+        "start_time": parse_time(meta.get("First_pixel_azimuth_time (UTC)")),
+        "stop_time": parse_time(meta.get("Last_pixel_azimuth_time (UTC)")),
+        "direction": meta.get("Direction"),
+        "orbit": _int_or_none(meta.get("Orbit")),
+        "track": _int_or_none(root.findtext("productInfo//missionInfo//relOrbit")),
+        "lats": lats,
+        "lons": lons,
+    }
+
+
+def read_bc(meta_path):
+    """
+    Read the catalog record of a BC scene with BC.read_meta.
+    """
+    from teresa.dump.bc_dump_header2doris import BC
+
+    bc = BC()
+    bc.meta["path"] = meta_path
+    bc.read_meta()
+    meta = bc.meta
+
+    root = ElementTree.parse(meta_path).getroot()
+    return {
+        "start_time": parse_time(meta.get("First_pixel_azimuth_time (UTC)")),
+        "stop_time": parse_time(meta.get("Last_pixel_azimuth_time (UTC)")),
+        "direction": meta.get("Direction"),
+        "orbit": _int_or_none(meta.get("Orbit")),
+        "track": _int_or_none(root.findtext("adsHeader/relativeOrbitNumber")),
+        "lats": _floats(meta.get("Scene_corner_latitude")),
+        "lons": _floats(meta.get("Scene_corner_longitude")),
+    }
+
+
+def read_csk(meta_path):
+    """
+    Read the catalog record of a CSK scene with extract_csk_meta.
+    """
+    from teresa.dump.csk_dump_header2doris import extract_csk_meta
+
+    meta = extract_csk_meta(meta_path)
+    orbit = re.search(r'Orbit: (\d+)', meta.get("Scene identification", ""))
+    return {
+        "start_time": parse_time(meta.get("First_pixel_azimuth_time (UTC)")),
+        "stop_time": None,
+        "direction": meta.get("Orbit_direction"),
+        "orbit": int(orbit.group(1)) if orbit else None,
+        "track": None,
+        "lats": _floats(meta.get("Scene_corner_latitude")),
+        "lons": _floats(meta.get("Scene_corner_longitude")),
+    }
+
+
+def read_s1(zip_path):
+    """
+    Read the catalog record of a Sentinel-1 SAFE zip from its manifest.safe.
+    """
+    with zipfile.ZipFile(zip_path) as archive:
+        manifest = [name for name in archive.namelist() if name.endswith("manifest.safe")]
+        if not manifest:
+            raise ValueError(f"manifest.safe not found in {zip_path}")
+        root = ElementTree.fromstring(archive.read(manifest[0]))
+
+    ns = S1_NAMESPACES
+    coordinates = root.findtext(".//gml:coordinates", default="", namespaces=ns).split()
+    points = [point.split(",") for point in coordinates]
+    return {
+        "start_time": parse_time(root.findtext(".//safe:startTime", namespaces=ns)),
+        "stop_time": parse_time(root.findtext(".//safe:stopTime", namespaces=ns)),
+        "direction": root.findtext(".//s1:pass", namespaces=ns),
+        "orbit": _int_or_none(root.findtext(".//safe:orbitNumber[@type='start']", namespaces=ns)),
+        "track": _int_or_none(root.findtext(".//safe:relativeOrbitNumber[@type='start']", namespaces=ns)),
+        "lats": _floats([point[0] for point in points if len(point) == 2]),
+        "lons": _floats([point[1] for point in points if len(point) == 2]),
+    }
+
+
+class acquisitionCatalog():
+    def __init__(self, db_path):
+        """
+        Archive-wide catalog of SAR acquisitions in SQLite. The footprints
+        are indexed by an R-tree when the SQLite build has it, by plain
+        column indexes otherwise.
+
+        Parameters:
+            db_path (str): Path of the SQLite database.
+        """
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self.conn = sqlite3.connect(db_path)
+        self.conn.row_factory = sqlite3.Row
+        self.has_rtree = False
+        self.create_tables()
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def create_tables(self):
+        with self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS acquisitions (
+                    id INTEGER PRIMARY KEY,
+                    meta_path TEXT UNIQUE,
+                    data_path TEXT,
+                    sensor TEXT,
+                    date TEXT,
+                    start_time TEXT,
+                    stop_time TEXT,
+                    direction TEXT,
+                    track INTEGER,
+                    orbit INTEGER,
+                    min_lat REAL, max_lat REAL, min_lon REAL, max_lon REAL,
+                    footprint TEXT,
+                    size INTEGER,
+                    mtime_ns INTEGER
+                )""")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS acquisitions_date ON acquisitions (sensor, date)")
+            try:
+                self.conn.execute("""
+                    CREATE VIRTUAL TABLE IF NOT EXISTS acquisitions_rtree
+                    USING rtree(id, min_lon, max_lon, min_lat, max_lat)""")
+                self.has_rtree = True
+            except sqlite3.OperationalError:
+                # SQLite built without R-tree: fall back to column indexes
+                # SQLite 不支持 R-tree 时，退化为普通索引
+                self.conn.execute("CREATE INDEX IF NOT EXISTS acquisitions_lat ON acquisitions (min_lat, max_lat)")
+                self.conn.execute("CREATE INDEX IF NOT EXISTS acquisitions_lon ON acquisitions (min_lon, max_lon)")
+
+    def is_current(self, meta_path, st):
+        row = self.conn.execute("SELECT size, mtime_ns FROM acquisitions WHERE meta_path = ?", (meta_path,)).fetchone()
+        return row is not None and row["size"] == st.st_size and row["mtime_ns"] == st.st_mtime_ns
+
+    def add(self, sensor, date, meta_path, data_path, record):
+        """
+        Insert or update the record of one acquisition.
+        """
+        st = os.stat(meta_path)
+        lats, lons = record["lats"], record["lons"]
+        bbox = (min(lats), max(lats), min(lons), max(lons)) if lats and lons else (None, None, None, None)
+        footprint = None
+        if lats and lons:
+            points = [f"{lon} {lat}" for lat, lon in zip(lats, lons)]
+            footprint = f"POLYGON (({', '.join(points + points[:1])}))"
+
+        with self.conn:
+            old = self.conn.execute("SELECT id FROM acquisitions WHERE meta_path = ?", (meta_path,)).fetchone()
+            if old is not None:
+                self.conn.execute("DELETE FROM acquisitions WHERE id = ?", (old["id"],))
+                if self.has_rtree:
+                    self.conn.execute("DELETE FROM acquisitions_rtree WHERE id = ?", (old["id"],))
+            cursor = self.conn.execute("""
+                INSERT INTO acquisitions (meta_path, data_path, sensor, date, start_time, stop_time,
+                                          direction, track, orbit, min_lat, max_lat, min_lon, max_lon,
+                                          footprint, size, mtime_ns)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                (meta_path, data_path, sensor, date, record["start_time"], record["stop_time"],
+                 (record["direction"] or "").upper() or None, record["track"], record["orbit"],
+                 *bbox, footprint, st.st_size, st.st_mtime_ns))
+            if self.has_rtree and lats and lons:
+                self.conn.execute("INSERT INTO acquisitions_rtree VALUES (?, ?, ?, ?, ?)",
+                                  (cursor.lastrowid, bbox[2], bbox[3], bbox[0], bbox[1]))
+
+    def index(self, data_dirs, log=print):
+        """
+        Index the acquisitions under the directories with the header readers
+        of each sensor. Files already indexed with the same size and mtime
+        are skipped.
+
+        Parameters:
+            data_dirs (str | list): Directories to index.
+            log (callable): Progress output.
+
+        Returns:
+            tuple: (number of new or updated records, number of failures)
+        """
+        catalog = stackCatalog(data_dirs).refresh()
+        scenes = {}
+        for entry in catalog.entries():
+            key = (entry["radar_type"], entry["date"], os.path.dirname(entry["path"]))
+            scenes.setdefault(key, {})[entry["kind"]] = entry["path"]
+
+        # S1 zips are not part of the Doris stack patterns
+        # S1 的 zip 文件不在 Doris stack 的匹配规则中，单独查找
+        if isinstance(data_dirs, str):
+            data_dirs = [data_dirs]
+        for data_dir in data_dirs:
+            for dirpath, _, filenames in os.walk(os.path.abspath(data_dir), followlinks=True):
+                for filename in filenames:
+                    if S1_ZIP_PAT.match(filename):
+                        path = os.path.join(dirpath, filename)
+                        scenes[("S1", filename[17:25], path)] = {"meta": path, "data": path}
+
+        added, failed = 0, 0
+        for (sensor, date, _), paths in sorted(scenes.items()):
+            meta_path = paths.get("meta")
+            if meta_path is None or self.is_current(meta_path, os.stat(meta_path)):
+                continue
+            try:
+                if sensor == "S1":
+                    record = read_s1(meta_path)
+                else:
+                    # The other sensors, plugins included, read their records
+                    # through their sensor reader
+                    # 其他传感器（包括插件）通过其读取器读取记录
+                    record = get_sensor_reader(sensor).read_record(meta_path)
+            except Exception as e:
+                failed += 1
+                log(f"[Catalog] {sensor} {date} | FAIL ({type(e).__name__}: {e}) {meta_path}")
+                continue
+            self.add(sensor, date, meta_path, paths.get("data"), record)
+            added += 1
+        return added, failed
+
+    def query(self, sensor=None, start=None, end=None, aoi=None, direction=None, track=None):
+        """
+        Query the acquisitions.
+
+        Parameters:
+            sensor (str): Sensor, e.g. "LT1".
+            start (str): First date, YYYYMMDD, inclusive.
+            end (str): Last date, YYYYMMDD, inclusive.
+            aoi (tuple): (min_lat, max_lat, min_lon, max_lon) the footprint must intersect.
+            direction (str): "ASCENDING" or "DESCENDING".
+            track (int): Relative orbit.
+
+        Returns:
+            list: The matching acquisitions as dicts, sorted by date.
+        """
+        conditions, args = [], []
+        if sensor:
+            conditions.append("a.sensor = ?")
+            args.append(sensor)
+        if start:
+            conditions.append("a.date >= ?")
+            args.append(str(start))
+        if end:
+            conditions.append("a.date <= ?")
+            args.append(str(end))
+        if direction:
+            conditions.append("a.direction = ?")
+            args.append(direction.upper())
+        if track is not None:
+            conditions.append("a.track = ?")
+            args.append(int(track))
+
+        table = "acquisitions a"
+        if aoi is not None:
+            min_lat, max_lat, min_lon, max_lon = aoi
+            prefix = "r" if self.has_rtree else "a"
+            if self.has_rtree:
+                table = "acquisitions a JOIN acquisitions_rtree r ON a.id = r.id"
+            conditions += [f"{prefix}.max_lon >= ?", f"{prefix}.min_lon <= ?",
+                           f"{prefix}.max_lat >= ?", f"{prefix}.min_lat <= ?"]
+            args += [min_lon, max_lon, min_lat, max_lat]
+
+        sql = f"SELECT a.* FROM {table}"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY a.date, a.start_time"
+        return [dict(row) for row in self.conn.execute(sql, args)]
@@ -1,7 +1,8 @@
 import os
-import re
 
-from teresa.slcStack.radar_type import radar_type_pat_map, is_meta_file, is_data_file, get_date_from_filename
+from teresa.slcStack.stackCatalog import stackCatalog
+from teresa.slcStack.acquisitionCatalog import acquisitionCatalog
+from teresa.slcStack.radar_type import radar_type_pat_map
 from teresa.utils.TeresaLog import global_log
 
 class dorisSlcStack():
@@ -32,54 +33,74 @@ class dorisSlcStack():
         """
         Initialize the dorisSlcStack object with parameters.
         """
+        stack_parameters = self.params['stack_parameters']
+        if stack_parameters.get('catalog'):
+            self.initialize_from_catalog(stack_parameters['catalog'])
+            return
+
         if not os.path.exists(self.data_dir):
             raise FileNotFoundError(f"Data directory {self.data_dir} does not exist.")
 
+        # Scan data_dir once into the catalog, persisted in the workspace and
+        # refreshed incrementally from the directory mtimes
+        # 单次扫描 data_dir 生成文件目录，保存在 workspace 中，按目录 mtime 增量更新
+        catalog_path = None
+        if stack_parameters.get('stack_catalog', True):
+            catalog_path = os.path.join(self.work_dir, "workspace", "stack_catalog.json")
+        catalog = stackCatalog(self.data_dir, catalog_path).refresh()
+
         # Determine the radar type
         # 确定雷达类型
-        for radar_type, pattern in radar_type_pat_map.items():
-            is_matched = self.check_radar_type(pattern)
-            if is_matched:
-                self.radar_type = radar_type
-                break
+        self.radar_type = catalog.radar_type()
         if not self.radar_type:
             raise ValueError("No matching radar type found in the data directory.")
         
-        # Initialize self.data_path_map, where the key is the date and 
-        # the value is the path to the data files corresponding to that date
-        # 初始化 self.data_path_map，其中， key 是日期，value 是日期对应的数据文件路径
-        for dirpath, _, filenames in os.walk(os.path.abspath(self.data_dir)):
-            for filename in filenames:
-                # Use regex matching to find the data files and initialize self.data_path_map
-                # 通过正则匹配，找到 data 数据文件，初始化 self.data_path_map
-                data_file = is_data_file[self.radar_type](filename)
-                if data_file:
-                    date_str = get_date_from_filename[self.radar_type]['data'](filename)
-                    full_path = os.path.join(dirpath, filename)
-                    self.data_path_map[date_str] = full_path  
-
-                # Use regex matching to find the meta files and initialize self.meta_path_map
-                # 通过正则匹配，找到 meta 元文件，初始化 self.meta_path_map
-                meta_file = is_meta_file[self.radar_type](filename)
-                if meta_file:
-                    date_str = get_date_from_filename[self.radar_type]['meta'](filename)
-                    full_path = os.path.join(dirpath, filename)
-                    self.meta_path_map[date_str] = full_path   
+        # Initialize self.data_path_map and self.meta_path_map, where the key is 
+        # the date and the value is the path to the files corresponding to that date
+        # 初始化 self.data_path_map 和 self.meta_path_map，其中， key 是日期，value 是日期对应的文件路径
+        self.meta_path_map, self.data_path_map = catalog.path_maps(self.radar_type)
 
         # Initialize self.dates, the list of dates
         # 初始化 self.dates 日期列表  
         #! 其实，这里可以检查一下 meta 和 data 的日期是否一致的，偷懒了 
         self.dates = sorted(set(self.meta_path_map.keys()) | set(self.data_path_map.keys()))
 
-    def check_radar_type(self, pattern):
+    def initialize_from_catalog(self, db_path):
         """
-        Check if the radar type matches the given pattern.
+        Initialize the stack from a query of the acquisition catalog instead
+        of walking data_dirs.
+
+        Parameters:
+            db_path (str): Path of the acquisition catalog database.
         """
-        regex = re.compile(pattern)
-        # Traverse all files under the data_dir directory and check for matches 
-        # 遍历 data_dir 目录下的所有文件，检查是否有匹配
-        for _, _, filenames in os.walk(self.data_dir, followlinks=True):
-            for filename in filenames:
-                if regex.match(filename):
-                    return True
-        return False
\ No newline at end of file
+        if not os.path.exists(db_path):
+            raise FileNotFoundError(f"Acquisition catalog {db_path} does not exist.")
+
+        stack_parameters = self.params['stack_parameters']
+        aoi = None
+        aoi_keys = ('min_lat', 'max_lat', 'min_lon', 'max_lon')
+        if all(stack_parameters.get(key) is not None for key in aoi_keys):
+            aoi = tuple(float(stack_parameters[key]) for key in aoi_keys)
+
+        with acquisitionCatalog(db_path) as catalog:
+            acquisitions = catalog.query(sensor=stack_parameters.get('sensor'),
+                                         start=stack_parameters.get('start_date'),
+                                         end=stack_parameters.get('end_date'),
+                                         aoi=aoi,
+                                         direction=stack_parameters.get('direction'),
+                                         track=stack_parameters.get('track'))
+
+        # Only the sensors Doris can ingest
+        # 只保留 doris 流程支持的传感器
+        acquisitions = [acq for acq in acquisitions if acq['sensor'] in radar_type_pat_map]
+        sensors = sorted({acq['sensor'] for acq in acquisitions})
+        if not sensors:
+            raise ValueError("No matching acquisition found in the catalog.")
+        if len(sensors) > 1:
+            raise ValueError(f"Acquisitions of several sensors {sensors} match, please set 'sensor'.")
+
+        self.radar_type = sensors[0]
+        for acq in acquisitions:
+            self.meta_path_map[acq['date']] = acq['meta_path']
+            self.data_path_map[acq['date']] = acq['data_path']
+        self.dates = sorted(self.meta_path_map.keys())
@@ -1,39 +1,37 @@
 import re
 
-# This map is used to store different types of radar data 
+from teresa.dump.sensor_reader import sensor_readers
+
+# The maps below are built from the registered sensor readers (built-in and
+# teresa.sensors plugins), so a new sensor does not need any change here
+# 下面的 map 由已注册的传感器读取器（内置及 teresa.sensors 插件）生成，新增传感器无需修改此处
+
+# This map is used to store different types of radar data
 # and the regex patterns for matching radar types
 # 这个 map 是用来放不同类型的雷达数据 匹配雷达类型的正则项的
-radar_type_pat_map = {
-    'LT1': r'^LT1.*\.meta\.xml$',
-    'BC': r'^bc.*\.xml$',
-    'CSK': r'^CSK.*\.h5$',  
-}
+radar_type_pat_map = {name: reader.meta_pattern for name, reader in sensor_readers.items()}
+
+# Precompiled patterns of the meta files, data files and dates,
+# shared by the lambdas below and the single-pass stackCatalog scanner
+# 预编译的 meta、data 文件名和日期的正则，供下面的 lambda 和 stackCatalog 的单次扫描使用
+meta_file_pat = {name: re.compile(reader.meta_pattern) for name, reader in sensor_readers.items()}
+
+data_file_pat = {name: re.compile(reader.data_pattern) for name, reader in sensor_readers.items()}
+
+date_pat = {name: {kind: re.compile(reader.date_pattern[kind]) for kind in ("meta", "data")}
+            for name, reader in sensor_readers.items()}
 
-# This map is used to store different types of radar data and 
+# This map is used to store different types of radar data and
 # the regex patterns for matching meta/XML files
 # 这个 map 是用来放不同类型的雷达数据 匹配 meta/xml 的正则项的
-is_meta_file = {
-    'LT1': lambda x: bool(re.search(r'^LT1.*\.meta\.xml$', x)),
-    'BC': lambda x: bool(re.search(r'^bc.*\.xml$', x)),
-    'CSK': lambda x: bool(re.search(r'^CSK.*\.h5$', x)), 
-}
+is_meta_file = {name: lambda x, pat=pat: bool(pat.search(x)) for name, pat in meta_file_pat.items()}
 
-# This map is used to store different types of radar data and 
+# This map is used to store different types of radar data and
 # the regex patterns for matching data files
 # 这个 map 是用来放不同类型的雷达数据 匹配 data 的正则项的
-is_data_file = { 
-    'LT1': lambda x: bool(re.search(r'^LT1.*\.tiff$', x)),
-    'BC': lambda x: bool(re.search(r'^bc.*\.tiff$', x)),
-    'CSK': lambda x: bool(re.search(r'^CSK.*\.h5$', x)), 
-}
+is_data_file = {name: lambda x, pat=pat: bool(pat.search(x)) for name, pat in data_file_pat.items()}
 
 # This map is used to extract the date from the filenames of different radar types
 # 这个 map 是用来从不同类型雷达数据的文件名中提取日期的
-get_date_from_filename = { 
-    'LT1': {'meta': lambda x: re.search(r'LT1.*_(20\d{6})', x).group(1),
-            'data': lambda x: re.search(r'LT1.*_(20\d{6})', x).group(1)},
-    'BC': {'meta': lambda x: re.search(r'bc.*(20\d{6})', x).group(1),
-            'data': lambda x: re.search(r'bc.*(20\d{6})', x).group(1)},
-    'CSK': {'meta': lambda x: re.search(r'_(20\d{6})\d{6}_', x).group(1),
-            'data': lambda x: re.search(r'_(20\d{6})\d{6}_', x).group(1)}, 
-}
+get_date_from_filename = {name: {kind: lambda x, pat=pat: pat.search(x).group(1) for kind, pat in pats.items()}
+                          for name, pats in date_pat.items()}
@@ -0,0 +1,157 @@
+import os
+import json
+
+from teresa.slcStack.radar_type import radar_type_pat_map, meta_file_pat, data_file_pat, date_pat
+from teresa.utils.atomicWrite import atomic_write
+
+CATALOG_VERSION = 1
+
+
+def match_file(filename):
+    """
+    Classify a file name against the patterns of all radar types.
+
+    Returns:
+        list: [radar_type, kind ("meta" or "data"), date] for each match.
+    """
+    matches = []
+    for radar_type in radar_type_pat_map:
+        for kind, file_pat in (("meta", meta_file_pat), ("data", data_file_pat)):
+            if file_pat[radar_type].search(filename):
+                date = date_pat[radar_type][kind].search(filename)
+                if date:
+                    matches.append([radar_type, kind, date.group(1)])
+    return matches
+
+
+class stackCatalog():
+    def __init__(self, data_dirs, catalog_path=None):
+        """
+        Catalog of the SLC files under the data directories, built by a single
+        walk and persisted so that a re-run only lists the directories whose
+        mtime changed since the last scan.
+
+        Parameters:
+            data_dirs (str | list): Directory or directories holding the SLC data.
+            catalog_path (str): JSON file persisting the catalog, None to keep
+                                it in memory only.
+        """
+        if isinstance(data_dirs, str):
+            data_dirs = [data_dirs]
+        self.data_dirs = [os.path.abspath(data_dir) for data_dir in data_dirs]
+        self.catalog_path = catalog_path
+        # dirpath -> {"mtime_ns", "subdirs", "files": [{"name", "size", "matches"}]}
+        self.dirs = {}
+        self.load()
+
+    def load(self):
+        if not self.catalog_path or not os.path.exists(self.catalog_path):
+            return
+        try:
+            with open(self.catalog_path) as f:
+                catalog = json.load(f)
+        except (OSError, ValueError):
+            return
+        if catalog.get("version") == CATALOG_VERSION and catalog.get("data_dirs") == self.data_dirs:
+            self.dirs = catalog["dirs"]
+
+    def save(self):
+        if not self.catalog_path:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.catalog_path)), exist_ok=True)
+        with atomic_write(self.catalog_path) as f:
+            json.dump({"version": CATALOG_VERSION, "data_dirs": self.data_dirs, "dirs": self.dirs}, f)
+
+    def scan_dir(self, dirpath, mtime_ns):
+        """
+        List one directory: its subdirectories (links followed) and the files
+        matching any radar type.
+        """
+        subdirs = []
+        files = []
+        with os.scandir(dirpath) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=True):
+                        subdirs.append(entry.path)
+                        continue
+                except OSError:
+                    continue
+                matches = match_file(entry.name)
+                if matches:
+                    files.append({"name": entry.name,
+                                  "size": entry.stat(follow_symlinks=True).st_size,
+                                  "matches": matches})
+        return {"mtime_ns": mtime_ns, "subdirs": sorted(subdirs), "files": sorted(files, key=lambda x: x["name"])}
+
+    def refresh(self):
+        """
+        Walk the data directories once. A directory whose mtime is unchanged
+        reuses its cached listing; only new or modified ones are listed again.
+
+        Returns:
+            stackCatalog: self
+        """
+        dirs = {}
+        visited = set()
+        stack = list(reversed(self.data_dirs))
+        while stack:
+            dirpath = stack.pop()
+            try:
+                st = os.stat(dirpath)
+            except OSError:
+                continue
+            # Guard against link cycles
+            # 防止软链接形成的循环
+            if (st.st_dev, st.st_ino) in visited:
+                continue
+            visited.add((st.st_dev, st.st_ino))
+
+            cached = self.dirs.get(dirpath)
+            if cached is not None and cached["mtime_ns"] == st.st_mtime_ns:
+                dirs[dirpath] = cached
+            else:
+                dirs[dirpath] = self.scan_dir(dirpath, st.st_mtime_ns)
+            stack.extend(reversed(dirs[dirpath]["subdirs"]))
+
+        changed = dirs != self.dirs
+        self.dirs = dirs
+        if changed:
+            self.save()
+        return self
+
+    def entries(self):
+        """
+        Iterate over the catalogued files.
+
+        Yields:
+            dict: {"path", "size", "radar_type", "kind", "date"}
+        """
+        for dirpath, listing in self.dirs.items():
+            for file in listing["files"]:
+                for radar_type, kind, date in file["matches"]:
+                    yield {"path": os.path.join(dirpath, file["name"]), "size": file["size"],
+                           "radar_type": radar_type, "kind": kind, "date": date}
+
+    def radar_type(self):
+        """
+        The first radar type of radar_type_pat_map with files in the catalog.
+        """
+        found = {entry["radar_type"] for entry in self.entries() if entry["kind"] == "meta"}
+        for radar_type in radar_type_pat_map:
+            if radar_type in found:
+                return radar_type
+        return ""
+
+    def path_maps(self, radar_type):
+        """
+        Map each date to its meta and data file of the radar type.
+
+        Returns:
+            tuple: (meta_path_map, data_path_map)
+        """
+        path_maps = {"meta": {}, "data": {}}
+        for entry in self.entries():
+            if entry["radar_type"] == radar_type:
+                path_maps[entry["kind"]][entry["date"]] = entry["path"]
+        return path_maps["meta"], path_maps["data"]
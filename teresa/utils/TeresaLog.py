@@ -1,4 +1,6 @@
 import time
+import threading
+from contextlib import contextmanager
 from datetime import datetime
 
 class TeresaLog:
@@ -11,13 +13,37 @@ class TeresaLog:
         self.task_count = 0
         self.success_count = 0
         self.logs = []
+        # Tasks may run in several threads: writes are serialized by the lock
+        # and a buffered task keeps its lines in a thread-local buffer until
+        # end_task, so the blocks of concurrent tasks do not interleave
+        self._lock = threading.RLock()
+        self._local = threading.local()
     
     def write(self, message=""):
-        print(message)
-        self.logs.append(message)
-        if self.output_file:
-            with open(self.output_file, "a") as f:
-                f.write(message + "\n")
+        buffer = getattr(self._local, "buffer", None)
+        if buffer is not None:
+            buffer.append(message)
+            return
+        self._emit([message])
+
+    @contextmanager
+    def capture(self):
+        """Collect the lines written by this thread instead of emitting them"""
+        previous = getattr(self._local, "buffer", None)
+        self._local.buffer = []
+        try:
+            yield self._local.buffer
+        finally:
+            self._local.buffer = previous
+
+    def _emit(self, messages):
+        with self._lock:
+            for message in messages:
+                print(message)
+                self.logs.append(message)
+            if self.output_file:
+                with open(self.output_file, "a") as f:
+                    f.writelines(message + "\n" for message in messages)
 
     def start_global(self, task_count=None):
         self.start_time = time.time()
@@ -33,10 +59,14 @@ class TeresaLog:
         self.write("=" * 100)
         self.write()
 
-    def start_task(self, task):
-        self.task_index += 1
-        self.task_start_time = time.time()
-        header = f"[{self.task_index} / {self.task_count}] Date: {task['processing_date']}"
+    def start_task(self, task, buffered=False):
+        with self._lock:
+            self.task_index += 1
+            task_index = self.task_index
+        self._local.task_start_time = time.time()
+        if buffered:
+            self._local.buffer = []
+        header = f"[{task_index} / {self.task_count}] Date: {task['processing_date']}"
         self.write()
         self.write(">" * 37 + f" {header} " + "<" * 37)
         self.write(f" Meta File      : {task['meta_file']}")
@@ -56,17 +86,23 @@ class TeresaLog:
         self.write()
 
     def end_task(self, success=True):
-        elapsed = int(time.time() - self.task_start_time)
+        elapsed = int(time.time() - self._local.task_start_time)
         mm, ss = divmod(elapsed, 60)
         status = "Success" if success else "Failed"
         if success:
-            self.success_count += 1
+            with self._lock:
+                self.success_count += 1
         self.write("-" * 100)
         self.write(f" Task Status: {status}")
         self.write(f" Task Time  : {mm:02}:{ss:02}")
         self.write("=" * 100)
         self.write()
 
+        buffer = getattr(self._local, "buffer", None)
+        if buffer is not None:
+            self._local.buffer = None
+            self._emit(buffer)
+
     def end_global(self):
         elapsed = int(time.time() - self.start_time)
         mm, ss = divmod(elapsed, 60)
@@ -0,0 +1,61 @@
+import os
+import zlib
+from contextlib import contextmanager
+
+
+def _tmp_name(path):
+    # Temporary name next to the target, so that os.replace stays on one filesystem
+    directory, name = os.path.split(path)
+    return os.path.join(directory, f".{name}.tmp.{os.getpid()}")
+
+
+@contextmanager
+def atomic_path(path):
+    """
+    Yield a temporary path to write instead of path, and rename it onto path
+    only when the block completes. A crash leaves the previous file (or none)
+    instead of a truncated one.
+
+    Parameters:
+        path (str): The final output path.
+    """
+    tmp_path = _tmp_name(path)
+    try:
+        yield tmp_path
+        with open(tmp_path, 'rb+') as f:
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+@contextmanager
+def atomic_write(path, mode='w', **kwargs):
+    """
+    Open a temporary file for writing and rename it onto path when the block
+    completes, like open(path, mode) but crash-safe.
+
+    Parameters:
+        path (str): The final output path.
+        mode (str): 'w' or 'wb'.
+    """
+    with atomic_path(path) as tmp_path:
+        with open(tmp_path, mode, **kwargs) as f:
+            yield f
+
+
+def file_crc32(path, chunk_size=16 * 1024 * 1024):
+    """
+    CRC32 of a file, read in chunks.
+
+    Returns:
+        int: The checksum.
+    """
+    crc = 0
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                return crc
+            crc = zlib.crc32(chunk, crc)
@@ -19,21 +19,25 @@ import glob
 import yaml
 import time
 import math
+import mmap
 import threading
 import numpy as np
 import multiprocessing as mp
-from numba import njit, jit, prange
+from numba import njit, prange
 from functools import partial
+from contextlib import ExitStack
 from scipy.interpolate import RegularGridInterpolator
 from pathlib import Path
 from datetime import datetime
 from typing import Tuple, Dict, Optional, Any
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
 from .dataclass import ImageGeometry, DEMGeometry, ProductInfo
+from teresa.utils.atomicWrite import atomic_path
+from ._lutIndex import LUTIndex
 from ._orbit import (
-    SOL, Point3D, Ellipsoid, Orbit,
+    SOL, ORB_SPLINE, Point3D, Ellipsoid, Orbit,
     eq1_doppler, eq2_range,
     eq3_ellipsoid, solve33,
     _print, set_log_file)
@@ -49,6 +53,8 @@ class ForwardGeocodeInput:
     output_lambda: str
     dem_format: str = "real4"
     fihei: str = None  # Input DEM file path (if different from dem_file)
+    # Extra geometry LUTs, product name (GEOMETRY_PRODUCTS or "layover_shadow") -> output path
+    geometry_outputs: Dict[str, str] = field(default_factory=dict)
 
 
 def parse_doris_datetime(datetime_str: str) -> datetime:
@@ -450,6 +456,874 @@ class DorisResParser:
 
         return params
 
+# ------------------------------------------------------------------------
+# Numba kernels
+# ------------------------------------------------------------------------
+# Compiled once and cached on disk (cache=True, in __pycache__ or the user
+# cache directory), so a run only loads the machine code. `warmup` compiles
+# them at deploy time.
+#
+# fastmath without 'nnan'/'ninf', which would fold away the NaN height checks
+_FASTMATH = {'nsz', 'arcp', 'contract', 'afn', 'reassoc'}
+
+@njit(fastmath=_FASTMATH, cache=True)
+def _lph2xyz(pos_sat, vel_sat, slant_range, a_elev, b_elev,
+             posonellx, posonelly, posonellz, max_iter, criter):
+    """
+    Solve the Doppler, range and (elevated) ellipsoid equations of one pixel
+    with Newton-Raphson iterations from an initial ECEF guess.
+
+    Args:
+        pos_sat: Satellite position of the line.
+        vel_sat: Satellite velocity of the line.
+        slant_range: One-way slant range of the pixel [m].
+        a_elev: Semi-major axis of the ellipsoid raised by the pixel height.
+        b_elev: Semi-minor axis of the ellipsoid raised by the pixel height.
+        posonellx: Initial guess X in ECEF.
+        posonelly: Initial guess Y in ECEF.
+        posonellz: Initial guess Z in ECEF.
+        max_iter: Maximum iteration count.
+        criter: Convergence threshold.
+
+    Returns:
+        lph2xyz_result: Tuple (x, y, z, iterations), iterations being -1 when
+        the solve did not converge.
+    """
+    for iteration in range(max_iter):
+        # Vector from satellite to point
+        dsat_Px = posonellx - pos_sat[0]
+        dsat_Py = posonelly - pos_sat[1]
+        dsat_Pz = posonellz - pos_sat[2]
+
+        # Evaluate equations (NEGATED - matches lph2xyz)
+        # 1. Doppler equation
+        f1 = -(vel_sat[0]*dsat_Px + vel_sat[1]*dsat_Py + vel_sat[2]*dsat_Pz)
+
+        # 2. Range equation
+        f2 = -(dsat_Px*dsat_Px + dsat_Py*dsat_Py + dsat_Pz*dsat_Pz -
+               slant_range**2)
+
+        # 3. Ellipsoid equation (matches lph2xyz format exactly)
+        f3 = -((posonellx*posonellx + posonelly*posonelly) / (a_elev**2) +
+               (posonellz/b_elev)**2 - 1.0)
+
+        # Build Jacobian
+        J00 = vel_sat[0]
+        J01 = vel_sat[1]
+        J02 = vel_sat[2]
+
+        J10 = 2.0 * dsat_Px
+        J11 = 2.0 * dsat_Py
+        J12 = 2.0 * dsat_Pz
+
+        # KEY: Uses ELEVATED parameters (matches lph2xyz)
+        J20 = (2.0 * posonellx) / (a_elev**2)
+        J21 = (2.0 * posonelly) / (a_elev**2)
+        J22 = (2.0 * posonellz) / (b_elev**2)
+
+        # Solve using Cramer's rule: J * sol = equationset
+        det = (J00*(J11*J22 - J12*J21) -
+               J01*(J10*J22 - J12*J20) +
+               J02*(J10*J21 - J11*J20))
+
+        if abs(det) < 1e-20:
+            break
+
+        # Cramer's rule (solving J * [solx, soly, solz]^T = [f1, f2, f3]^T)
+        solx = (f1*(J11*J22 - J12*J21) -
+                J01*(f2*J22 - J12*f3) +
+                J02*(f2*J21 - J11*f3)) / det
+
+        soly = (J00*(f2*J22 - J12*f3) -
+                f1*(J10*J22 - J12*J20) +
+                J02*(J10*f3 - f2*J20)) / det
+
+        solz = (J00*(J11*f3 - f2*J21) -
+                J01*(J10*f3 - f2*J20) +
+                f1*(J10*J21 - J11*J20)) / det
+
+        # Update solution
+        posonellx += solx
+        posonelly += soly
+        posonellz += solz
+
+        # Check convergence
+        if abs(solx) < criter and abs(soly) < criter and abs(solz) < criter:
+            return posonellx, posonelly, posonellz, iteration + 1
+
+    return posonellx, posonelly, posonellz, -1
+
+
+@njit(fastmath=_FASTMATH, cache=True)
+def _xyz2ell(posonellx, posonelly, posonellz, ell_a, ell_b, ell_e2, ell_e2b):
+    """
+    Convert an ECEF position to latitude/longitude with Bowring's method.
+
+    Returns:
+        lat_lon: Tuple (lat, lon) in degrees.
+    """
+    r = math.sqrt(posonellx**2 + posonelly**2)
+    mu = math.atan2(posonellz * ell_a, r * ell_b)
+
+    sin_mu = math.sin(mu)
+    cos_mu = math.cos(mu)
+    sin3 = sin_mu**3
+    cos3 = cos_mu**3
+
+    lat = math.atan2(
+        posonellz + ell_e2b * ell_b * sin3,
+        r - ell_e2 * ell_a * cos3
+    )
+    lon = math.atan2(posonelly, posonellx)
+    return math.degrees(lat), math.degrees(lon)
+
+
+# Bands of the geometry LUTs computed with the geocoding (float32): incidence
+# angle [deg], unit look vector from the ground to the satellite in local
+# east/north/up, slant range [m] and heading of the satellite velocity [deg,
+# clockwise from north]. The layover/shadow mask is a separate uint8 LUT.
+GEOMETRY_PRODUCTS = ("incidence", "los_e", "los_n", "los_u", "slant_range", "heading")
+LAYOVER = 1
+SHADOW = 2
+
+
+@njit(fastmath=_FASTMATH, cache=True)
+def _pixel_geometry(px, py, pz, lat, lon, pos_sat, vel_sat, a_elev, b_elev, geometry, i, j):
+    """
+    Write the geometry bands of pixel (i, j) from its ground position and the
+    satellite state, and return the angles ordering the pixels of a line for
+    the layover/shadow mask.
+
+    Args:
+        px, py, pz: Ground position in ECEF.
+        lat, lon: Latitude/longitude of the ground position in degrees.
+        pos_sat, vel_sat: Satellite position and velocity.
+        a_elev, b_elev: Semi-axes of the ellipsoid elevated to the pixel height.
+        geometry: Output bands [band, line, pixel] (GEOMETRY_PRODUCTS).
+
+    Returns:
+        angles: Tuple (ground_angle, look_angle) [rad], the angle at the Earth
+        centre between the satellite and the ground point, and the off-nadir
+        angle of the ground point seen from the satellite.
+    """
+    # Ground to satellite
+    dx = pos_sat[0] - px
+    dy = pos_sat[1] - py
+    dz = pos_sat[2] - pz
+    slant_range = math.sqrt(dx * dx + dy * dy + dz * dz)
+    ux = dx / slant_range
+    uy = dy / slant_range
+    uz = dz / slant_range
+
+    # Incidence: angle between the ellipsoid normal and the look vector
+    nx = px / (a_elev * a_elev)
+    ny = py / (a_elev * a_elev)
+    nz = pz / (b_elev * b_elev)
+    n_norm = math.sqrt(nx * nx + ny * ny + nz * nz)
+    cos_inc = (nx * ux + ny * uy + nz * uz) / n_norm
+    geometry[0, i, j] = math.degrees(math.acos(min(1.0, max(-1.0, cos_inc))))
+
+    # Local east/north/up
+    sin_lat = math.sin(math.radians(lat))
+    cos_lat = math.cos(math.radians(lat))
+    sin_lon = math.sin(math.radians(lon))
+    cos_lon = math.cos(math.radians(lon))
+    geometry[1, i, j] = -sin_lon * ux + cos_lon * uy
+    geometry[2, i, j] = -sin_lat * cos_lon * ux - sin_lat * sin_lon * uy + cos_lat * uz
+    geometry[3, i, j] = cos_lat * cos_lon * ux + cos_lat * sin_lon * uy + sin_lat * uz
+    geometry[4, i, j] = slant_range
+    v_east = -sin_lon * vel_sat[0] + cos_lon * vel_sat[1]
+    v_north = -sin_lat * cos_lon * vel_sat[0] - sin_lat * sin_lon * vel_sat[1] + cos_lat * vel_sat[2]
+    geometry[5, i, j] = math.degrees(math.atan2(v_east, v_north))
+
+    # Angle at the Earth centre (ground range) and off-nadir angle
+    cx = pos_sat[1] * pz - pos_sat[2] * py
+    cy = pos_sat[2] * px - pos_sat[0] * pz
+    cz = pos_sat[0] * py - pos_sat[1] * px
+    ground_angle = math.atan2(math.sqrt(cx * cx + cy * cy + cz * cz),
+                              pos_sat[0] * px + pos_sat[1] * py + pos_sat[2] * pz)
+    cx = pos_sat[1] * dz - pos_sat[2] * dy
+    cy = pos_sat[2] * dx - pos_sat[0] * dz
+    cz = pos_sat[0] * dy - pos_sat[1] * dx
+    look_angle = math.atan2(math.sqrt(cx * cx + cy * cy + cz * cz),
+                            pos_sat[0] * dx + pos_sat[1] * dy + pos_sat[2] * dz)
+    return ground_angle, look_angle
+
+
+@njit(fastmath=_FASTMATH, cache=True)
+def _layover_shadow(ground_angle, look_angle, mask_row):
+    """
+    Layover/shadow mask of one line, the pixels being in increasing slant range.
+
+    A pixel is in layover when its ground range is out of order with a pixel
+    of the line (the terrain folds over), and in shadow when its off-nadir
+    angle is smaller than that of a nearer pixel (the ray is blocked).
+    NaN angles (no solution) are skipped.
+    """
+    pixels = ground_angle.size
+    max_ground = -np.inf
+    max_look = -np.inf
+    for j in range(pixels):
+        if np.isnan(ground_angle[j]):
+            continue
+        if ground_angle[j] < max_ground:
+            mask_row[j] |= LAYOVER
+        if look_angle[j] < max_look:
+            mask_row[j] |= SHADOW
+        max_ground = max(max_ground, ground_angle[j])
+        max_look = max(max_look, look_angle[j])
+    min_ground = np.inf
+    for j in range(pixels - 1, -1, -1):
+        if np.isnan(ground_angle[j]):
+            continue
+        if ground_angle[j] > min_ground:
+            mask_row[j] |= LAYOVER
+        min_ground = min(min_ground, ground_angle[j])
+
+
+@njit(parallel=True, fastmath=_FASTMATH, cache=True)
+def compute_geocoding_core(dem, orbit_pos_arr, orbit_vel_arr,
+                           first_line, first_pix, multiL, multiP,
+                           near_range_t, pixel_time_int,
+                           ell_a, ell_b, ell_e2, ell_e2b,
+                           scene_x, scene_y, scene_z,
+                           max_iter, criter, sol,
+                           geometry, mask):
+    """
+    Compute geocoding latitude/longitude arrays in the Numba kernel.
+
+    The Newton solve of a pixel is warm-started from the solution of its left
+    neighbour, a few metres away, instead of the scene centre. The first
+    pixels of the rows are solved first, one after the other, each seeded
+    from the row above; the rows then run in parallel. A pixel after a NaN
+    height or a failed solve restarts from the scene centre.
+
+    The geometry LUTs are computed from the converged ground position in the
+    same pass when geometry and mask have the shape of the DEM; pass empty
+    arrays to skip them.
+
+    Args:
+        dem: DEM grid in radar coordinates.
+        orbit_pos_arr: Satellite position array per azimuth line.
+        orbit_vel_arr: Satellite velocity array per azimuth line.
+        first_line: First line index in source geometry.
+        first_pix: First pixel index in source geometry.
+        multiL: Azimuth multilook factor.
+        multiP: Range multilook factor.
+        near_range_t: Near range time in seconds.
+        pixel_time_int: Pixel time interval in seconds.
+        ell_a: Ellipsoid semi-major axis.
+        ell_b: Ellipsoid semi-minor axis.
+        ell_e2: First eccentricity squared.
+        ell_e2b: Second eccentricity squared.
+        scene_x: Initial scene center X in ECEF.
+        scene_y: Initial scene center Y in ECEF.
+        scene_z: Initial scene center Z in ECEF.
+        max_iter: Maximum iteration count.
+        criter: Convergence threshold.
+        sol: Speed of light constant.
+        geometry: float32 output [len(GEOMETRY_PRODUCTS), lines, pixels], or empty.
+        mask: uint8 layover/shadow output [lines, pixels], or empty.
+
+    Returns:
+        geocode_core_result: Tuple (phi, lam, hist), phi/lam in degrees and
+        hist[i, k] the number of pixels of line i solved in k iterations, the
+        last column counting the pixels that did not converge.
+    """
+    lines, pixels = dem.shape
+    phi = np.full((lines, pixels), np.nan, dtype=np.float32)
+    lam = np.full((lines, pixels), np.nan, dtype=np.float32)
+    hist = np.zeros((lines, max_iter + 2), dtype=np.int64)
+    if pixels == 0:
+        return phi, lam, hist
+
+    # Slant range (one-way) of the first pixel; the others add j * multiP pixels
+    slant_range0 = sol * (near_range_t + first_pix * pixel_time_int) / 2
+    slant_range_step = sol * multiP * pixel_time_int / 2
+
+    with_geometry = geometry.shape[1] == lines and geometry.shape[2] == pixels
+    with_mask = with_geometry and mask.shape[0] == lines and mask.shape[1] == pixels
+    angles0 = np.full((lines, 2), np.nan)
+
+    # Column 0, sequential: each row seeded from the row above
+    seed = np.empty((lines, 3))
+    seeded = np.zeros(lines, dtype=np.bool_)
+    x, y, z = scene_x, scene_y, scene_z
+    for i in range(lines):
+        height = dem[i, 0]
+        if np.isnan(height) or np.isinf(height):
+            x, y, z = scene_x, scene_y, scene_z
+            continue
+        x, y, z, n_iter = _lph2xyz(orbit_pos_arr[i], orbit_vel_arr[i], slant_range0,
+                                   ell_a + height, ell_b + height, x, y, z, max_iter, criter)
+        if n_iter < 0:
+            hist[i, max_iter + 1] += 1
+            x, y, z = scene_x, scene_y, scene_z
+            continue
+        hist[i, n_iter] += 1
+        phi[i, 0], lam[i, 0] = _xyz2ell(x, y, z, ell_a, ell_b, ell_e2, ell_e2b)
+        seed[i, 0], seed[i, 1], seed[i, 2] = x, y, z
+        seeded[i] = True
+        if with_geometry:
+            angles0[i, 0], angles0[i, 1] = _pixel_geometry(x, y, z, phi[i, 0], lam[i, 0],
+                                                           orbit_pos_arr[i], orbit_vel_arr[i],
+                                                           ell_a + height, ell_b + height, geometry, i, 0)
+
+    # Other columns, rows in parallel: each pixel seeded from its left neighbour
+    for i in prange(lines):
+        pos_sat = orbit_pos_arr[i]
+        vel_sat = orbit_vel_arr[i]
+        if seeded[i]:
+            px, py, pz = seed[i, 0], seed[i, 1], seed[i, 2]
+        else:
+            px, py, pz = scene_x, scene_y, scene_z
+        ground_angle = np.full(pixels if with_mask else 0, np.nan)
+        look_angle = np.full(pixels if with_mask else 0, np.nan)
+        if with_mask:
+            ground_angle[0], look_angle[0] = angles0[i, 0], angles0[i, 1]
+
+        for j in range(1, pixels):
+            height = dem[i, j]
+            if np.isnan(height) or np.isinf(height):
+                px, py, pz = scene_x, scene_y, scene_z
+                continue
+
+            px, py, pz, n_iter = _lph2xyz(pos_sat, vel_sat, slant_range0 + j * slant_range_step,
+                                          ell_a + height, ell_b + height, px, py, pz, max_iter, criter)
+            if n_iter < 0:
+                hist[i, max_iter + 1] += 1
+                px, py, pz = scene_x, scene_y, scene_z
+                continue
+            hist[i, n_iter] += 1
+            phi[i, j], lam[i, j] = _xyz2ell(px, py, pz, ell_a, ell_b, ell_e2, ell_e2b)
+            if with_geometry:
+                angles = _pixel_geometry(px, py, pz, phi[i, j], lam[i, j], pos_sat, vel_sat,
+                                         ell_a + height, ell_b + height, geometry, i, j)
+                if with_mask:
+                    ground_angle[j], look_angle[j] = angles
+
+        if with_mask:
+            _layover_shadow(ground_angle, look_angle, mask[i])
+
+    return phi, lam, hist
+
+
+# Coarse-grid geocoding: the Newton solve runs on a sparse grid of nodes at a
+# few height levels; the pixels interpolate between the nodes (bilinear in
+# line/pixel, Lagrange polynomial in height). Cells whose interpolation error,
+# checked against the exact solve, exceeds the tolerance are solved exactly.
+
+@njit(parallel=True, fastmath=_FASTMATH, cache=True)
+def compute_geocoding_nodes(node_rows, node_cols, heights, orbit_pos_arr, orbit_vel_arr,
+                            first_pix, multiP, near_range_t, pixel_time_int,
+                            ell_a, ell_b, ell_e2, ell_e2b,
+                            scene_x, scene_y, scene_z,
+                            max_iter, criter, sol):
+    """
+    Solve the geocoding exactly at the grid nodes for each height level.
+
+    Args:
+        node_rows: Node lines in the tile (increasing).
+        node_cols: Node pixels (increasing).
+        heights: Height levels [m].
+        orbit_pos_arr: Satellite position array per azimuth line of the tile.
+        orbit_vel_arr: Satellite velocity array per azimuth line of the tile.
+        (other arguments as in compute_geocoding_core)
+
+    Returns:
+        geocode_nodes: Tuple (lat, lon, hist), lat/lon [level, node row, node col]
+        in degrees (NaN where the solve did not converge) and hist the
+        iteration histogram of the node solves.
+    """
+    n_levels = heights.size
+    n_rows = node_rows.size
+    n_cols = node_cols.size
+    lat = np.full((n_levels, n_rows, n_cols), np.nan)
+    lon = np.full((n_levels, n_rows, n_cols), np.nan)
+    hist = np.zeros((n_rows, max_iter + 2), dtype=np.int64)
+
+    slant_range0 = sol * (near_range_t + first_pix * pixel_time_int) / 2
+    slant_range_step = sol * multiP * pixel_time_int / 2
+
+    for a in prange(n_rows):
+        pos_sat = orbit_pos_arr[node_rows[a]]
+        vel_sat = orbit_vel_arr[node_rows[a]]
+        for k in range(n_levels):
+            height = heights[k]
+            px, py, pz = scene_x, scene_y, scene_z
+            for b in range(n_cols):
+                px, py, pz, n_iter = _lph2xyz(pos_sat, vel_sat, slant_range0 + node_cols[b] * slant_range_step,
+                                              ell_a + height, ell_b + height, px, py, pz, max_iter, criter)
+                if n_iter < 0:
+                    hist[a, max_iter + 1] += 1
+                    px, py, pz = scene_x, scene_y, scene_z
+                    continue
+                hist[a, n_iter] += 1
+                lat[k, a, b], lon[k, a, b] = _xyz2ell(px, py, pz, ell_a, ell_b, ell_e2, ell_e2b)
+    return lat, lon, hist
+
+
+@njit(fastmath=_FASTMATH, cache=True)
+def _interpolate_pixel(i, j, t, a, b, node_rows, node_cols, lat_coef, lon_coef):
+    """
+    Interpolate the node polynomials at pixel (i, j) of cell (a, b): bilinear
+    between the four nodes of the cell, evaluated at the normalized height t.
+
+    Returns:
+        lat_lon: Tuple (lat, lon) in degrees, float64, lon wrapped to [-180, 180).
+    """
+    span = node_rows[a + 1] - node_rows[a]
+    wi = (i - node_rows[a]) / span if span > 0 else 0.0
+    span = node_cols[b + 1] - node_cols[b]
+    wj = (j - node_cols[b]) / span if span > 0 else 0.0
+    w00 = (1.0 - wi) * (1.0 - wj)
+    w01 = (1.0 - wi) * wj
+    w10 = wi * (1.0 - wj)
+    w11 = wi * wj
+
+    lat = 0.0
+    lon = 0.0
+    for m in range(lat_coef.shape[0] - 1, -1, -1):
+        lat = lat * t + (w00 * lat_coef[m, a, b] + w01 * lat_coef[m, a, b + 1] +
+                         w10 * lat_coef[m, a + 1, b] + w11 * lat_coef[m, a + 1, b + 1])
+        lon = lon * t + (w00 * lon_coef[m, a, b] + w01 * lon_coef[m, a, b + 1] +
+                         w10 * lon_coef[m, a + 1, b] + w11 * lon_coef[m, a + 1, b + 1])
+    if lon >= 180.0:
+        lon -= 360.0
+    elif lon < -180.0:
+        lon += 360.0
+    return lat, lon
+
+
+@njit(parallel=True, fastmath=_FASTMATH, cache=True)
+def interpolate_geocoding_grid(dem, node_rows, node_cols, h_centre, h_scale, lat_coef, lon_coef):
+    """
+    Interpolate the node solutions at every pixel: bilinear between the nodes
+    of its cell, then the polynomial in the normalized height
+    t = (h - h_centre) / h_scale. The coefficients are blended along the lines
+    once per line, so a pixel costs one linear blend and a Horner evaluation.
+
+    Args:
+        dem: DEM tile in radar coordinates.
+        node_rows: Node lines in the tile, from 0 to the last line.
+        node_cols: Node pixels, from 0 to the last pixel.
+        h_centre: Centre of the height levels [m].
+        h_scale: Half range of the height levels [m].
+        lat_coef: Latitude polynomial coefficients [degree, node row, node col].
+        lon_coef: Longitude coefficients, of the unwrapped (continuous across
+            +-180) longitudes.
+
+    Returns:
+        geocode_grid: Tuple (phi, lam) in degrees, float32.
+    """
+    lines, pixels = dem.shape
+    phi = np.full((lines, pixels), np.nan, dtype=np.float32)
+    lam = np.full((lines, pixels), np.nan, dtype=np.float32)
+    n_coef = lat_coef.shape[0]
+    n_cols = node_cols.size
+
+    for i in prange(lines):
+        # Cell a spans the lines [node_rows[a], node_rows[a + 1]), the last one closed
+        a = 0
+        while a < node_rows.size - 2 and node_rows[a + 1] <= i:
+            a += 1
+        span = node_rows[a + 1] - node_rows[a]
+        wi = (i - node_rows[a]) / span if span > 0 else 0.0
+        row_lat = np.empty((n_coef, n_cols))
+        row_lon = np.empty((n_coef, n_cols))
+        for m in range(n_coef):
+            for b in range(n_cols):
+                row_lat[m, b] = (1.0 - wi) * lat_coef[m, a, b] + wi * lat_coef[m, a + 1, b]
+                row_lon[m, b] = (1.0 - wi) * lon_coef[m, a, b] + wi * lon_coef[m, a + 1, b]
+
+        b = 0
+        span = node_cols[1] - node_cols[0]
+        for j in range(pixels):
+            height = dem[i, j]
+            if np.isnan(height) or np.isinf(height):
+                continue
+            while b < n_cols - 2 and node_cols[b + 1] <= j:
+                b += 1
+                span = node_cols[b + 1] - node_cols[b]
+            wj = (j - node_cols[b]) / span if span > 0 else 0.0
+            t = (height - h_centre) / h_scale
+            lat = 0.0
+            lon = 0.0
+            for m in range(n_coef - 1, -1, -1):
+                lat = lat * t + row_lat[m, b] + wj * (row_lat[m, b + 1] - row_lat[m, b])
+                lon = lon * t + row_lon[m, b] + wj * (row_lon[m, b + 1] - row_lon[m, b])
+            if lon >= 180.0:
+                lon -= 360.0
+            elif lon < -180.0:
+                lon += 360.0
+            phi[i, j] = lat
+            lam[i, j] = lon
+    return phi, lam
+
+
+@njit(parallel=True, fastmath=_FASTMATH, cache=True)
+def interpolate_geocoding_pixels(dem, rows, cols, cell_rows, cell_cols,
+                                 node_rows, node_cols, h_centre, h_scale, lat_coef, lon_coef):
+    """
+    Interpolate the node solutions at the given pixels of the given cells, in
+    float64 so that the interpolation error is checked before the float32
+    rounding of the LUT.
+
+    Returns:
+        interpolated_pixels: Tuple (lat, lon) in degrees per pixel, float64.
+    """
+    n = rows.size
+    lat = np.full(n, np.nan)
+    lon = np.full(n, np.nan)
+    for p in prange(n):
+        height = dem[rows[p], cols[p]]
+        if np.isnan(height) or np.isinf(height):
+            continue
+        lat[p], lon[p] = _interpolate_pixel(rows[p], cols[p], (height - h_centre) / h_scale,
+                                            cell_rows[p], cell_cols[p], node_rows, node_cols, lat_coef, lon_coef)
+    return lat, lon
+
+
+@njit(fastmath=_FASTMATH, cache=True)
+def _solve_pixel(pos_sat, vel_sat, slant_range, height, seed_lat, seed_lon,
+                 ell_a, ell_b, ell_e2, ell_e2b, scene_x, scene_y, scene_z, max_iter, criter):
+    """
+    Exact solve of one pixel, seeded from an approximate latitude/longitude
+    (the scene centre when NaN).
+
+    Returns:
+        lat_lon_iter: Tuple (lat, lon, iterations), NaN and -1 when the solve
+        did not converge.
+    """
+    if np.isnan(seed_lat) or np.isnan(seed_lon):
+        px, py, pz = scene_x, scene_y, scene_z
+    else:
+        sin_lat = math.sin(math.radians(seed_lat))
+        cos_lat = math.cos(math.radians(seed_lat))
+        n = ell_a / math.sqrt(1.0 - ell_e2 * sin_lat * sin_lat)
+        px = (n + height) * cos_lat * math.cos(math.radians(seed_lon))
+        py = (n + height) * cos_lat * math.sin(math.radians(seed_lon))
+        pz = ((1.0 - ell_e2) * n + height) * sin_lat
+    px, py, pz, n_iter = _lph2xyz(pos_sat, vel_sat, slant_range, ell_a + height, ell_b + height,
+                                  px, py, pz, max_iter, criter)
+    if n_iter < 0:
+        return np.nan, np.nan, -1
+    lat, lon = _xyz2ell(px, py, pz, ell_a, ell_b, ell_e2, ell_e2b)
+    return lat, lon, n_iter
+
+
+@njit(parallel=True, fastmath=_FASTMATH, cache=True)
+def solve_geocoding_pixels(dem, rows, cols, phi, lam, orbit_pos_arr, orbit_vel_arr,
+                           first_pix, multiP, near_range_t, pixel_time_int,
+                           ell_a, ell_b, ell_e2, ell_e2b,
+                           scene_x, scene_y, scene_z,
+                           max_iter, criter, sol):
+    """
+    Exact solve of the given pixels, seeded from the interpolated phi/lam,
+    e.g. to check the interpolation error.
+
+    Returns:
+        exact_pixels: Tuple (lat, lon) in degrees per pixel, float64.
+    """
+    n = rows.size
+    lat = np.full(n, np.nan)
+    lon = np.full(n, np.nan)
+    slant_range0 = sol * (near_range_t + first_pix * pixel_time_int) / 2
+    slant_range_step = sol * multiP * pixel_time_int / 2
+    for p in prange(n):
+        i = rows[p]
+        j = cols[p]
+        height = dem[i, j]
+        if np.isnan(height) or np.isinf(height):
+            continue
+        lat[p], lon[p], _ = _solve_pixel(orbit_pos_arr[i], orbit_vel_arr[i], slant_range0 + j * slant_range_step,
+                                         height, phi[i, j], lam[i, j],
+                                         ell_a, ell_b, ell_e2, ell_e2b, scene_x, scene_y, scene_z, max_iter, criter)
+    return lat, lon
+
+
+@njit(parallel=True, fastmath=_FASTMATH, cache=True)
+def solve_geocoding_cells(dem, phi, lam, cell_rows, cell_cols, node_rows, node_cols,
+                          orbit_pos_arr, orbit_vel_arr,
+                          first_pix, multiP, near_range_t, pixel_time_int,
+                          ell_a, ell_b, ell_e2, ell_e2b,
+                          scene_x, scene_y, scene_z,
+                          max_iter, criter, sol):
+    """
+    Replace the interpolated phi/lam of the given grid cells by the exact solve, in place, each pixel seeded from its interpolated value.
+
+    Args:
+        cell_rows: Cell index along the lines, cell a spanning the lines
+            [node_rows[a], node_rows[a + 1]).
+        cell_cols: Cell index along the pixels.
+
+    Returns:
+        hist: Iteration histogram per cell.
+    """
+    n = cell_rows.size
+    hist = np.zeros((n, max_iter + 2), dtype=np.int64)
+    slant_range0 = sol * (near_range_t + first_pix * pixel_time_int) / 2
+    slant_range_step = sol * multiP * pixel_time_int / 2
+    for c in prange(n):
+        a = cell_rows[c]
+        b = cell_cols[c]
+        # Cells are half-open except the last ones, as in interpolate_geocoding_grid,
+        # so that no pixel belongs to two cells
+        i_end = node_rows[a + 1] + 1 if a == node_rows.size - 2 else node_rows[a + 1]
+        j_end = node_cols[b + 1] + 1 if b == node_cols.size - 2 else node_cols[b + 1]
+        for i in range(node_rows[a], i_end):
+            pos_sat = orbit_pos_arr[i]
+            vel_sat = orbit_vel_arr[i]
+            for j in range(node_cols[b], j_end):
+                height = dem[i, j]
+                if np.isnan(height) or np.isinf(height):
+                    continue
+                lat, lon, n_iter = _solve_pixel(pos_sat, vel_sat, slant_range0 + j * slant_range_step,
+                                                height, phi[i, j], lam[i, j],
+                                                ell_a, ell_b, ell_e2, ell_e2b,
+                                                scene_x, scene_y, scene_z, max_iter, criter)
+                if n_iter < 0:
+                    hist[c, max_iter + 1] += 1
+                else:
+                    hist[c, n_iter] += 1
+                phi[i, j] = lat
+                lam[i, j] = lon
+    return hist
+
+
+@njit(parallel=True, fastmath=_FASTMATH, cache=True)
+def compute_geometry_from_lut(dem, phi, lam, orbit_pos_arr, orbit_vel_arr,
+                              first_pix, multiP, near_range_t, pixel_time_int,
+                              ell_a, ell_b, ell_e2, sol, geometry, mask):
+    """
+    Geometry LUTs of a tile geocoded on the coarse grid, from the ground
+    position of each pixel rebuilt from its latitude/longitude and height.
+    The float32 latitude/longitude resolve about 0.5 m, so the slant range is
+    written from the range time instead.
+
+    Args:
+        dem: DEM tile in radar coordinates.
+        phi, lam: Geocoded latitude/longitude of the tile in degrees.
+        orbit_pos_arr, orbit_vel_arr: Satellite state per line of the tile.
+        (range geometry and ellipsoid as in compute_geocoding_core)
+        geometry: float32 output [len(GEOMETRY_PRODUCTS), lines, pixels].
+        mask: uint8 layover/shadow output [lines, pixels], or empty.
+
+    Returns:
+        result: None.
+    """
+    lines, pixels = dem.shape
+    with_mask = mask.shape[0] == lines and mask.shape[1] == pixels
+    slant_range0 = sol * (near_range_t + first_pix * pixel_time_int) / 2
+    slant_range_step = sol * multiP * pixel_time_int / 2
+    for i in prange(lines):
+        ground_angle = np.full(pixels if with_mask else 0, np.nan)
+        look_angle = np.full(pixels if with_mask else 0, np.nan)
+        for j in range(pixels):
+            height = dem[i, j]
+            if np.isnan(phi[i, j]) or np.isnan(lam[i, j]) or np.isnan(height) or np.isinf(height):
+                continue
+            sin_lat = math.sin(math.radians(phi[i, j]))
+            cos_lat = math.cos(math.radians(phi[i, j]))
+            n = ell_a / math.sqrt(1.0 - ell_e2 * sin_lat * sin_lat)
+            px = (n + height) * cos_lat * math.cos(math.radians(lam[i, j]))
+            py = (n + height) * cos_lat * math.sin(math.radians(lam[i, j]))
+            pz = ((1.0 - ell_e2) * n + height) * sin_lat
+            angles = _pixel_geometry(px, py, pz, phi[i, j], lam[i, j], orbit_pos_arr[i], orbit_vel_arr[i],
+                                     ell_a + height, ell_b + height, geometry, i, j)
+            geometry[4, i, j] = slant_range0 + j * slant_range_step
+            if with_mask:
+                ground_angle[j], look_angle[j] = angles
+        if with_mask:
+            _layover_shadow(ground_angle, look_angle, mask[i])
+
+
+def _grid_nodes(size: int, step: int) -> np.ndarray:
+    """Node positions every step samples, the last sample always included (at least two nodes)."""
+    nodes = np.unique(np.append(np.arange(0, size, step), size - 1))
+    return nodes if nodes.size > 1 else np.repeat(nodes, 2)
+
+
+def _grid_cell(nodes: np.ndarray, index: np.ndarray) -> np.ndarray:
+    """Cell of each index, cell a spanning [nodes[a], nodes[a + 1]) and the last one closed."""
+    return np.clip(np.searchsorted(nodes, index, side='right') - 1, 0, nodes.size - 2)
+
+
+def compute_geocoding_grid(dem, orbit_pos_arr, orbit_vel_arr,
+                           first_pix, multiP, near_range_t, pixel_time_int,
+                           ellipsoid, scene_x, scene_y, scene_z,
+                           max_iter, criter, sol,
+                           grid_step=16, tolerance_m=0.1, n_samples=1000,
+                           n_levels=3, seed=0):
+    """
+    Geocode a DEM tile on a coarse grid with bounded interpolation error.
+
+    The Newton solve runs on nodes every grid_step lines/pixels at n_levels
+    heights spanning the DEM tile, and the pixels are interpolated from the
+    nodes (compute_geocoding_nodes, interpolate_geocoding_grid). The centre
+    of every cell and n_samples random pixels are then solved exactly; a
+    cell where the error exceeds tolerance_m is solved exactly.
+
+    Args:
+        dem: DEM tile in radar coordinates.
+        ellipsoid: Ellipsoid object.
+        grid_step: Node spacing in (multilooked) lines and pixels.
+        tolerance_m: Maximum interpolation error [m].
+        n_samples: Number of random pixels checked, on top of the cell centres.
+        n_levels: Number of height levels (2: linear in height).
+        seed: Seed of the random pixels.
+        (other arguments as in compute_geocoding_core)
+
+    Returns:
+        geocode_grid_result: Tuple (phi, lam, hist, info), phi/lam as returned
+        by compute_geocoding_core, hist the iteration histogram of the exact
+        solves and info a dict with the node, checked pixel and refined cell
+        counts and the maximum error of the cells kept interpolated [m].
+    """
+    lines, pixels = dem.shape
+    info = {"nodes": 0, "checked": 0, "cells": 0, "refined": 0, "error_max": 0.0}
+    valid = np.isfinite(dem)
+    if not valid.any():
+        return (np.full(dem.shape, np.nan, dtype=np.float32), np.full(dem.shape, np.nan, dtype=np.float32),
+                np.zeros((1, max_iter + 2), dtype=np.int64), info)
+
+    node_rows = _grid_nodes(lines, grid_step)
+    node_cols = _grid_nodes(pixels, grid_step)
+    h_min, h_max = float(dem[valid].min()), float(dem[valid].max())
+    if h_max - h_min < 1.0:
+        h_min, h_max = h_min - 0.5, h_max + 0.5
+    # Height levels at the Chebyshev points of [h_min, h_max], the
+    # interpolation polynomial in height being fitted through them
+    h_centre, h_scale = (h_max + h_min) / 2.0, (h_max - h_min) / 2.0
+    levels = np.cos(np.pi * (np.arange(max(2, n_levels)) + 0.5) / max(2, n_levels))[::-1]
+    heights = h_centre + h_scale * levels
+    ell = (ellipsoid.a, ellipsoid.b, ellipsoid.e2, ellipsoid.e2b)
+    scene = (scene_x, scene_y, scene_z)
+    geometry = (first_pix, multiP, near_range_t, pixel_time_int)
+
+    lat_nodes, lon_nodes, hist = compute_geocoding_nodes(
+        node_rows, node_cols, heights, orbit_pos_arr, orbit_vel_arr,
+        *geometry, *ell, *scene, max_iter, criter, sol)
+    # Unwrap the longitudes, so that the interpolation is continuous across +-180
+    finite = np.isfinite(lon_nodes)
+    if finite.any():
+        ref = lon_nodes[finite][0]
+        lon_nodes = ref + (lon_nodes - ref + 180.0) % 360.0 - 180.0
+    # Polynomial coefficients in the normalized height of each node
+    vandermonde_inv = np.linalg.inv(np.vander(levels, increasing=True))
+    lat_coef = np.ascontiguousarray(np.einsum('mk,kab->mab', vandermonde_inv, lat_nodes))
+    lon_coef = np.ascontiguousarray(np.einsum('mk,kab->mab', vandermonde_inv, lon_nodes))
+    phi, lam = interpolate_geocoding_grid(dem, node_rows, node_cols, h_centre, h_scale, lat_coef, lon_coef)
+    hist = hist.sum(axis=0, keepdims=True)
+
+    # Check the centre of every cell and random pixels against the exact solve
+    n_cells = (node_rows.size - 1) * (node_cols.size - 1)
+    centre_rows = (node_rows[:-1] + node_rows[1:]) // 2
+    centre_cols = (node_cols[:-1] + node_cols[1:]) // 2
+    rng = np.random.default_rng(seed)
+    rows = np.concatenate([np.repeat(centre_rows, centre_cols.size), rng.integers(0, lines, n_samples)])
+    cols = np.concatenate([np.tile(centre_cols, centre_rows.size), rng.integers(0, pixels, n_samples)])
+    lat, lon = solve_geocoding_pixels(dem, rows, cols, phi, lam, orbit_pos_arr, orbit_vel_arr,
+                                      *geometry, *ell, *scene, max_iter, criter, sol)
+
+    # Error [m] on the ellipsoid of the interpolation before the float32
+    # rounding of the LUT; a pixel valid in only one of the two fails the check
+    cell_rows = _grid_cell(node_rows, rows)
+    cell_cols = _grid_cell(node_cols, cols)
+    interp_lat, interp_lon = interpolate_geocoding_pixels(dem, rows, cols, cell_rows, cell_cols,
+                                                          node_rows, node_cols, h_centre, h_scale,
+                                                          lat_coef, lon_coef)
+    d_lon = (interp_lon - lon + 180.0) % 360.0 - 180.0
+    error = ellipsoid.a * np.hypot(np.radians(interp_lat - lat), np.radians(d_lon) * np.cos(np.radians(lat)))
+    checked = np.isfinite(dem[rows, cols])
+    error = np.where(np.isnan(lat) & np.isnan(interp_lat), 0.0, error)
+    error = np.where(np.isnan(error), np.inf, error)
+    error[~checked] = 0.0
+
+    cell = cell_rows * (node_cols.size - 1) + cell_cols
+    refine = np.unique(cell[error > tolerance_m])
+    if refine.size:
+        refine_hist = solve_geocoding_cells(dem, phi, lam, refine // (node_cols.size - 1), refine % (node_cols.size - 1),
+                                            node_rows, node_cols, orbit_pos_arr, orbit_vel_arr,
+                                            *geometry, *ell, *scene, max_iter, criter, sol)
+        hist += refine_hist.sum(axis=0)
+
+    kept = ~np.isin(cell, refine)
+    info.update(nodes=int(node_rows.size * node_cols.size * heights.size), checked=int(checked.sum()),
+                cells=n_cells, refined=int(refine.size),
+                error_max=float(error[kept].max()) if kept.any() else 0.0)
+    return phi, lam, hist, info
+
+
+def iteration_summary(hist: np.ndarray) -> str:
+    """
+    Summarize the Newton iteration histogram of the geocoding kernel.
+
+    Args:
+        hist: Histogram per line (or summed), as returned by compute_geocoding_core.
+
+    Returns:
+        summary: One line of text for the log.
+    """
+    counts = hist.reshape(-1, hist.shape[-1]).sum(axis=0)
+    converged = counts[:-1]
+    total = int(counts.sum())
+    if total == 0:
+        return "Newton iterations: no valid pixel"
+    n_converged = int(converged.sum())
+    mean = float((converged * np.arange(converged.size)).sum()) / max(1, n_converged)
+    bins = ", ".join(f"{k}: {100.0 * c / total:.1f}%" for k, c in enumerate(converged) if c)
+    return (f"Newton iterations: mean {mean:.2f}, max {int(np.flatnonzero(converged).max()) if n_converged else 0} "
+            f"[{bins}], not converged: {int(counts[-1])}")
+
+
+def warmup() -> float:
+    """
+    Compile the Numba kernels into the on-disk cache by running them on a tiny
+    input with the argument types of a real run.
+
+    Returns:
+        elapsed: Compile (or cache load) time [s].
+    """
+    start_time = time.time()
+    orbit = Orbit(interp_method=ORB_SPLINE)
+    orbit_time = np.arange(8.0)
+    orbit.set_data(orbit_time, 7.0e6 + orbit_time, orbit_time, orbit_time)
+    orbit.get_xyz_array(orbit_time)
+    orbit.interp_method = 3
+    orbit.compute_coefficients()
+    orbit.get_xyz_array(orbit_time)
+
+    dem = np.zeros((2, 2), dtype=np.float32)
+    orbit_pos = np.array([[7.0e6, 0.0, 0.0]] * 2)
+    orbit_vel = np.array([[0.0, 7.5e3, 0.0]] * 2)
+    ellipsoid = Ellipsoid()
+    compute_geocoding_core(dem, orbit_pos, orbit_vel,
+                           0.0, 0.0, 1.0, 1.0,
+                           5.0e-3, 1.0e-8,
+                           ellipsoid.a, ellipsoid.b, ellipsoid.e2, ellipsoid.e2b,
+                           6.4e6, 0.0, 0.0,
+                           100, 1e-6, SOL,
+                           np.empty((len(GEOMETRY_PRODUCTS), 0, 0), dtype=np.float32),
+                           np.empty((0, 0), dtype=np.uint8))
+    geometry = np.empty((len(GEOMETRY_PRODUCTS), 2, 2), dtype=np.float32)
+    mask = np.zeros((2, 2), dtype=np.uint8)
+    compute_geocoding_core(dem, orbit_pos, orbit_vel,
+                           0.0, 0.0, 1.0, 1.0,
+                           5.0e-3, 1.0e-8,
+                           ellipsoid.a, ellipsoid.b, ellipsoid.e2, ellipsoid.e2b,
+                           6.4e6, 0.0, 0.0,
+                           100, 1e-6, SOL, geometry, mask)
+    compute_geometry_from_lut(dem, dem, dem, orbit_pos, orbit_vel,
+                              0.0, 1.0, 5.0e-3, 1.0e-8,
+                              ellipsoid.a, ellipsoid.b, ellipsoid.e2, SOL, geometry, mask)
+    compute_geocoding_grid(dem, orbit_pos, orbit_vel,
+                           0.0, 1.0, 5.0e-3, 1.0e-8,
+                           ellipsoid, 6.4e6, 0.0, 0.0,
+                           100, 1e-6, SOL, grid_step=1, n_samples=1)
+    return time.time() - start_time
+
+
 # ------------------------------------------------------------------------
 # Geocoding Processor - Generate LUT for Geocoding with DEM
 # ------------------------------------------------------------------------
@@ -463,7 +1337,8 @@ class GeocodingProcessor:
     using precise orbit information and zero-Doppler geometry.
     """
 
-    def __init__(self, memory_mb: int = None, n_workers: Optional[int] = None, log_file: Optional[str] = None):
+    def __init__(self, memory_mb: int = None, n_workers: Optional[int] = None, log_file: Optional[str] = None,
+                 mode: str = "exact", grid_step: int = 16, tolerance_m: float = 0.1, check_samples: int = 1000):
         """
         Initialize the geocoding processor.
 
@@ -471,6 +1346,11 @@ class GeocodingProcessor:
             memory_mb: Available memory for buffers [MB]
             n_workers: Number of worker processes.
             log_file: Optional log file path
+            mode: "exact" solves every pixel, "grid" solves a coarse grid and
+                interpolates (compute_geocoding_grid)
+            grid_step: Node spacing of the grid mode [multilooked lines/pixels]
+            tolerance_m: Maximum interpolation error of the grid mode [m]
+            check_samples: Random pixels checked per tile in the grid mode
 
         Returns:
             result: None.
@@ -500,6 +1380,35 @@ class GeocodingProcessor:
         if log_file:
             set_log_file(log_file)
 
+        if mode not in ("exact", "grid"):
+            raise ValueError(f"Unknown geocoding mode: {mode}")
+        self.mode = mode
+        self.grid_step = max(1, int(grid_step))
+        self.tolerance_m = float(tolerance_m)
+        self.check_samples = int(check_samples)
+
+        # Statistics of the last LUT (valid count, lat/lon ranges)
+        self.stats = None
+
+    def tile_lines(self, pixels: int, geometry: bool = False) -> int:
+        """
+        Number of lines of a geocoding tile within the memory budget.
+
+        Args:
+            pixels: Number of pixels per line.
+            geometry: Whether the geometry LUTs are computed too.
+
+        Returns:
+            lines: Lines per tile, at least 1.
+        """
+        # float32 DEM copy, lat and lon of the tile, plus the iteration
+        # histogram and the orbit state of each line
+        bytes_per_line = pixels * 3 * 4 + (self.MAXITER + 2) * 8 + 6 * 8
+        if geometry:
+            # float32 geometry bands and the uint8 layover/shadow mask
+            bytes_per_line += pixels * (len(GEOMETRY_PRODUCTS) * 4 + 1)
+        return max(1, int(self.memory_mb * 1024 * 1024) // bytes_per_line)
+
     def create_lut_forwardgeocode(self,
                                   dem_radar: np.ndarray,
                                   orbit: 'Orbit',
@@ -513,7 +1422,8 @@ class GeocodingProcessor:
         This implementation follows the lph2xyz reference behavior.
 
         Args:
-            dem_radar: Multilooked DEM in radar coordinates [H, W]
+            dem_radar: Multilooked DEM in radar coordinates [H, W], typically a memmap
+                read tile by tile
             orbit: Orbit object with get_xyz(t) and get_xyz_dot(t)
             image_geom: ImageGeometry with line2ta(line) method
             product_info: ProductInfo with necessary metadata
@@ -522,7 +1432,7 @@ class GeocodingProcessor:
             overwrite: Whether to overwrite existing output files
 
         Returns:
-            geocode_lut: Tuple (PHI, LAMBDA) in degrees.
+            geocode_lut: Tuple (PHI, LAMBDA) in degrees, read-only memmaps of the output files.
         """
 
         _print("="*70)
@@ -554,19 +1464,11 @@ class GeocodingProcessor:
 
         # Pre-compute orbit state vectors for all lines
         unique_lines = np.arange(ml_lines) * multiL + very_first_line
-        az_times = np.array([image_geom.line2ta(line) for line in unique_lines])
-
-        # Cache orbit data
-        n_orbit_points = len(az_times)
-        orbit_pos = np.zeros((n_orbit_points, 3))
-        orbit_vel = np.zeros((n_orbit_points, 3))
+        az_times = image_geom.line2ta(unique_lines)
 
         _print("Pre-computing orbit state vectors...")
-        for i, t in enumerate(az_times):
-            pos = orbit.get_xyz(t)
-            vel = orbit.get_xyz_dot(t)
-            orbit_pos[i] = [pos.x, pos.y, pos.z]
-            orbit_vel[i] = [vel.x, vel.y, vel.z]
+        orbit_pos = orbit.get_xyz_array(az_times)
+        orbit_vel = orbit.get_xyz_dot_array(az_times)
 
         # Compute scene center for initial guess
         image_center_line = very_first_line + (ml_lines / 2.0) * multiL
@@ -664,187 +1566,145 @@ class GeocodingProcessor:
             _print(f"Initial guess: lat={scene_lat_init:.4f}°, lon={scene_lon_init:.4f}°, h={scene_height_init:.1f}m")
 
         _print(f"Expected from res: lat={image_geom.scene_center_lat:.4f}°, lon={image_geom.scene_center_lon:.4f}°")
-        # Numba-accelerated core computation
-
-        @jit(nopython=True, parallel=True, fastmath=True)
-        def compute_geocoding_core(dem, orbit_pos_arr, orbit_vel_arr,
-                                   first_line, first_pix, multiL, multiP,
-                                   near_range_t, pixel_time_int,
-                                   ell_a, ell_b, ell_e2, ell_e2b,
-                                   scene_x, scene_y, scene_z,
-                                   max_iter, criter, sol):
-            """
-            Compute geocoding latitude/longitude arrays in the Numba kernel.
-
-            Args:
-                dem: DEM grid in radar coordinates.
-                orbit_pos_arr: Satellite position array per azimuth line.
-                orbit_vel_arr: Satellite velocity array per azimuth line.
-                first_line: First line index in source geometry.
-                first_pix: First pixel index in source geometry.
-                multiL: Azimuth multilook factor.
-                multiP: Range multilook factor.
-                near_range_t: Near range time in seconds.
-                pixel_time_int: Pixel time interval in seconds.
-                ell_a: Ellipsoid semi-major axis.
-                ell_b: Ellipsoid semi-minor axis.
-                ell_e2: First eccentricity squared.
-                ell_e2b: Second eccentricity squared.
-                scene_x: Initial scene center X in ECEF.
-                scene_y: Initial scene center Y in ECEF.
-                scene_z: Initial scene center Z in ECEF.
-                max_iter: Maximum iteration count.
-                criter: Convergence threshold.
-                sol: Speed of light constant.
-
-            Returns:
-                geocode_core_result: Tuple (phi, lam) in degrees.
-            """
-            lines, pixels = dem.shape
-            phi = np.full((lines, pixels), np.nan, dtype=np.float32)
-            lam = np.full((lines, pixels), np.nan, dtype=np.float32)
-
-            for i in prange(lines):
-                # Get orbit state for this line
-                pos_sat = orbit_pos_arr[i]
-                vel_sat = orbit_vel_arr[i]
-
-                for j in range(pixels):
-                    height = dem[i, j]
-                    if np.isnan(height) or np.isinf(height):
-                        continue
-
-                    # Calculate pixel and range time
-                    pixel = first_pix + j * multiP
-                    # Try WITHOUT the -1.0 offset (C++ might not use it)
-                    range_time = near_range_t + pixel * pixel_time_int
-
-                    # Elevated ellipsoid parameters
-                    a_elev = ell_a + height
-                    b_elev = ell_b + height
-
-                    # Initial guess: scene center (matches lph2xyz)
-                    posonellx = scene_x
-                    posonelly = scene_y
-                    posonellz = scene_z
-
-                    # Newton-Raphson iteration
-                    for iteration in range(max_iter):
-                        # Vector from satellite to point
-                        dsat_Px = posonellx - pos_sat[0]
-                        dsat_Py = posonelly - pos_sat[1]
-                        dsat_Pz = posonellz - pos_sat[2]
-
-                        # Evaluate equations (NEGATED - matches lph2xyz)
-                        # 1. Doppler equation
-                        f1 = -(vel_sat[0]*dsat_Px + vel_sat[1]*dsat_Py + vel_sat[2]*dsat_Pz)
-
-                        # 2. Range equation
-                        # CRITICAL: In lph2xyz, this is slant_range, NOT range_time
-                        # slant_range = SOL * range_time (one-way)
-                        # Test fix.
-                        slant_range = sol * range_time / 2
-                        f2 = -(dsat_Px*dsat_Px + dsat_Py*dsat_Py + dsat_Pz*dsat_Pz -
-                               slant_range**2)
-
-                        # 3. Ellipsoid equation (matches lph2xyz format exactly)
-                        f3 = -((posonellx*posonellx + posonelly*posonelly) / (a_elev**2) +
-                               (posonellz/b_elev)**2 - 1.0)
-
-                        # Build Jacobian
-                        J00 = vel_sat[0]
-                        J01 = vel_sat[1]
-                        J02 = vel_sat[2]
-
-                        J10 = 2.0 * dsat_Px
-                        J11 = 2.0 * dsat_Py
-                        J12 = 2.0 * dsat_Pz
-
-                        # KEY: Uses ELEVATED parameters (matches lph2xyz)
-                        J20 = (2.0 * posonellx) / (a_elev**2)
-                        J21 = (2.0 * posonelly) / (a_elev**2)
-                        J22 = (2.0 * posonellz) / (b_elev**2)
-
-                        # Solve using Cramer's rule: J * sol = equationset
-                        det = (J00*(J11*J22 - J12*J21) -
-                               J01*(J10*J22 - J12*J20) +
-                               J02*(J10*J21 - J11*J20))
-
-                        if abs(det) < 1e-20:
-                            break
-
-                        # Cramer's rule (solving J * [solx, soly, solz]^T = [f1, f2, f3]^T)
-                        solx = (f1*(J11*J22 - J12*J21) -
-                                J01*(f2*J22 - J12*f3) +
-                                J02*(f2*J21 - J11*f3)) / det
-
-                        soly = (J00*(f2*J22 - J12*f3) -
-                                f1*(J10*J22 - J12*J20) +
-                                J02*(J10*f3 - f2*J20)) / det
-
-                        solz = (J00*(J11*f3 - f2*J21) -
-                                J01*(J10*f3 - f2*J20) +
-                                f1*(J10*J21 - J11*J20)) / det
-
-                        # Update solution
-                        posonellx += solx
-                        posonelly += soly
-                        posonellz += solz
-
-                        # Check convergence
-                        if abs(solx) < criter and abs(soly) < criter and abs(solz) < criter:
-                            # Convert to lat/lon using Bowring's method
-                            r = math.sqrt(posonellx**2 + posonelly**2)
-                            mu = math.atan2(posonellz * ell_a, r * ell_b)
-
-                            sin_mu = math.sin(mu)
-                            cos_mu = math.cos(mu)
-                            sin3 = sin_mu**3
-                            cos3 = cos_mu**3
-
-                            lat = math.atan2(
-                                posonellz + ell_e2b * ell_b * sin3,
-                                r - ell_e2 * ell_a * cos3
-                            )
-                            lon = math.atan2(posonelly, posonellx)
-
-                            phi[i, j] = math.degrees(lat)
-                            lam[i, j] = math.degrees(lon)
-                            break
-
-            return phi, lam
 
+        # Geometry LUTs computed in the same pass
+        geometry_outputs = dict(geocode_input.geometry_outputs or {})
+        unknown = set(geometry_outputs) - set(GEOMETRY_PRODUCTS) - {"layover_shadow"}
+        if unknown:
+            raise ValueError(f"Unknown geometry products: {', '.join(sorted(unknown))}")
+        with_geometry = bool(geometry_outputs)
+        with_mask = "layover_shadow" in geometry_outputs
+        if with_geometry:
+            _print(f"Geometry LUTs: {', '.join(geometry_outputs)}")
+
+        if not overwrite:
+            if os.path.exists(geocode_input.output_phi):
+                raise FileExistsError(f"File exists: {geocode_input.output_phi}")
+            if os.path.exists(geocode_input.output_lambda):
+                raise FileExistsError(f"File exists: {geocode_input.output_lambda}")
+            for output in geometry_outputs.values():
+                if os.path.exists(output):
+                    raise FileExistsError(f"File exists: {output}")
+
+        # Tiles of whole lines sized by the memory budget, so that the peak
+        # memory does not depend on the image size
+        tile_lines = self.tile_lines(ml_pixels, geometry=with_geometry)
+        n_tiles = -(-ml_lines // tile_lines)
+        _print(f"Tiling: {n_tiles} tile(s) of up to {tile_lines} lines ({self.memory_mb} MB budget)")
+
+        # Numba-accelerated core computation (module-level kernel, cached on disk)
         _print("Running Numba-accelerated geocoding...")
+        if self.mode == "grid":
+            _print(f"Grid mode: nodes every {self.grid_step} lines/pixels, tolerance {self.tolerance_m} m")
         start_time = time.time()
-
-        # Run computation
-        PHI, LAMBDA = compute_geocoding_core(
-            dem_radar.astype(np.float32),
-            orbit_pos, orbit_vel,
-            very_first_line, first_pixel,
-            multiL, multiP,
-            image_geom.near_range_time,
-            image_geom.pixel_time_interval,
-            ellipsoid.a, ellipsoid.b, ellipsoid.e2, ellipsoid.e2b,
-            scene_center_x, scene_center_y, scene_center_z,
-            self.MAXITER, self.CRITERPOS, SOL
-        )
+        iteration_hist = np.zeros(self.MAXITER + 2, dtype=np.int64)
+        stats = {"valid": 0, "lat_min": np.inf, "lat_max": -np.inf, "lon_min": np.inf, "lon_max": -np.inf}
+        grid_stats = {"nodes": 0, "checked": 0, "cells": 0, "refined": 0, "error_max": 0.0}
+
+        # The LUTs are written tile by tile into pre-sized temporary files,
+        # renamed once complete so that a killed run never leaves a truncated
+        # LUT behind. Each tile is mapped on its own and unmapped once written,
+        # so the mapped pages do not add up to the size of the LUTs
+        with ExitStack() as stack:
+            tmp_phi = stack.enter_context(atomic_path(geocode_input.output_phi))
+            tmp_lambda = stack.enter_context(atomic_path(geocode_input.output_lambda))
+            tmp_geometry = {product: stack.enter_context(atomic_path(output))
+                            for product, output in geometry_outputs.items()}
+            for tmp_path in (tmp_phi, tmp_lambda, *tmp_geometry.values()):
+                itemsize = 1 if tmp_path == tmp_geometry.get("layover_shadow") else 4
+                with open(tmp_path, 'wb') as f:
+                    f.truncate(ml_lines * ml_pixels * itemsize)
+
+            for tile, r0 in enumerate(range(0, ml_lines, tile_lines)):
+                r1 = min(r0 + tile_lines, ml_lines)
+                tile_start = time.time()
+                dem_tile = read_rows(dem_radar, r0, r1)
+                tile_shape = (r1 - r0, ml_pixels) if with_geometry else (0, 0)
+                geometry = np.full((len(GEOMETRY_PRODUCTS),) + tile_shape, np.nan, dtype=np.float32)
+                mask = np.zeros(tile_shape if with_mask else (0, 0), dtype=np.uint8)
+                if self.mode == "grid":
+                    phi, lam, hist, info = compute_geocoding_grid(
+                        dem_tile,
+                        orbit_pos[r0:r1], orbit_vel[r0:r1],
+                        first_pixel, multiP,
+                        image_geom.near_range_time,
+                        image_geom.pixel_time_interval,
+                        ellipsoid,
+                        scene_center_x, scene_center_y, scene_center_z,
+                        self.MAXITER, self.CRITERPOS, SOL,
+                        grid_step=self.grid_step, tolerance_m=self.tolerance_m,
+                        n_samples=self.check_samples, seed=tile
+                    )
+                    for key in ("nodes", "checked", "cells", "refined"):
+                        grid_stats[key] += info[key]
+                    grid_stats["error_max"] = max(grid_stats["error_max"], info["error_max"])
+                    if with_geometry:
+                        compute_geometry_from_lut(dem_tile, phi, lam, orbit_pos[r0:r1], orbit_vel[r0:r1],
+                                                  first_pixel, multiP,
+                                                  image_geom.near_range_time, image_geom.pixel_time_interval,
+                                                  ellipsoid.a, ellipsoid.b, ellipsoid.e2, SOL, geometry, mask)
+                else:
+                    phi, lam, hist = compute_geocoding_core(
+                        dem_tile,
+                        orbit_pos[r0:r1], orbit_vel[r0:r1],
+                        very_first_line + r0 * multiL, first_pixel,
+                        multiL, multiP,
+                        image_geom.near_range_time,
+                        image_geom.pixel_time_interval,
+                        ellipsoid.a, ellipsoid.b, ellipsoid.e2, ellipsoid.e2b,
+                        scene_center_x, scene_center_y, scene_center_z,
+                        self.MAXITER, self.CRITERPOS, SOL,
+                        geometry, mask
+                    )
+                tile_outputs = [(tmp_phi, phi), (tmp_lambda, lam)]
+                for product, tmp_path in tmp_geometry.items():
+                    tile_outputs.append((tmp_path, mask if product == "layover_shadow"
+                                         else geometry[GEOMETRY_PRODUCTS.index(product)]))
+                for tmp_path, values in tile_outputs:
+                    tile_map = np.memmap(tmp_path, dtype=values.dtype, mode='r+',
+                                         offset=r0 * ml_pixels * values.itemsize, shape=(r1 - r0, ml_pixels))
+                    tile_map[:] = values
+                    tile_map.flush()
+                    del tile_map
+
+                iteration_hist += hist.sum(axis=0)
+                valid = np.isfinite(phi) & np.isfinite(lam)
+                n_valid = int(valid.sum())
+                if n_valid:
+                    stats["valid"] += n_valid
+                    stats["lat_min"] = min(stats["lat_min"], float(phi[valid].min()))
+                    stats["lat_max"] = max(stats["lat_max"], float(phi[valid].max()))
+                    stats["lon_min"] = min(stats["lon_min"], float(lam[valid].min()))
+                    stats["lon_max"] = max(stats["lon_max"], float(lam[valid].max()))
+                if n_tiles > 1:
+                    _print(f"Tile {tile + 1}/{n_tiles} lines [{r0}, {r1}): "
+                           f"valid {100.0 * n_valid / max(1, phi.size):.1f}%, "
+                           f"{time.time() - tile_start:.2f} s, {iteration_summary(hist)}")
+                del phi, lam, hist, valid, dem_tile, geometry, mask, tile_outputs
 
         elapsed_time = time.time() - start_time
         _print(f"Computation completed in {elapsed_time:.2f} seconds")
-        _print(f"Processing rate: {ml_lines * ml_pixels / elapsed_time:.0f} points/second")
+        _print(f"Processing rate: {ml_lines * ml_pixels / max(elapsed_time, 1e-9):.0f} points/second")
+        _print(iteration_summary(iteration_hist))
+        if self.mode == "grid":
+            _print(f"Grid: {grid_stats['nodes']} node solves, {grid_stats['checked']} pixels checked, "
+                   f"{grid_stats['refined']} / {grid_stats['cells']} cells solved exactly, "
+                   f"max checked error of the interpolated cells {grid_stats['error_max']:.4f} m")
 
         # Check results
-        valid_mask = np.isfinite(PHI) & np.isfinite(LAMBDA)
-        valid_count = np.sum(valid_mask)
-        total_count = PHI.size
+        valid_count = stats["valid"]
+        total_count = ml_lines * ml_pixels
+        stats["total"] = total_count
+        if self.mode == "grid":
+            stats["grid"] = grid_stats
+        self.stats = stats
 
         _print(f"Geocoding Results:")
-        _print(f"Output grid shape: {PHI.shape}")
+        _print(f"Output grid shape: {(ml_lines, ml_pixels)}")
 
         if valid_count > 0:
-            _print(f"Latitude range: [{np.nanmin(PHI):.6f}, {np.nanmax(PHI):.6f}] degrees")
-            _print(f"Longitude range: [{np.nanmin(LAMBDA):.6f}, {np.nanmax(LAMBDA):.6f}] degrees")
+            _print(f"Latitude range: [{stats['lat_min']:.6f}, {stats['lat_max']:.6f}] degrees")
+            _print(f"Longitude range: [{stats['lon_min']:.6f}, {stats['lon_max']:.6f}] degrees")
             _print(f"Valid points: {valid_count} / {total_count} ({valid_count/total_count*100:.1f}%)")
         else:
             _print("WARNING: All outputs are NaN! Check:")
@@ -852,25 +1712,15 @@ class GeocodingProcessor:
             _print("  2. Orbit data is correct")
             _print("  3. Image geometry parameters are correct")
 
-        # Write output files
-        _print("Writing output files...")
-        if not overwrite:
-            import os
-            if os.path.exists(geocode_input.output_phi):
-                raise FileExistsError(f"File exists: {geocode_input.output_phi}")
-            if os.path.exists(geocode_input.output_lambda):
-                raise FileExistsError(f"File exists: {geocode_input.output_lambda}")
-
-        PHI.tofile(geocode_input.output_phi)
         _print(f"Data_output_file_phi: {geocode_input.output_phi}")
-
-        LAMBDA.tofile(geocode_input.output_lambda)
         _print(f"Data_output_file_lambda: {geocode_input.output_lambda}")
 
         _print("="*70)
         _print("GEOCODING FINISHED")
         _print("="*70)
 
+        PHI = np.memmap(geocode_input.output_phi, dtype=np.float32, mode='r', shape=(ml_lines, ml_pixels))
+        LAMBDA = np.memmap(geocode_input.output_lambda, dtype=np.float32, mode='r', shape=(ml_lines, ml_pixels))
         return PHI, LAMBDA
 
 # ------------------------------------------------------------------------
@@ -896,10 +1746,41 @@ class RDCGEOConverter:
         """
         self.nlines = nlines
         self.npixels = npixels
-        self.lat_lut = read_dem_binary(lat_lut, self.nlines, self.npixels)
-        self.lon_lut = read_dem_binary(lon_lut, self.nlines, self.npixels)
+        self.lat_path = lat_lut
+        self.lon_path = lon_lut
+        # Read-only maps, the pages are read when touched
+        self.lat_lut = open_dem_memmap(lat_lut, self.nlines, self.npixels)
+        self.lon_lut = open_dem_memmap(lon_lut, self.nlines, self.npixels)
         if self.lat_lut.shape != self.lon_lut.shape:
             raise ValueError("Latitude and Longitude LUTs must have the same shape.")
+        self._index = None
+
+    @property
+    def index(self) -> LUTIndex:
+        """
+        Spatial index of the LUTs, loaded from (or built and saved to)
+        lat.index.npz next to the latitude LUT on first use.
+
+        Returns:
+            index: The LUTIndex.
+        """
+        if self._index is None:
+            self._index = LUTIndex.for_lut(self.lat_path, self.lon_path, self.lat_lut, self.lon_lut)
+        return self._index
+
+    def geo_to_radar_many(self, lats, lons, max_dist_deg: float = np.inf) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Convert many geographic coordinates to sub-pixel radar coordinates.
+
+        Args:
+            lats: Latitudes in degrees (array-like).
+            lons: Longitudes in degrees (array-like).
+            max_dist_deg: Points farther than this from every valid pixel get NaN.
+
+        Returns:
+            line_pixel: Tuple (line, pixel) of float64 arrays, 0-based.
+        """
+        return self.index.query(self.lat_lut, self.lon_lut, lats, lons, max_dist_deg=max_dist_deg)
 
     def radar_to_geo(self, line: int, pixel: int) -> Tuple[float, float]:
         """
@@ -929,15 +1810,18 @@ class RDCGEOConverter:
         Returns:
             line_pixel: Tuple (line, pixel) indices.
         """
-        # Find the closest match in the LUTs
-        lat_diff = np.abs(self.lat_lut - lat)
-        lon_diff = np.abs(self.lon_lut - lon)
-        total_diff = lat_diff + lon_diff
-        idx = np.unravel_index(np.argmin(total_diff), total_diff.shape)
-        return idx  # Returns (line, pixel)
+        # Nearest LUT pixel in |dlat| + |dlon|, found around the indexed
+        # sub-pixel position; geo_to_radar_many gives the sub-pixel position
+        line, pixel = self.index.nearest(self.lat_lut, self.lon_lut, [lat], [lon], l1=True)
+        if line[0] < 0:
+            raise ValueError(f"No valid pixel for ({lat}, {lon})")
+        return int(line[0]), int(pixel[0])
 
 
 class RDCGEOConverter_2:
+    # Lines per tile of the lazy valid mask
+    MASK_TILE_LINES = 256
+
     def __init__(self, ranpix: str, azpix: str, nlines: int, npixels: int):
         """
         Initialize a radar-to-geographic converter using backward LUT files.
@@ -952,15 +1836,89 @@ class RDCGEOConverter_2:
         """
         self.nlines = nlines
         self.npixels = npixels
-        self.lon_lut = read_dem_binary(ranpix, self.nlines, self.npixels)  # [line, pixel] → longitude
-        self.lat_lut = read_dem_binary(azpix, self.nlines, self.npixels)   # [line, pixel] → latitude
-        # Create valid mask: both lat and lon must be finite
-        self._valid_mask = np.isfinite(self.lat_lut) & np.isfinite(self.lon_lut)
+        self.lat_path = azpix
+        self.lon_path = ranpix
+        # Read-only maps, the pages are read when touched
+        self.lon_lut = open_dem_memmap(ranpix, self.nlines, self.npixels)  # [line, pixel] → longitude
+        self.lat_lut = open_dem_memmap(azpix, self.nlines, self.npixels)   # [line, pixel] → latitude
+        # Valid mask (both lat and lon finite), computed per tile of lines on first use
+        self._mask_tiles = {}
+        self._valid_mask = None
+        self._index = None
+
+    def valid_mask_tile(self, tile: int) -> np.ndarray:
+        """
+        Return the valid mask of one tile of lines, computed on first use.
+
+        Args:
+            tile: Tile index, lines [tile * MASK_TILE_LINES, (tile + 1) * MASK_TILE_LINES).
+
+        Returns:
+            mask: Read-only boolean array [tile lines, npixels].
+        """
+        r0 = tile * self.MASK_TILE_LINES
+        r1 = min(r0 + self.MASK_TILE_LINES, self.nlines)
+        if not 0 <= r0 < self.nlines:
+            raise IndexError(f"Mask tile {tile} out of bounds.")
+        if self._valid_mask is not None:
+            return self._valid_mask[r0:r1]
+        mask = self._mask_tiles.get(tile)
+        if mask is None:
+            mask = np.isfinite(self.lat_lut[r0:r1]) & np.isfinite(self.lon_lut[r0:r1])
+            mask.flags.writeable = False
+            self._mask_tiles[tile] = mask
+        return mask
+
+    def is_valid(self, line: int, pixel: int) -> bool:
+        """
+        Whether the LUT point of a radar coordinate is finite, computing only
+        the mask tile of that line.
+
+        Args:
+            line: Radar line index.
+            pixel: Radar pixel index.
+
+        Returns:
+            valid: True if both lat and lon are finite.
+        """
+        if not (0 <= line < self.nlines and 0 <= pixel < self.npixels):
+            raise IndexError("Radar coordinates out of bounds.")
+        tile, row = divmod(line, self.MASK_TILE_LINES)
+        return bool(self.valid_mask_tile(tile)[row, pixel])
+
+    @property
+    def index(self) -> LUTIndex:
+        """
+        Spatial index of the LUTs, loaded from (or built and saved to) the
+        .index.npz next to the latitude LUT on first use.
+
+        Returns:
+            index: The LUTIndex.
+        """
+        if self._index is None:
+            self._index = LUTIndex.for_lut(self.lat_path, self.lon_path, self.lat_lut, self.lon_lut)
+        return self._index
+
+    def geo_to_radar_many(self, lats, lons, max_dist_deg: float = 0.1) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Convert many geographic coordinates to sub-pixel radar coordinates.
+
+        Args:
+            lats, lons: Input geographic coordinates (degrees, array-like)
+            max_dist_deg: Maximum allowed distance in degrees to the nearest
+                valid pixel, NaN beyond
+
+        Returns:
+            line_pixel: Tuple (line, pixel) of float64 arrays, 0-based.
+        """
+        return self.index.query(self.lat_lut, self.lon_lut, lats, lons, max_dist_deg=max_dist_deg)
 
     @property
     def valid_mask(self) -> np.ndarray:
         """
-        Return the read-only valid mask of finite LUT points.
+        Return the read-only valid mask of finite LUT points. The whole mask
+        is assembled from the tiles on first access; use is_valid or
+        valid_mask_tile to touch only part of the LUTs.
 
         Args:
             None.
@@ -968,6 +1926,12 @@ class RDCGEOConverter_2:
         Returns:
             mask: Boolean valid-mask array.
         """
+        if self._valid_mask is None:
+            n_tiles = -(-self.nlines // self.MASK_TILE_LINES)
+            mask = np.concatenate([self.valid_mask_tile(tile) for tile in range(n_tiles)], axis=0)
+            mask.flags.writeable = False
+            self._valid_mask = mask
+            self._mask_tiles.clear()
         return self._valid_mask
 
     def radar_to_geo(self, line: int, pixel: int) -> tuple[float, float]:
@@ -1004,15 +1968,12 @@ class RDCGEOConverter_2:
         Raises:
             ValueError if no valid point within max_dist_deg
         """
-        dlat = self.lat_lut - lat
-        dlon = self.lon_lut - lon
-        dist2 = dlat**2 + dlon**2
-        dist2[~self.valid_mask] = np.inf
-        idx = np.argmin(dist2)
-        line, pixel = np.unravel_index(idx, dist2.shape)
-        if dist2[line, pixel] >= max_dist_deg ** 2:
+        # Nearest valid LUT pixel, found around the indexed sub-pixel position;
+        # geo_to_radar_many gives the sub-pixel position
+        line, pixel = self.index.nearest(self.lat_lut, self.lon_lut, [lat], [lon], max_dist_deg=max_dist_deg)
+        if line[0] < 0:
             raise ValueError(f"No valid pixel within {max_dist_deg} degrees")
-        return int(line), int(pixel)
+        return int(line[0]), int(pixel[0])
 
 
 ##########################################################################
@@ -1026,7 +1987,16 @@ def run_geocode_forward(dem_radar_filename: str,
                         alooks: int = 1,
                         output_lat: str = 'lat.rdr',
                         output_lon: str = 'lon.rdr',
-                        log_file: str = 'run_geocode.log') -> None:
+                        log_file: str = 'run_geocode.log',
+                        memory_mb: Optional[int] = None,
+                        mode: str = "exact",
+                        grid_step: int = 16,
+                        tolerance_m: float = 0.1,
+                        incidence: bool = False,
+                        look_vector: bool = False,
+                        slant_range: bool = False,
+                        heading: bool = False,
+                        layover_shadow: bool = False) -> None:
     """
     Generate forward geocoding lookup tables from radar to geographic coordinates.
 
@@ -1038,6 +2008,21 @@ def run_geocode_forward(dem_radar_filename: str,
         output_lat: Output latitude file
         output_lon: Output longitude file
         log_file: Log file name
+        memory_mb: Memory budget sizing the geocoding tiles [MB], half of the
+            available memory by default
+        mode: "exact" or "grid" (coarse grid with bounded interpolation error)
+        grid_step: Node spacing of the grid mode [multilooked lines/pixels]
+        tolerance_m: Maximum interpolation error of the grid mode [m]
+        incidence: Also write incidence.raw, the incidence angle [deg]
+        look_vector: Also write los_e.raw, los_n.raw and los_u.raw, the unit
+            vector from the ground to the satellite in local east/north/up
+        slant_range: Also write slant_range.raw [m]
+        heading: Also write heading.raw, the heading of the satellite [deg,
+            clockwise from north]
+        layover_shadow: Also write layover_shadow.raw, uint8 (1: layover, 2: shadow)
+
+        The geometry LUTs are float32 unless noted, written next to
+        output_lat and computed in the same pass as the lat/lon LUTs.
 
     Returns:
         result: None.
@@ -1057,10 +2042,11 @@ def run_geocode_forward(dem_radar_filename: str,
     # DEM geometry placeholder (replace with DEM metadata when needed).
 
     # Create geocode processor
-    processor = GeocodingProcessor(log_file=log_file)
+    processor = GeocodingProcessor(memory_mb=memory_mb, log_file=log_file,
+                                   mode=mode, grid_step=grid_step, tolerance_m=tolerance_m)
 
-    # Read DEM
-    dem_radar = read_dem_binary(dem_radar_filename, nlines // alooks, npixels // rlooks)
+    # Map the DEM, read tile by tile during the geocoding
+    dem_radar = open_dem_memmap(dem_radar_filename, nlines // alooks, npixels // rlooks)
 
     # Define product info
     product_info = ProductInfo(
@@ -1072,12 +2058,20 @@ def run_geocode_forward(dem_radar_filename: str,
         multilook_P=rlooks
     )
 
+    # Geometry LUTs requested with the lat/lon LUTs
+    selected = {"incidence": incidence, "los_e": look_vector, "los_n": look_vector, "los_u": look_vector,
+                "slant_range": slant_range, "heading": heading, "layover_shadow": layover_shadow}
+    output_dir = os.path.dirname(os.path.abspath(output_lat))
+    geometry_outputs = {product: os.path.join(output_dir, f"{product}.raw")
+                        for product, enabled in selected.items() if enabled}
+
     # Define geocoding parameters
     geocode_input = ForwardGeocodeInput(
         dem_file=dem_radar_filename,
         output_phi=output_lat,
         output_lambda=output_lon,
-        dem_format="real4"
+        dem_format="real4",
+        geometry_outputs=geometry_outputs
     )
 
     # Run geocoding
@@ -1091,18 +2085,109 @@ def run_geocode_forward(dem_radar_filename: str,
             overwrite=True
         )
 
-        # Print statistics
+        # Print statistics, accumulated tile by tile
+        stats = processor.stats
         _print("Geocoding Results:")
         _print(f"- Output grid shape: {lat_grid.shape}")
-        _print(f"- Latitude range: [{np.nanmin(lat_grid):.6f}, {np.nanmax(lat_grid):.6f}] degrees")
-        _print(f"- Longitude range: [{np.nanmin(lon_grid):.6f}, {np.nanmax(lon_grid):.6f}] degrees")
-        _print(f"- Valid points: {np.sum(~np.isnan(lat_grid))} / {lat_grid.size}")
+        _print(f"- Latitude range: [{stats['lat_min']:.6f}, {stats['lat_max']:.6f}] degrees")
+        _print(f"- Longitude range: [{stats['lon_min']:.6f}, {stats['lon_max']:.6f}] degrees")
+        _print(f"- Valid points: {stats['valid']} / {stats['total']}")
     except Exception as e:
         print(f"Error during geocoding: {e}")
         import traceback
         traceback.print_exc()
 
 
+def xyz2lp(pos: Point3D,
+           orbit: 'Orbit',
+           image_geom: 'ImageGeometry',
+           max_iter: int = 20,
+           criter: float = 1e-10) -> Tuple[float, float]:
+    """
+    Convert an ECEF position to radar coordinates (zero-Doppler).
+
+    Solves the Doppler equation for the azimuth time with Newton iterations,
+    then converts the azimuth and the two-way range time to line/pixel.
+
+    Args:
+        pos: Target position in ECEF coordinates [m].
+        orbit: Orbit object with get_xyz/get_xyz_dot/get_xyz_ddot.
+        image_geom: ImageGeometry of the (uncropped) scene.
+        max_iter: Maximum iteration count.
+        criter: Convergence threshold on the azimuth time [s].
+
+    Returns:
+        line_pixel: Tuple (line, pixel), 1-based and fractional.
+    """
+    t_azi = 0.5 * (image_geom.first_line_time + image_geom.last_line_time)
+    for _ in range(max_iter):
+        sat_pos = orbit.get_xyz(t_azi)
+        sat_vel = orbit.get_xyz_dot(t_azi)
+        sat_acc = orbit.get_xyz_ddot(t_azi)
+        dsat_p = pos - sat_pos
+
+        # Doppler equation and its derivative w.r.t. azimuth time
+        sol = -eq1_doppler(sat_vel, dsat_p) / (eq1_doppler(sat_acc, dsat_p) -
+                                              eq1_doppler(sat_vel, sat_vel))
+        t_azi += sol
+        if abs(sol) < criter:
+            break
+
+    t_range = 2.0 * (pos - orbit.get_xyz(t_azi)).norm() / SOL
+    line = (t_azi - image_geom.first_line_time) / image_geom.line_time_interval + 1.0
+    pixel = (t_range - image_geom.near_range_time) / image_geom.pixel_time_interval + 1.0
+    return line, pixel
+
+
+def geo_to_radar_window(resfile: str,
+                        min_lat: float,
+                        max_lat: float,
+                        min_lon: float,
+                        max_lon: float,
+                        margin: int = 0,
+                        height: Optional[float] = None) -> Tuple[int, int, int, int]:
+    """
+    Map a lat/lon bounding box to a crop window of the radar image.
+
+    The box is sampled on a 5x5 grid of points which are converted to radar
+    coordinates with the orbit and scene geometry of the .res file.
+
+    Args:
+        resfile: Doris .res file with the header of the (uncropped) scene.
+        min_lat, max_lat: Latitude bounds [deg].
+        min_lon, max_lon: Longitude bounds [deg].
+        margin: Extra lines/pixels added on each side of the window.
+        height: Height of the box [m], defaults to Terrain_height or 0.
+
+    Returns:
+        window: Tuple (l0, lN, p0, pN), 1-based and clipped to the image.
+
+    Raises:
+        ValueError if the box does not overlap the image.
+    """
+    orbit, image_geom = prepare_orbit_imagegeometry(resfile)
+    if height is None:
+        height = DorisResParser.parse_res_file(resfile).get('terrain_height', 0.0)
+
+    ellipsoid = Ellipsoid()
+    lines, pixels = [], []
+    for lat in np.linspace(min_lat, max_lat, 5):
+        for lon in np.linspace(min_lon, max_lon, 5):
+            line, pixel = xyz2lp(ellipsoid.lla2xyz(lat, lon, height), orbit, image_geom)
+            lines.append(line)
+            pixels.append(pixel)
+
+    l0 = max(1, int(math.floor(min(lines))) - margin)
+    lN = min(image_geom.num_lines, int(math.ceil(max(lines))) + margin)
+    p0 = max(1, int(math.floor(min(pixels))) - margin)
+    pN = min(image_geom.num_pixels, int(math.ceil(max(pixels))) + margin)
+    if l0 > lN or p0 > pN:
+        raise ValueError(f"AOI [{min_lat}, {max_lat}] x [{min_lon}, {max_lon}] does not overlap the image")
+
+    _print(f"AOI window: lines [{l0}, {lN}], pixels [{p0}, {pN}]")
+    return l0, lN, p0, pN
+
+
 # ------------------------------------------------------------------------
 # Utility Functions
 # ------------------------------------------------------------------------
@@ -1133,6 +2218,55 @@ def read_dem_binary(filename: str,
     return data.reshape(lines, pixels)
 
 
+def read_rows(array: np.ndarray, r0: int, r1: int) -> np.ndarray:
+    """
+    Copy rows [r0, r1) of a 2D array as contiguous float32. The rows of a
+    memmap are read through a map of just those rows, released afterwards,
+    so that reading a file tile by tile keeps only one tile resident.
+
+    Args:
+        array: 2D array or memmap.
+        r0: First row.
+        r1: Row after the last one.
+
+    Returns:
+        rows: float32 array of shape [r1 - r0, pixels].
+    """
+    if isinstance(array, np.memmap) and isinstance(array.base, mmap.mmap) and array.ndim == 2:
+        # A memmap of a whole file (not a view of one): map the rows directly
+        row_bytes = array.shape[1] * array.dtype.itemsize
+        rows_map = np.memmap(array.filename, dtype=array.dtype, mode='r',
+                             offset=array.offset + r0 * row_bytes, shape=(r1 - r0, array.shape[1]))
+        rows = np.array(rows_map, dtype=np.float32)
+        del rows_map
+        return rows
+    return np.ascontiguousarray(array[r0:r1], dtype=np.float32)
+
+
+def open_dem_memmap(filename: str,
+                    lines: int,
+                    pixels: int,
+                    dtype: str = 'float32') -> np.ndarray:
+    """
+    Map a binary DEM file as a read-only 2D array, without reading it.
+
+    Args:
+        filename: Input file path
+        lines: Number of lines
+        pixels: Number of pixels
+        dtype: Data type(default: float32)
+
+    Returns:
+        dem_array: Read-only memmap with shape [lines, pixels].
+    """
+    expected_size = lines * pixels * np.dtype(dtype).itemsize
+    actual_size = os.path.getsize(filename)
+    if actual_size != expected_size:
+        raise ValueError(f"File size mismatch: expected {expected_size} bytes, got {actual_size}")
+
+    return np.memmap(filename, dtype=dtype, mode='r', shape=(lines, pixels))
+
+
 def prepare_orbit_imagegeometry(resfile):
     """
     Build Orbit and ImageGeometry objects from a Doris .res file.
@@ -1167,17 +2301,20 @@ def prepare_orbit_imagegeometry(resfile):
     # 2. Build image geometry from .res file.
     # 2.1 Time parameters.
     first_dt = parameters['first_pixel_datetime']
-    last_dt = parameters['last_pixel_datetime']
     day0 = first_dt.replace(hour=0, minute=0, second=0, microsecond=0)
     # day_start1 = first_dt.replace(hour=0, minute=0, second=0, microsecond=0)
     # day_start2 = last_dt.replace(hour=0, minute=0, second=0, microsecond=0)
     first_line_time = (first_dt - day0).total_seconds()
-    last_line_time = (last_dt - day0).total_seconds()
     # 2.2 PRF and line_time_interval.
     prf = parameters.get('prf_computed', parameters.get('prf', None))
     if prf is None or prf <= 0:
         raise ValueError("Invalid PRF value")
     line_time_interval = 1.0 / prf
+    # Some headers (e.g. CSK) have no last line time; derive it from the size.
+    if 'last_pixel_datetime' in parameters:
+        last_line_time = (parameters['last_pixel_datetime'] - day0).total_seconds()
+    else:
+        last_line_time = first_line_time + (parameters.get('naz_original', 1) - 1) * line_time_interval
 
     # 2.3 Range sampling rate and pixel_time_interval.
     range_sampling_rate_mhz = parameters.get('range_sampling_rate', 0.0)
@@ -1185,9 +2322,20 @@ def prepare_orbit_imagegeometry(resfile):
         raise ValueError("Invalid range sampling rate")
     pixel_time_interval = 1.0 / (range_sampling_rate_mhz * 1e6)  # MHz -> Hz
 
-    # 2.4 Image dimensions.
+    # 2.4 Image dimensions (of the crop window when the res file has one).
     num_lines = parameters.get('naz_original', 1)
     num_pixels = parameters.get('nr_original', 1)
+    if 'first_line' in parameters and 'last_line' in parameters:
+        num_lines = parameters['last_line'] - parameters['first_line'] + 1
+    if 'first_pixel' in parameters and 'last_pixel' in parameters:
+        num_pixels = parameters['last_pixel'] - parameters['first_pixel'] + 1
+
+    first_line = parameters.get('first_line', 1) - 1
+    if first_line > 0:
+        # Shift the first line time to the first line of the crop window
+        first_line_time += first_line * line_time_interval
+        last_line_time = first_line_time + (num_lines - 1) * line_time_interval
+        _print(f"Adjusted first_line_time for first_line={first_line}: {first_line_time:.6f}s")
 
     # 2.5 Range time values.
     near_range_time_ms = parameters.get('range_time_to_first_pixel', 0.0)
@@ -1195,10 +2343,10 @@ def prepare_orbit_imagegeometry(resfile):
 
     first_pixel = parameters.get('first_pixel', 1) - 1
     if first_pixel > 0:
-        # Adjust near_range_time to account for cropped pixels
+        # Cropped pixels lie further in range than the first original pixel
         range_sampling_rate = parameters.get('range_sampling_rate', 240.0) * 1e6
         time_correction = first_pixel / range_sampling_rate
-        near_range_time -= time_correction
+        near_range_time += time_correction
         _print(f"Adjusted near_range_time for first_pixel={first_pixel}: {near_range_time*1000:.6f}ms")
 
     far_range_time = near_range_time + (num_pixels - 1) * pixel_time_interval
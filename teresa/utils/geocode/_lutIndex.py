@@ -0,0 +1,496 @@
+"""
+Spatial index of the forward geocoding LUTs (lat.raw/lon.raw).
+
+A regular lat/lon bucket grid is built once over a decimated copy of the
+LUTs and saved next to the latitude LUT (lat.raw -> lat.index.npz). A query
+finds the nearest indexed pixel by searching the buckets in rings around
+its own, then inverts the full-resolution LUT locally: Newton steps on the
+line/pixel using the finite-difference Jacobian of the LUT, then on its
+bilinear interpolation, giving sub-pixel radar coordinates. The nearest
+LUT pixel, as a brute-force search finds it, is reached by a descent from the
+rounded sub-pixel position.
+"""
+
+import os
+import math
+import numpy as np
+from numba import njit, prange
+from typing import Tuple
+
+from teresa.utils.atomicWrite import atomic_path
+
+INDEX_VERSION = 1
+
+
+def index_path(lat_lut_path: str) -> str:
+    """
+    Path of the index saved next to a latitude LUT.
+
+    Args:
+        lat_lut_path: Path to the latitude LUT.
+
+    Returns:
+        path: e.g. lat.index.npz for lat.raw.
+    """
+    return os.path.splitext(lat_lut_path)[0] + ".index.npz"
+
+
+def _lut_signature(*paths: str) -> np.ndarray:
+    """Size and modification time of the LUT files, to detect a stale index."""
+    signature = []
+    for path in paths:
+        stat = os.stat(path)
+        signature += [stat.st_size, stat.st_mtime_ns]
+    return np.array(signature, dtype=np.int64)
+
+
+@njit(cache=True)
+def _bucket_distance(bucket_row, bucket_col, y, x, y0, x0, cell):
+    """Squared distance from (y, x) to the nearest point of a bucket."""
+    dy = max(y0 + bucket_row * cell - y, 0.0, y - (y0 + (bucket_row + 1) * cell))
+    dx = max(x0 + bucket_col * cell - x, 0.0, x - (x0 + (bucket_col + 1) * cell))
+    return dy * dy + dx * dx
+
+
+@njit(parallel=True, cache=True)
+def _nearest_nodes(lats, lons, node_y, node_x, offsets, ids,
+                   y0, x0, cell, bucket_rows, bucket_cols, lon_scale, max_dist):
+    """
+    Nearest indexed node of each query, searching the buckets ring by ring
+    around the bucket of the query until no closer node can exist.
+
+    Returns:
+        nearest: Node index per query, -1 when none is within max_dist (in
+        scaled degrees).
+    """
+    n = lats.size
+    nearest = np.full(n, -1, dtype=np.int64)
+    for q in prange(n):
+        y = lats[q]
+        x = lons[q] * lon_scale
+        if np.isnan(y) or np.isnan(x):
+            continue
+        row = int(math.floor((y - y0) / cell))
+        col = int(math.floor((x - x0) / cell))
+        # Rings needed to reach the grid from outside, plus the search radius
+        reach = max(0, -row, row - bucket_rows + 1, -col, col - bucket_cols + 1)
+        max_ring = reach + bucket_rows + bucket_cols
+        if not np.isinf(max_dist):
+            max_ring = min(max_ring, reach + int(math.ceil(max_dist / cell)) + 1)
+        best = max_dist * max_dist if not np.isinf(max_dist) else np.inf
+        best_id = -1
+        for ring in range(max_ring + 1):
+            # Every bucket of this ring is at least (ring - 1) cells away
+            if ring > 0 and best_id >= 0 and ((ring - 1) * cell) ** 2 > best:
+                break
+            for r in range(row - ring, row + ring + 1):
+                if r < 0 or r >= bucket_rows:
+                    continue
+                step = 1 if r == row - ring or r == row + ring else 2 * ring
+                for c in range(col - ring, col + ring + 1, max(1, step)):
+                    if c < 0 or c >= bucket_cols:
+                        continue
+                    if _bucket_distance(r, c, y, x, y0, x0, cell) >= best:
+                        continue
+                    bucket = r * bucket_cols + c
+                    for k in range(offsets[bucket], offsets[bucket + 1]):
+                        node = ids[k]
+                        dy = node_y[node] - y
+                        dx = node_x[node] - x
+                        dist = dy * dy + dx * dx
+                        if dist < best:
+                            best = dist
+                            best_id = node
+        nearest[q] = best_id
+    return nearest
+
+
+@njit(cache=True)
+def _lut_gradient(lut, line, pixel, axis):
+    """Central (one-sided at edges or next to NaN) difference of a LUT, NaN if none."""
+    lines, pixels = lut.shape
+    if axis == 0:
+        lo, hi = max(line - 1, 0), min(line + 1, lines - 1)
+        f_lo, f_hi, f_c = lut[lo, pixel], lut[hi, pixel], lut[line, pixel]
+    else:
+        lo, hi = max(pixel - 1, 0), min(pixel + 1, pixels - 1)
+        f_lo, f_hi, f_c = lut[line, lo], lut[line, hi], lut[line, pixel]
+    centre = line if axis == 0 else pixel
+    if not np.isnan(f_lo) and not np.isnan(f_hi) and hi > lo:
+        return (f_hi - f_lo) / (hi - lo)
+    if not np.isnan(f_hi) and hi > centre:
+        return (f_hi - f_c) / (hi - centre)
+    if not np.isnan(f_lo) and lo < centre:
+        return (f_c - f_lo) / (centre - lo)
+    return np.nan
+
+
+@njit(parallel=True, cache=True)
+def _refine(lats, lons, start_lines, start_pixels, lat_lut, lon_lut, lon_scale, max_iter, max_dist):
+    """
+    Invert the LUTs around the start pixels: Newton steps on the line/pixel
+    with the local Jacobian of the LUT, moving to the nearest pixel of the
+    estimate until it stays, then Newton steps on the bilinear interpolation
+    of the LUT for the sub-pixel position.
+
+    Returns:
+        radar_coords: Tuple (line, pixel) per query, fractional, NaN when not
+        found or farther than max_dist (degrees) from the nearest pixel.
+    """
+    n = lats.size
+    lines, pixels = lat_lut.shape
+    out_line = np.full(n, np.nan)
+    out_pixel = np.full(n, np.nan)
+    for q in prange(n):
+        line = start_lines[q]
+        pixel = start_pixels[q]
+        if line < 0:
+            continue
+        d_line = 0.0
+        d_pixel = 0.0
+        for _ in range(max_iter):
+            f_lat = lat_lut[line, pixel]
+            f_lon = lon_lut[line, pixel]
+            j00 = _lut_gradient(lat_lut, line, pixel, 0)
+            j01 = _lut_gradient(lat_lut, line, pixel, 1)
+            j10 = _lut_gradient(lon_lut, line, pixel, 0) * lon_scale
+            j11 = _lut_gradient(lon_lut, line, pixel, 1) * lon_scale
+            det = j00 * j11 - j01 * j10
+            if np.isnan(det) or det == 0.0:
+                d_line = 0.0
+                d_pixel = 0.0
+                break
+            r_lat = lats[q] - f_lat
+            r_lon = (lons[q] - f_lon) * lon_scale
+            d_line = (j11 * r_lat - j01 * r_lon) / det
+            d_pixel = (j00 * r_lon - j10 * r_lat) / det
+            next_line = min(max(int(round(line + d_line)), 0), lines - 1)
+            next_pixel = min(max(int(round(pixel + d_pixel)), 0), pixels - 1)
+            if (next_line == line and next_pixel == pixel) or np.isnan(lat_lut[next_line, next_pixel]) \
+                    or np.isnan(lon_lut[next_line, next_pixel]):
+                break
+            line = next_line
+            pixel = next_pixel
+
+        # Sub-pixel position: Newton steps on the bilinear interpolation of the
+        # LUT in the cell of the estimate, the cell following the estimate
+        fine_line = line + d_line
+        fine_pixel = pixel + d_pixel
+        for _ in range(max_iter):
+            l0 = min(max(int(math.floor(fine_line)), 0), max(lines - 2, 0))
+            p0 = min(max(int(math.floor(fine_pixel)), 0), max(pixels - 2, 0))
+            l1 = min(l0 + 1, lines - 1)
+            p1 = min(p0 + 1, pixels - 1)
+            if l1 == l0 or p1 == p0:
+                break
+            a00, a01, a10, a11 = lat_lut[l0, p0], lat_lut[l0, p1], lat_lut[l1, p0], lat_lut[l1, p1]
+            b00, b01, b10, b11 = lon_lut[l0, p0], lon_lut[l0, p1], lon_lut[l1, p0], lon_lut[l1, p1]
+            if np.isnan(a00 + a01 + a10 + a11 + b00 + b01 + b10 + b11):
+                break
+            u = fine_line - l0
+            v = fine_pixel - p0
+            f_lat = a00 * (1 - u) * (1 - v) + a01 * (1 - u) * v + a10 * u * (1 - v) + a11 * u * v
+            f_lon = b00 * (1 - u) * (1 - v) + b01 * (1 - u) * v + b10 * u * (1 - v) + b11 * u * v
+            j00 = (a10 - a00) * (1 - v) + (a11 - a01) * v
+            j01 = (a01 - a00) * (1 - u) + (a11 - a10) * u
+            j10 = ((b10 - b00) * (1 - v) + (b11 - b01) * v) * lon_scale
+            j11 = ((b01 - b00) * (1 - u) + (b11 - b10) * u) * lon_scale
+            det = j00 * j11 - j01 * j10
+            if det == 0.0:
+                break
+            r_lat = lats[q] - f_lat
+            r_lon = (lons[q] - f_lon) * lon_scale
+            step_line = (j11 * r_lat - j01 * r_lon) / det
+            step_pixel = (j00 * r_lon - j10 * r_lat) / det
+            # Do not leave the neighbourhood of the integer solution
+            fine_line = min(max(fine_line + step_line, line - 1.0), line + 1.0)
+            fine_pixel = min(max(fine_pixel + step_pixel, pixel - 1.0), pixel + 1.0)
+            if abs(step_line) < 1e-4 and abs(step_pixel) < 1e-4:
+                break
+        d_line = fine_line - line
+        d_pixel = fine_pixel - pixel
+
+        # Distance to the nearest pixel, in the metric of the brute-force search
+        near_line = min(max(int(round(line + d_line)), 0), lines - 1)
+        near_pixel = min(max(int(round(pixel + d_pixel)), 0), pixels - 1)
+        dist_lat = lat_lut[near_line, near_pixel] - lats[q]
+        dist_lon = lon_lut[near_line, near_pixel] - lons[q]
+        if np.isnan(dist_lat) or np.isnan(dist_lon):
+            near_line, near_pixel = line, pixel
+            dist_lat = lat_lut[line, pixel] - lats[q]
+            dist_lon = lon_lut[line, pixel] - lons[q]
+        if dist_lat * dist_lat + dist_lon * dist_lon >= max_dist * max_dist:
+            continue
+        # Sub-pixel offsets beyond the image edge are clipped to it
+        out_line[q] = min(max(line + d_line, 0.0), lines - 1.0)
+        out_pixel[q] = min(max(pixel + d_pixel, 0.0), pixels - 1.0)
+    return out_line, out_pixel
+
+
+@njit(parallel=True, cache=True)
+def _nearest_pixels(lats, lons, fine_lines, fine_pixels, lat_lut, lon_lut, l1):
+    """
+    Nearest LUT pixel of each query, in the unscaled degree metric of the
+    brute-force search (|dlat| + |dlon| when l1, squared distance otherwise):
+    descent over the 8 neighbours from the rounded sub-pixel position.
+
+    Returns:
+        radar_coords: Tuple (line, pixel) of int64 arrays, -1 where the
+        sub-pixel position is NaN.
+    """
+    n = lats.size
+    lines, pixels = lat_lut.shape
+    out_line = np.full(n, -1, dtype=np.int64)
+    out_pixel = np.full(n, -1, dtype=np.int64)
+    for q in prange(n):
+        if np.isnan(fine_lines[q]) or np.isnan(fine_pixels[q]):
+            continue
+        line = min(max(int(round(fine_lines[q])), 0), lines - 1)
+        pixel = min(max(int(round(fine_pixels[q])), 0), pixels - 1)
+        best = np.inf
+        while True:
+            best_line = line
+            best_pixel = pixel
+            for dl in range(-1, 2):
+                for dp in range(-1, 2):
+                    l = line + dl
+                    p = pixel + dp
+                    if l < 0 or l >= lines or p < 0 or p >= pixels:
+                        continue
+                    dlat = lat_lut[l, p] - lats[q]
+                    dlon = lon_lut[l, p] - lons[q]
+                    dist = abs(dlat) + abs(dlon) if l1 else dlat * dlat + dlon * dlon
+                    if dist < best:
+                        best = dist
+                        best_line = l
+                        best_pixel = p
+            if best_line == line and best_pixel == pixel:
+                break
+            line = best_line
+            pixel = best_pixel
+        out_line[q] = line
+        out_pixel[q] = pixel
+    return out_line, out_pixel
+
+
+class LUTIndex:
+    """
+    Bucket grid over the pixels of the lat/lon LUTs, every stride-th line and
+    pixel, for batched geographic to radar lookups.
+    """
+
+    def __init__(self, shape, stride, lon_scale, y0, x0, cell, bucket_rows, bucket_cols,
+                 node_y, node_x, offsets, ids, signature=None):
+        """
+        Initialize the index from its arrays; use build() or for_lut().
+
+        Args:
+            shape: Shape (lines, pixels) of the LUTs.
+            stride: Decimation of the indexed pixels.
+            lon_scale: Scale of the longitudes (cosine of the mid latitude).
+            y0, x0: Origin of the bucket grid (latitude, scaled longitude).
+            cell: Bucket size in degrees.
+            bucket_rows, bucket_cols: Size of the bucket grid.
+            node_y, node_x: Latitude and scaled longitude of the indexed pixels.
+            offsets: Start of each bucket in ids (CSR), bucket_rows * bucket_cols + 1.
+            ids: Indexed pixels sorted by bucket.
+            signature: Size and mtime of the LUT files the index was built from.
+
+        Returns:
+            result: None.
+        """
+        self.shape = tuple(int(v) for v in shape)
+        self.stride = int(stride)
+        self.lon_scale = float(lon_scale)
+        self.y0 = float(y0)
+        self.x0 = float(x0)
+        self.cell = float(cell)
+        self.bucket_rows = int(bucket_rows)
+        self.bucket_cols = int(bucket_cols)
+        self.node_y = node_y
+        self.node_x = node_x
+        self.offsets = offsets
+        self.ids = ids
+        self.signature = signature
+
+    @property
+    def node_pixels(self) -> int:
+        """Number of indexed pixels per decimated line."""
+        return -(-self.shape[1] // self.stride)
+
+    @classmethod
+    def build(cls, lat_lut: np.ndarray, lon_lut: np.ndarray, stride: int = 4,
+              nodes_per_bucket: float = 4.0) -> 'LUTIndex':
+        """
+        Build the index of the LUTs.
+
+        Args:
+            lat_lut: Latitude LUT [lines, pixels] in degrees (may be a memmap).
+            lon_lut: Longitude LUT [lines, pixels] in degrees.
+            stride: Index every stride-th line and pixel; the refinement on the
+                full LUT recovers the pixels in between.
+            nodes_per_bucket: Mean number of indexed pixels per bucket.
+
+        Returns:
+            index: The LUTIndex.
+        """
+        if lat_lut.shape != lon_lut.shape:
+            raise ValueError("Latitude and Longitude LUTs must have the same shape.")
+        stride = max(1, int(stride))
+        node_y = np.asarray(lat_lut[::stride, ::stride], dtype=np.float64).ravel()
+        node_lon = np.asarray(lon_lut[::stride, ::stride], dtype=np.float64).ravel()
+        valid = np.isfinite(node_y) & np.isfinite(node_lon)
+        if not valid.any():
+            raise ValueError("The LUTs have no valid pixel.")
+
+        lon_scale = math.cos(math.radians(0.5 * (node_y[valid].min() + node_y[valid].max())))
+        lon_scale = max(lon_scale, 1e-3)
+        node_x = node_lon * lon_scale
+        y0, y1 = node_y[valid].min(), node_y[valid].max()
+        x0, x1 = node_x[valid].min(), node_x[valid].max()
+        area = max((y1 - y0) * (x1 - x0), 1e-12)
+        cell = max(math.sqrt(area * nodes_per_bucket / valid.sum()), 1e-9)
+        bucket_rows = int((y1 - y0) // cell) + 1
+        bucket_cols = int((x1 - x0) // cell) + 1
+
+        ids = np.flatnonzero(valid)
+        bucket = (((node_y[ids] - y0) // cell).astype(np.int64) * bucket_cols +
+                  ((node_x[ids] - x0) // cell).astype(np.int64))
+        order = np.argsort(bucket, kind='stable')
+        ids = ids[order].astype(np.int64)
+        offsets = np.zeros(bucket_rows * bucket_cols + 1, dtype=np.int64)
+        np.cumsum(np.bincount(bucket, minlength=bucket_rows * bucket_cols), out=offsets[1:])
+        return cls(lat_lut.shape, stride, lon_scale, y0, x0, cell, bucket_rows, bucket_cols,
+                   node_y, node_x, offsets, ids)
+
+    def save(self, path: str) -> None:
+        """
+        Save the index (atomically) to an .npz file.
+
+        Args:
+            path: Output path.
+
+        Returns:
+            result: None.
+        """
+        with atomic_path(path) as tmp_path:
+            with open(tmp_path, 'wb') as f:
+                np.savez(f, version=INDEX_VERSION, shape=np.array(self.shape), stride=self.stride,
+                         lon_scale=self.lon_scale, y0=self.y0, x0=self.x0, cell=self.cell,
+                         bucket_rows=self.bucket_rows, bucket_cols=self.bucket_cols,
+                         node_y=self.node_y, node_x=self.node_x, offsets=self.offsets, ids=self.ids,
+                         signature=np.array([] if self.signature is None else self.signature, dtype=np.int64))
+
+    @classmethod
+    def load(cls, path: str) -> 'LUTIndex':
+        """
+        Load an index saved by save().
+
+        Args:
+            path: Path to the .npz file.
+
+        Returns:
+            index: The LUTIndex.
+        """
+        with np.load(path) as data:
+            if int(data["version"]) != INDEX_VERSION:
+                raise ValueError(f"Unsupported LUT index version in {path}")
+            return cls(data["shape"], int(data["stride"]), float(data["lon_scale"]),
+                       float(data["y0"]), float(data["x0"]), float(data["cell"]),
+                       int(data["bucket_rows"]), int(data["bucket_cols"]),
+                       data["node_y"], data["node_x"], data["offsets"], data["ids"],
+                       data["signature"])
+
+    @classmethod
+    def for_lut(cls, lat_lut_path: str, lon_lut_path: str,
+                lat_lut: np.ndarray, lon_lut: np.ndarray, stride: int = 4) -> 'LUTIndex':
+        """
+        Load the index saved next to the latitude LUT, or build and save it
+        when missing or older than the LUT files.
+
+        Args:
+            lat_lut_path: Path to the latitude LUT.
+            lon_lut_path: Path to the longitude LUT.
+            lat_lut: Latitude LUT array (may be a memmap).
+            lon_lut: Longitude LUT array.
+            stride: Decimation of a newly built index.
+
+        Returns:
+            index: The LUTIndex.
+        """
+        path = index_path(lat_lut_path)
+        signature = _lut_signature(lat_lut_path, lon_lut_path)
+        if os.path.exists(path):
+            try:
+                index = cls.load(path)
+                if index.shape == tuple(lat_lut.shape) and np.array_equal(index.signature, signature):
+                    return index
+            except (OSError, ValueError, KeyError):
+                pass
+        index = cls.build(lat_lut, lon_lut, stride=stride)
+        index.signature = signature
+        try:
+            index.save(path)
+        except OSError:
+            # Read-only directory: keep the index in memory only
+            pass
+        return index
+
+    def query(self, lat_lut: np.ndarray, lon_lut: np.ndarray, lats, lons,
+              max_dist_deg: float = np.inf, max_iter: int = 10) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Radar coordinates of geographic points.
+
+        Args:
+            lat_lut: Latitude LUT the index was built from.
+            lon_lut: Longitude LUT.
+            lats: Latitudes in degrees (array-like).
+            lons: Longitudes in degrees (array-like).
+            max_dist_deg: Points farther than this from every valid pixel get NaN.
+            max_iter: Maximum refinement steps.
+
+        Returns:
+            radar_coords: Tuple (line, pixel) of float64 arrays, 0-based and
+            fractional, NaN where no pixel is within max_dist_deg.
+        """
+        lats = np.atleast_1d(np.asarray(lats, dtype=np.float64)).ravel()
+        lons = np.atleast_1d(np.asarray(lons, dtype=np.float64)).ravel()
+        if lats.shape != lons.shape:
+            raise ValueError("lats and lons must have the same size.")
+
+        # The nearest node may be a few pixels away from the nearest pixel, so
+        # the node search allows one bucket (about two node spacings) more
+        node_dist = np.inf
+        if np.isfinite(max_dist_deg):
+            node_dist = max_dist_deg + self.cell
+        nearest = _nearest_nodes(lats, lons, self.node_y, self.node_x, self.offsets, self.ids,
+                                 self.y0, self.x0, self.cell, self.bucket_rows, self.bucket_cols,
+                                 self.lon_scale, node_dist)
+        found = nearest >= 0
+        start_lines = np.where(found, nearest // self.node_pixels * self.stride, -1)
+        start_pixels = np.where(found, nearest % self.node_pixels * self.stride, -1)
+        return _refine(lats, lons, start_lines, start_pixels, lat_lut, lon_lut,
+                       self.lon_scale, max_iter, float(max_dist_deg))
+
+    def nearest(self, lat_lut: np.ndarray, lon_lut: np.ndarray, lats, lons,
+                max_dist_deg: float = np.inf, l1: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Nearest LUT pixels of geographic points, as found by a brute-force
+        search over the valid pixels.
+
+        Args:
+            lat_lut: Latitude LUT the index was built from.
+            lon_lut: Longitude LUT.
+            lats: Latitudes in degrees (array-like).
+            lons: Longitudes in degrees (array-like).
+            max_dist_deg: Points farther than this from every valid pixel get -1.
+            l1: Distance |dlat| + |dlon| instead of the Euclidean distance in degrees.
+
+        Returns:
+            radar_coords: Tuple (line, pixel) of int64 arrays, 0-based, -1
+            where no pixel is within max_dist_deg.
+        """
+        fine_lines, fine_pixels = self.query(lat_lut, lon_lut, lats, lons, max_dist_deg=max_dist_deg)
+        lats = np.atleast_1d(np.asarray(lats, dtype=np.float64)).ravel()
+        lons = np.atleast_1d(np.asarray(lons, dtype=np.float64)).ravel()
+        return _nearest_pixels(lats, lons, fine_lines, fine_pixels, lat_lut, lon_lut, l1)
@@ -2,6 +2,7 @@
 import numpy as np
 from datetime import datetime
 from typing import  Tuple
+from numba import njit
 from scipy.linalg import cho_factor, cho_solve
 from dataclasses import dataclass
 
@@ -221,6 +222,8 @@ class Orbit:
         self.numberofpoints = 0
         self.klo = 0
         self.khi = 1
+        # (data, coef) stacked as (3, N) arrays for orbit_state_array
+        self.state_arrays = None
 
     def set_data(self, time_data, x_data, y_data, z_data,
                  xv_data=None, yv_data=None, zv_data=None):
@@ -291,6 +294,9 @@ class Orbit:
             self.coef_y = self._polyfit(self.time, self.data_y, self.interp_method)
             self.coef_z = self._polyfit(self.time, self.data_z, self.interp_method)
 
+        self.state_arrays = (np.ascontiguousarray(np.vstack([self.data_x, self.data_y, self.data_z])),
+                             np.ascontiguousarray(np.vstack([self.coef_x, self.coef_y, self.coef_z])))
+
     def _spline_interpol(self, time, data):
         """
         Compute natural cubic spline coefficients
@@ -563,6 +569,61 @@ class Orbit:
 
         return Point3D(ax, ay, az)
 
+    def numba_args(self) -> Tuple:
+        """
+        Arguments of orbit_state_array for this orbit, to interpolate it
+        inside other Numba kernels.
+
+        Returns:
+            Tuple (time, data, coef, spline)
+        """
+        data, coef = self.state_arrays
+        return self.time, data, coef, self.interp_method == ORB_SPLINE
+
+    def _state_array(self, t, der: int) -> np.ndarray:
+        t = np.asarray(t, dtype=float)
+        if t.size and (t.min() < self.time[0] or t.max() > self.time[-1]):
+            _print(f"Warning:Interpolation at t in [{t.min()}, {t.max()}] outside time axis "
+                   f"[{self.time[0]}, {self.time[-1]}]")
+        state = orbit_state_array(np.ascontiguousarray(t.ravel()), *self.numba_args(), der)
+        return state.reshape(t.shape + (3,))
+
+    def get_xyz_array(self, t: np.ndarray) -> np.ndarray:
+        """
+        Get interpolated positions at an array of times
+
+        Args:
+            t: Time values [seconds], any shape
+
+        Returns:
+            Array of shape t.shape + (3,) with the (x, y, z) positions [meters]
+        """
+        return self._state_array(t, 0)
+
+    def get_xyz_dot_array(self, t: np.ndarray) -> np.ndarray:
+        """
+        Get interpolated velocities at an array of times
+
+        Args:
+            t: Time values [seconds], any shape
+
+        Returns:
+            Array of shape t.shape + (3,) with the velocities (vx, vy, vz) [m/s]
+        """
+        return self._state_array(t, 1)
+
+    def get_xyz_ddot_array(self, t: np.ndarray) -> np.ndarray:
+        """
+        Get interpolated accelerations at an array of times
+
+        Args:
+            t: Time values [seconds], any shape
+
+        Returns:
+            Array of shape t.shape + (3,) with the accelerations (ax, ay, az) [m/s^2]
+        """
+        return self._state_array(t, 2)
+
     def dump_orbit(self, filename: str, dt: float = 1.0):
         """
         Export interpolated orbit to file
@@ -605,6 +666,66 @@ class Orbit:
         _print(f"  Z: [{np.min(self.data_z):.3f}, {np.max(self.data_z):.3f}] m")
 
 
+@njit(cache=True)
+def orbit_state_array(t, time, data, coef, spline, der):
+    """
+    Interpolate the orbit at an array of times, callable from Numba kernels.
+    Same results as Orbit.get_xyz / get_xyz_dot / get_xyz_ddot.
+
+    Args:
+        t: Time values [seconds], shape (N,)
+        time: Time axis of the orbit data points, shape (M,)
+        data: Positions of the orbit data points, shape (3, M)
+        coef: Spline second derivatives (3, M) or polynomial coefficients (3, degree + 1)
+        spline: True for cubic spline, False for polynomial interpolation
+        der: 0 for position, 1 for velocity, 2 for acceleration
+
+    Returns:
+        Array of shape (N, 3)
+    """
+    n = t.shape[0]
+    m = time.shape[0]
+    out = np.empty((n, 3))
+
+    if spline:
+        for i in range(n):
+            # Interval [k, k + 1] containing t, extrapolating at both ends
+            k = np.searchsorted(time, t[i], side='right') - 1
+            k = min(max(k, 0), m - 2)
+            h = time[k + 1] - time[k]
+            a = (time[k + 1] - t[i]) / h
+            b = 1.0 - a
+            for c in range(3):
+                if der == 0:
+                    out[i, c] = (a * data[c, k] + b * data[c, k + 1] +
+                                 ((a**3 - a) * coef[c, k] + (b**3 - b) * coef[c, k + 1]) * h**2 / 6.0)
+                elif der == 1:
+                    out[i, c] = ((data[c, k + 1] - data[c, k]) / h +
+                                 h * ((1 - 3*a**2) * coef[c, k] + (3*b**2 - 1) * coef[c, k + 1]) / 6.0)
+                else:
+                    out[i, c] = a * coef[c, k] + b * coef[c, k + 1]
+        return out
+
+    # Polynomial on the normalized time axis, derivatives scaled back by 10^der
+    t_mid = time[m // 2]
+    degree = coef.shape[1] - 1
+    scale = 10.0 ** der
+    for i in range(n):
+        t_norm = (t[i] - t_mid) / 10.0
+        for c in range(3):
+            if degree < der:
+                out[i, c] = 0.0
+                continue
+            result = 0.0
+            for j in range(degree, der - 1, -1):
+                factor = 1.0
+                for d in range(der):
+                    factor *= j - d
+                result = result * t_norm + coef[c, j] * factor
+            out[i, c] = result / scale
+    return out
+
+
 # Helper functions for coordinate transformations
 def eq1_doppler(vel: Point3D, dsat_p: Point3D) -> float:
     """Doppler equation: v · (P - S) = 0"""
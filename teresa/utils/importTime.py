@@ -0,0 +1,74 @@
+"""
+Import-time benchmark of the entry points, guarding the lazy imports of the
+sensors and engines against regressions.
+
+    python -m teresa.utils.importTime
+"""
+import sys
+import subprocess
+
+# Modules that only the selected sensor or engine may import
+# 只有被选中的传感器或引擎才可以导入的模块
+HEAVY_MODULES = ("h5py", "rasterio", "numba", "scipy", "yaml", "matplotlib", "distutils")
+
+# module -> import time budget (ms)
+BUDGETS_MS = {
+    "teresa.cli": 150,
+    "teresa.inteface": 150,
+    "teresa.coregistion.dorisCoregistion": 300,
+}
+
+
+def import_time(module, repeat=5):
+    """
+    Cumulative import time of a module in a fresh interpreter, best of repeat
+    runs (python -X importtime).
+
+    Returns:
+        float: The import time (ms).
+    """
+    best = None
+    for _ in range(repeat):
+        result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                                capture_output=True, text=True, check=True)
+        for line in result.stderr.splitlines():
+            fields = line.split("|")
+            if len(fields) == 3 and fields[2].strip() == module:
+                cumulative = int(fields[1]) / 1000.0
+                best = cumulative if best is None else min(best, cumulative)
+    return best
+
+
+def heavy_imports(module):
+    """
+    The heavy modules imported as a side effect of importing a module.
+
+    Returns:
+        list: Names from HEAVY_MODULES found in sys.modules.
+    """
+    code = (f"import sys, {module}; "
+            f"print(' '.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))")
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return result.stdout.split()
+
+
+def check(budgets=None, repeat=5):
+    """
+    Check the import time and the heavy imports of each module.
+
+    Returns:
+        bool: True if every module is within its budget and imports no heavy module.
+    """
+    ok = True
+    for module, budget in (budgets or BUDGETS_MS).items():
+        elapsed = import_time(module, repeat)
+        heavy = heavy_imports(module)
+        passed = elapsed <= budget and not heavy
+        ok &= passed
+        print(f"{module:<40} {elapsed:8.1f} ms (budget {budget} ms)  "
+              f"heavy: {', '.join(heavy) or '-'}  {'OK' if passed else 'FAIL'}")
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if check() else 1)
@@ -0,0 +1,56 @@
+import importlib
+from collections.abc import Mapping
+
+
+def load_object(spec):
+    """
+    Import the object named by a "package.module:attribute" spec.
+
+    Parameters:
+        spec (str): The spec of the object.
+
+    Returns:
+        object: The imported object.
+    """
+    module_name, _, attr = spec.partition(":")
+    obj = importlib.import_module(module_name)
+    for name in filter(None, attr.split(".")):
+        obj = getattr(obj, name)
+    return obj
+
+
+class lazyRegistry(Mapping):
+    def __init__(self, specs=None):
+        """
+        Read-only map of keys to "module:attribute" specs whose module is only
+        imported when the key is looked up, so that selecting one sensor or
+        engine does not import the dependencies (h5py, rasterio, numba, ...)
+        of all the others.
+
+        Parameters:
+            specs (dict): key -> spec, or key -> object already imported.
+        """
+        self._specs = dict(specs or {})
+        self._loaded = {}
+
+    def register(self, key, spec):
+        """
+        Add or replace the spec of a key.
+        """
+        self._specs[key] = spec
+        self._loaded.pop(key, None)
+
+    def __getitem__(self, key):
+        if key not in self._loaded:
+            spec = self._specs[key]
+            self._loaded[key] = load_object(spec) if isinstance(spec, str) else spec
+        return self._loaded[key]
+
+    def __iter__(self):
+        return iter(self._specs)
+
+    def __len__(self):
+        return len(self._specs)
+
+    def __contains__(self, key):
+        return key in self._specs